@@ -0,0 +1,227 @@
+"""Reproducible HTTP load test against a seeded database.
+
+Seeds a synthetic university (web/seeding.py), then drives the real Flask
+routes with concurrent test clients and records p50/p95/p99 latency,
+throughput and SQL statements per request (from the X-Query-Count header)
+for each endpoint. Results are written as JSON so runs on different commits
+can be compared:
+
+    python -m benchmarks.load_test --output before.json
+    git checkout other-branch
+    python -m benchmarks.load_test --output after.json --baseline before.json
+
+Uses a local SQLite file by default; pass --database-url for the MySQL
+container. The same --seed always produces the same dataset. Exits non-zero
+if any request errors or, with --baseline, if an endpoint regressed by more
+than --max-regression.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import url_for
+
+from web import create_app
+from web.models import db, Student, Schedule, StudentStatus
+from web.seeding import SeedSpec, seed_database, clear_synthetic_data
+
+DEFAULT_DATABASE = 'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load_test.db')
+PREFIX = 'LB'
+
+# (name, endpoint, method, user type); students are picked at random per request
+SCENARIOS = [
+    ('available_courses', 'students.available_courses', 'GET', 'student'),
+    ('register_course', 'students.register_course', 'POST', 'student'),
+    ('academic_history', 'students.academic_history', 'GET', 'student'),
+    ('academic_history_csv', 'students.download_academic_history_csv', 'GET', 'student'),
+    ('admin_student_list', 'admin.student_list', 'GET', 'admin'),
+    ('admin_professor_list', 'admin.professor_list', 'GET', 'admin'),
+    ('admin_course_list', 'admin.course_list', 'GET', 'admin'),
+    ('admin_schedule_list', 'admin.schedule_list', 'GET', 'admin'),
+]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE, help='SQLAlchemy URL (default: local SQLite file)')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--professors', type=int, default=60)
+    parser.add_argument('--courses', type=int, default=300)
+    parser.add_argument('--sections', type=int, default=2, help='sections per course')
+    parser.add_argument('--prerequisites', type=int, default=2, help='maximum prerequisites per course')
+    parser.add_argument('--seed', type=int, default=355, help='random seed for data and request mix')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse data from a previous run with the same seed')
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--only', action='append', help='run only these scenarios (repeatable)')
+    parser.add_argument('--output', default='load_test_results.json', help='where to write the JSON report')
+    parser.add_argument('--baseline', help='previous report to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='allowed relative increase of p95 latency or mean queries versus --baseline')
+    return parser.parse_args(argv)
+
+def build_app(args):
+    if args.database_url.startswith('sqlite'):
+        engine_options = {'connect_args': {'timeout': 30, 'check_same_thread': False}}
+    else:
+        engine_options = {
+            'pool_pre_ping': True,
+            'pool_size': args.concurrency,
+            'max_overflow': 0,
+            'pool_timeout': 30,
+        }
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': args.database_url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options,
+        'WTF_CSRF_ENABLED': False,
+        'QUERY_PROFILING': True,
+        'QUERY_DEBUG_PANEL': False,
+        'SLOW_REQUEST_QUERY_COUNT': 10 ** 9,
+        'SLOW_REQUEST_DB_MS': 10 ** 9,
+        'SLOW_QUERY_MS': 10 ** 9,
+    })
+
+def seed(args):
+    if db.engine.dialect.name == 'sqlite':
+        db.create_all()
+    clear_synthetic_data(PREFIX)
+    spec = SeedSpec(students=args.students, professors=args.professors, courses=args.courses,
+                    sections_per_course=args.sections, max_prerequisites=args.prerequisites,
+                    seed=args.seed, prefix=PREFIX)
+    return seed_database(spec, echo=lambda message: print(message, file=sys.stderr))
+
+def sample_ids():
+    students = [row.student_id for row in db.session.query(Student.student_id).filter(
+        Student.student_id.like(f'{PREFIX}%'), Student.status == StudentStatus.active
+    ).limit(5000)]
+    schedules = [row.schedule_id for row in db.session.query(Schedule.schedule_id).filter(
+        Schedule.schedule_id.like(f'{PREFIX}%')
+    )]
+    if not students or not schedules:
+        sys.exit('No seeded data found; run without --skip-seed first')
+    return students, schedules
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def run_scenario(app, scenario, args, students, schedules):
+    name, endpoint, method, user_type = scenario
+    with app.test_request_context():
+        path = url_for(endpoint)
+    local = threading.local()
+    rng = random.Random(f'{args.seed}-{name}')
+    picks = [(rng.choice(students), rng.choice(schedules)) for _ in range(args.requests)]
+
+    def one_request(pick):
+        student_id, schedule_id = pick
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        with client.session_transaction() as session:
+            session.clear()
+            session['user_type'] = user_type
+            if user_type == 'student':
+                session['student_id'] = student_id
+        data = {'schedule_id': schedule_id} if method == 'POST' else None
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        queries = response.headers.get('X-Query-Count')
+        return elapsed, response.status_code, int(queries) if queries is not None else None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one_request, picks))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed for elapsed, _, _ in results)
+    queries = [count for _, _, count in results if count is not None]
+    errors = sum(1 for _, status, _ in results if status >= 500)
+    return {
+        'endpoint': endpoint,
+        'method': method,
+        'requests': len(results),
+        'errors': errors,
+        'throughput_rps': round(len(results) / wall, 1),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries_mean': round(sum(queries) / len(queries), 1) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline, max_regression):
+    """Return a message for every endpoint whose p95 latency or query count grew too much"""
+    regressions = []
+    for name, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+        for metric in ('p95_ms', 'queries_mean'):
+            before, after = previous.get(metric), current.get(metric)
+            if before and after is not None and after > before * (1 + max_regression):
+                regressions.append(f'{name}: {metric} {before} -> {after}')
+    return regressions
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = build_app(args)
+
+    with app.app_context():
+        seeded = None if args.skip_seed else seed(args)
+        students, schedules = sample_ids()
+        dialect = db.engine.dialect.name
+
+    scenarios = [s for s in SCENARIOS if not args.only or s[0] in args.only]
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'database': dialect,
+        'dataset': {
+            'seed': args.seed,
+            'students': args.students,
+            'professors': args.professors,
+            'courses': args.courses,
+            'sections_per_course': args.sections,
+            'rows': seeded,
+        },
+        'concurrency': args.concurrency,
+        'endpoints': {},
+    }
+    for scenario in scenarios:
+        print(f'Running {scenario[0]}', file=sys.stderr)
+        report['endpoints'][scenario[0]] = run_scenario(app, scenario, args, students, schedules)
+
+    failures = [f'{name}: {result["errors"]} server errors'
+                for name, result in report['endpoints'].items() if result['errors']]
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += compare(report, json.load(f), args.max_regression)
+    report['failures'] = failures
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report['endpoints'], indent=2))
+    for failure in failures:
+        print(f'FAIL {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Concurrent seat-reservation stress test.
+
+Fires thousands of simultaneous registrations at a single Schedule and checks
+that exactly max_capacity of them succeed, that the seat counter matches the
+enrolled table, and that throughput stays above a floor.
+
+Run against the local MySQL container (schema from mysql/init):
+
+    docker-compose up -d
+    python -m benchmarks.seat_stress --students 2000 --threads 64 --capacity 30
+
+Exits non-zero if any assertion fails. Rows are created with the LT prefix
+and removed afterwards unless --keep is given.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dtime
+
+from web import create_app
+from web.models import db, Student, Course, Schedule, Enrolled, Semester, CourseLevel, EnrollmentStatus
+from web.services.seats import reserve_seat, find_seat_drift
+
+COURSE_ID = 'LTCRS'
+SCHEDULE_ID = 'LTSCH'
+STUDENT_PREFIX = 'LT'
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='SQLAlchemy URL; defaults to the app configuration')
+    parser.add_argument('--students', type=int, default=2000, help='number of concurrent registrations')
+    parser.add_argument('--threads', type=int, default=64, help='worker threads (and connection pool size)')
+    parser.add_argument('--capacity', type=int, default=30, help='max_capacity of the contested course (5-300)')
+    parser.add_argument('--mode', choices=['row_lock', 'guarded'], default=None, help='seat reservation mode')
+    parser.add_argument('--min-throughput', type=float, default=200.0, help='required registrations per second')
+    parser.add_argument('--keep', action='store_true', help='leave the generated rows in the database')
+    return parser.parse_args(argv)
+
+def build_app(args):
+    overrides = {
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            'pool_pre_ping': True,
+            'pool_size': args.threads,
+            'max_overflow': 0,
+            'pool_timeout': 30,
+        }
+    }
+    if args.database_url:
+        overrides['SQLALCHEMY_DATABASE_URI'] = args.database_url
+    if args.mode:
+        overrides['SEAT_RESERVATION_MODE'] = args.mode
+    return create_app(overrides)
+
+def cleanup():
+    db.session.execute(db.delete(Enrolled).where(Enrolled.schedule_id == SCHEDULE_ID))
+    db.session.execute(db.delete(Schedule).where(Schedule.schedule_id == SCHEDULE_ID))
+    db.session.execute(db.delete(Course).where(Course.course_id == COURSE_ID))
+    db.session.execute(db.delete(Student).where(Student.student_id.like(f'{STUDENT_PREFIX}%')))
+    db.session.commit()
+
+def seed(args):
+    cleanup()
+    db.session.add(Course(
+        course_id=COURSE_ID,
+        course_code='LT100',
+        course_name='Registration Stress Test',
+        credits=3,
+        department='Load Testing',
+        level=CourseLevel.undergraduate,
+        max_capacity=args.capacity
+    ))
+    db.session.flush()
+    db.session.add(Schedule(
+        schedule_id=SCHEDULE_ID,
+        course_id=COURSE_ID,
+        semester=Semester.Fall,
+        academic_year=datetime.now().year,
+        start_time=dtime(8, 0),
+        end_time=dtime(9, 0),
+        meeting_days='MWF',
+        room_number='LT-1'
+    ))
+    student_ids = [f'{STUDENT_PREFIX}{i:06d}' for i in range(args.students)]
+    db.session.execute(db.insert(Student), [
+        {
+            'student_id': student_id,
+            'first_name': 'Load',
+            'last_name': 'Tester',
+            'date_of_birth': date(2000, 1, 1),
+            'major': 'Load Testing',
+            'email': f'{student_id.lower()}@stress.edu',
+        }
+        for student_id in student_ids
+    ])
+    db.session.commit()
+    return student_ids
+
+def run(args):
+    app = build_app(args)
+
+    def register(student_id):
+        with app.app_context():
+            started = time.perf_counter()
+            try:
+                student = db.session.get(Student, student_id)
+                reason = reserve_seat(student, SCHEDULE_ID).reason or 'ok'
+            except Exception as e:
+                reason = f'error: {type(e).__name__}'
+            finally:
+                db.session.remove()
+            return reason, time.perf_counter() - started
+
+    with app.app_context():
+        student_ids = seed(args)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(register, student_ids))
+    elapsed = time.perf_counter() - started
+
+    outcomes = {}
+    for reason, _ in results:
+        outcomes[reason] = outcomes.get(reason, 0) + 1
+    latencies = sorted(latency for _, latency in results)
+
+    with app.app_context():
+        schedule = db.session.get(Schedule, SCHEDULE_ID)
+        enrolled_rows = Enrolled.query.filter_by(schedule_id=SCHEDULE_ID, status=EnrollmentStatus.enrolled).count()
+        report = {
+            'mode': app.config.get('SEAT_RESERVATION_MODE'),
+            'students': args.students,
+            'threads': args.threads,
+            'capacity': args.capacity,
+            'outcomes': outcomes,
+            'enrolled_count': schedule.enrolled_count,
+            'enrolled_rows': enrolled_rows,
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_per_second': round(args.students / elapsed, 1),
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+            'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+            'seat_drift': find_seat_drift(),
+        }
+        if not args.keep:
+            cleanup()
+
+    failures = []
+    if outcomes.get('ok', 0) != args.capacity:
+        failures.append(f"expected {args.capacity} successful registrations, got {outcomes.get('ok', 0)}")
+    if report['enrolled_count'] != args.capacity or enrolled_rows != args.capacity:
+        failures.append(f"seat counter {report['enrolled_count']} / enrolled rows {enrolled_rows} != capacity {args.capacity}")
+    if outcomes.get('full', 0) != args.students - args.capacity:
+        failures.append(f"expected {args.students - args.capacity} 'full' rejections, got {outcomes.get('full', 0)}")
+    if report['throughput_per_second'] < args.min_throughput:
+        failures.append(f"throughput {report['throughput_per_second']}/s below {args.min_throughput}/s")
+    report['failures'] = failures
+    return report
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.students < args.capacity:
+        sys.exit('--students must be at least --capacity')
+    report = run(args)
+    print(json.dumps(report, indent=2, default=str))
+    return 1 if report['failures'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
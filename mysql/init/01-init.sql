@@ -3,6 +3,10 @@ CREATE DATABASE IF NOT EXISTS csit_555;
 USE csit_555;
 
 -- Drop tables if they exist (in reverse order of dependencies)
+DROP TABLE IF EXISTS id_sequence;
+DROP TABLE IF EXISTS directory_token;
+DROP TABLE IF EXISTS student_academic_summary;
+DROP TABLE IF EXISTS waitlist;
 DROP TABLE IF EXISTS teaching;
 DROP TABLE IF EXISTS enrolled;
 DROP TABLE IF EXISTS schedule;
@@ -53,6 +57,9 @@ CREATE TABLE courses (
     max_capacity INT DEFAULT 30,
     INDEX idx_course_code (course_code),
     INDEX idx_course_department (department),
+    INDEX idx_course_level_code (level, course_code),
+    INDEX idx_course_level_name (level, course_name),
+    INDEX idx_course_level_credits (level, credits),
     CONSTRAINT chk_course_credits CHECK (credits BETWEEN 1 AND 6),
     CONSTRAINT chk_course_capacity CHECK (max_capacity BETWEEN 5 AND 300)
 );
@@ -67,7 +74,7 @@ CREATE TABLE prerequisite (
     FOREIGN KEY (prerequisite_course_id) REFERENCES courses(course_id) ON DELETE CASCADE ON UPDATE CASCADE
 );
 
--- Removed current_enrollment from schedule table and related constraints
+-- enrolled_count is maintained by the enrolled triggers below
 CREATE TABLE schedule (
     schedule_id VARCHAR(10) PRIMARY KEY,
     course_id VARCHAR(10) NOT NULL,
@@ -77,10 +84,13 @@ CREATE TABLE schedule (
     end_time TIME NOT NULL,
     meeting_days VARCHAR(10) NOT NULL,
     room_number VARCHAR(10) NOT NULL,
+    enrolled_count INT NOT NULL DEFAULT 0,
     FOREIGN KEY (course_id) REFERENCES courses(course_id) ON DELETE CASCADE ON UPDATE CASCADE,
     INDEX idx_schedule_semester (semester, academic_year),
+    INDEX idx_schedule_year (academic_year, semester),
     CONSTRAINT chk_schedule_time CHECK (start_time < end_time),
-    CONSTRAINT chk_schedule_days CHECK (meeting_days REGEXP '^[MTWRF]+$')
+    CONSTRAINT chk_schedule_days CHECK (meeting_days REGEXP '^[MTWRF]+$'),
+    CONSTRAINT chk_schedule_enrolled_count CHECK (enrolled_count >= 0)
 );
 
 -- Create enrolled table 
@@ -108,6 +118,50 @@ CREATE TABLE teaching (
     UNIQUE KEY unique_teaching_assignment (professor_id, schedule_id)
 );
 
+-- Create waitlist table (queue per section, ordered by request time)
+CREATE TABLE waitlist (
+    waitlist_id INT AUTO_INCREMENT PRIMARY KEY,
+    student_id VARCHAR(10) NOT NULL,
+    schedule_id VARCHAR(10) NOT NULL,
+    requested_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    FOREIGN KEY (student_id) REFERENCES student(student_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (schedule_id) REFERENCES schedule(schedule_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    UNIQUE KEY unique_waitlist_entry (student_id, schedule_id),
+    INDEX idx_waitlist_queue (schedule_id, requested_at, waitlist_id)
+);
+
+-- Per-student credit and GPA totals, maintained by the enrolled summary triggers below
+CREATE TABLE student_academic_summary (
+    student_id VARCHAR(10) PRIMARY KEY,
+    completed_credits INT NOT NULL DEFAULT 0,
+    enrolled_credits INT NOT NULL DEFAULT 0,
+    attempted_credits INT NOT NULL DEFAULT 0,
+    graded_credits INT NOT NULL DEFAULT 0,
+    quality_points DECIMAL(8,2) NOT NULL DEFAULT 0,
+    completed_graduate_credits INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (student_id) REFERENCES student(student_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- Prefix-search tokens for the student and professor directory; the primary
+-- key serves `token LIKE 'abc%'` as a range scan. Maintained by the application
+-- (web/services/directory.py); run `flask rebuild-directory-index` after bulk loads
+CREATE TABLE directory_token (
+    person_type VARCHAR(10) NOT NULL,
+    token VARCHAR(100) NOT NULL,
+    person_id VARCHAR(10) NOT NULL,
+    PRIMARY KEY (person_type, token, person_id),
+    INDEX idx_directory_person (person_type, person_id)
+);
+
+-- Next free number of each generated id (ST..., PR..., TA...). Application
+-- workers reserve blocks of numbers from it (web/services/ids.py); rows are
+-- created on first use from the highest id already in the table
+CREATE TABLE id_sequence (
+    name VARCHAR(20) PRIMARY KEY,
+    next_value BIGINT NOT NULL,
+    CONSTRAINT chk_id_sequence_next_value CHECK (next_value > 0)
+);
+
 -- Drop existing triggers if they exist
 
 DROP TRIGGER IF EXISTS before_prerequisite_insert;
@@ -116,12 +170,169 @@ DROP TRIGGER IF EXISTS before_schedule_insert;
 DROP TRIGGER IF EXISTS before_schedule_update;
 DROP TRIGGER IF EXISTS before_student_insert;
 DROP TRIGGER IF EXISTS before_student_update;
+DROP TRIGGER IF EXISTS before_enrolled_insert;
+DROP TRIGGER IF EXISTS before_enrolled_update;
+DROP TRIGGER IF EXISTS after_enrolled_delete;
+DROP TRIGGER IF EXISTS after_enrolled_insert_summary;
+DROP TRIGGER IF EXISTS after_enrolled_update_summary;
+DROP TRIGGER IF EXISTS after_enrolled_delete_summary;
+DROP PROCEDURE IF EXISTS apply_academic_summary_delta;
+DROP PROCEDURE IF EXISTS check_prerequisite_cycle;
 
 -- Create triggers to maintain enrollment counts
 DELIMITER //
 
+-- Claim a seat atomically: the guarded UPDATE only succeeds while seats remain,
+-- so concurrent inserts can never push enrolled_count past max_capacity
+CREATE TRIGGER before_enrolled_insert
+BEFORE INSERT ON enrolled
+FOR EACH ROW
+BEGIN
+    IF NEW.status <=> 'enrolled' THEN
+        UPDATE schedule s JOIN courses c ON c.course_id = s.course_id
+        SET s.enrolled_count = s.enrolled_count + 1
+        WHERE s.schedule_id = NEW.schedule_id AND s.enrolled_count < c.max_capacity;
+        IF ROW_COUNT() = 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot enroll: Course has reached maximum enrollment';
+        END IF;
+    END IF;
+END//
+
+-- Release or claim seats when an enrollment is dropped, withdrawn, completed,
+-- re-enrolled or moved to another section
+CREATE TRIGGER before_enrolled_update
+BEFORE UPDATE ON enrolled
+FOR EACH ROW
+BEGIN
+    DECLARE was_enrolled BOOLEAN DEFAULT (OLD.status <=> 'enrolled');
+    DECLARE is_enrolled BOOLEAN DEFAULT (NEW.status <=> 'enrolled');
+    DECLARE moved BOOLEAN DEFAULT (OLD.schedule_id <> NEW.schedule_id);
+    IF was_enrolled AND (NOT is_enrolled OR moved) THEN
+        UPDATE schedule SET enrolled_count = enrolled_count - 1
+        WHERE schedule_id = OLD.schedule_id AND enrolled_count > 0;
+    END IF;
+    IF is_enrolled AND (NOT was_enrolled OR moved) THEN
+        UPDATE schedule s JOIN courses c ON c.course_id = s.course_id
+        SET s.enrolled_count = s.enrolled_count + 1
+        WHERE s.schedule_id = NEW.schedule_id AND s.enrolled_count < c.max_capacity;
+        IF ROW_COUNT() = 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot enroll: Course has reached maximum enrollment';
+        END IF;
+    END IF;
+END//
+
+-- Note: ON DELETE CASCADE from student does not fire this trigger;
+-- run `flask reconcile-seats` after bulk deletes
+CREATE TRIGGER after_enrolled_delete
+AFTER DELETE ON enrolled
+FOR EACH ROW
+BEGIN
+    IF OLD.status <=> 'enrolled' THEN
+        UPDATE schedule SET enrolled_count = enrolled_count - 1
+        WHERE schedule_id = OLD.schedule_id AND enrolled_count > 0;
+    END IF;
+END//
 
--- Add trigger to prevent self-prerequisites
+-- Add or subtract one enrollment's contribution to the student's academic summary
+CREATE PROCEDURE apply_academic_summary_delta(
+    IN p_student_id VARCHAR(10),
+    IN p_schedule_id VARCHAR(10),
+    IN p_status VARCHAR(10),
+    IN p_grade VARCHAR(2),
+    IN p_sign INT
+)
+BEGIN
+    DECLARE v_credits INT DEFAULT 0;
+    DECLARE v_level VARCHAR(20) DEFAULT NULL;
+    DECLARE v_points DECIMAL(3,1) DEFAULT NULL;
+
+    SELECT c.credits, c.level INTO v_credits, v_level
+    FROM schedule s JOIN courses c ON c.course_id = s.course_id
+    WHERE s.schedule_id = p_schedule_id;
+
+    SET v_points = CASE p_grade
+        WHEN 'A+' THEN 4.0 WHEN 'A' THEN 4.0 WHEN 'A-' THEN 3.7
+        WHEN 'B+' THEN 3.3 WHEN 'B' THEN 3.0 WHEN 'B-' THEN 2.7
+        WHEN 'C+' THEN 2.3 WHEN 'C' THEN 2.0 WHEN 'C-' THEN 1.7
+        WHEN 'D+' THEN 1.3 WHEN 'D' THEN 1.0 WHEN 'F' THEN 0.0
+    END;
+
+    INSERT INTO student_academic_summary (
+        student_id, completed_credits, enrolled_credits, attempted_credits,
+        graded_credits, quality_points, completed_graduate_credits
+    ) VALUES (
+        p_student_id,
+        p_sign * IF(p_status <=> 'completed', v_credits, 0),
+        p_sign * IF(p_status <=> 'enrolled', v_credits, 0),
+        p_sign * IF(p_status <=> 'dropped', 0, v_credits),
+        p_sign * IF(v_points IS NULL, 0, v_credits),
+        p_sign * IFNULL(v_points * v_credits, 0),
+        p_sign * IF(p_status <=> 'completed' AND v_level <=> 'graduate', v_credits, 0)
+    )
+    ON DUPLICATE KEY UPDATE
+        completed_credits = completed_credits + VALUES(completed_credits),
+        enrolled_credits = enrolled_credits + VALUES(enrolled_credits),
+        attempted_credits = attempted_credits + VALUES(attempted_credits),
+        graded_credits = graded_credits + VALUES(graded_credits),
+        quality_points = quality_points + VALUES(quality_points),
+        completed_graduate_credits = completed_graduate_credits + VALUES(completed_graduate_credits);
+END//
+
+CREATE TRIGGER after_enrolled_insert_summary
+AFTER INSERT ON enrolled
+FOR EACH ROW
+BEGIN
+    CALL apply_academic_summary_delta(NEW.student_id, NEW.schedule_id, NEW.status, NEW.grade, 1);
+END//
+
+-- Grade postings and status changes move credits between summary columns
+CREATE TRIGGER after_enrolled_update_summary
+AFTER UPDATE ON enrolled
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.student_id <=> NEW.student_id AND OLD.schedule_id <=> NEW.schedule_id
+            AND OLD.status <=> NEW.status AND OLD.grade <=> NEW.grade) THEN
+        CALL apply_academic_summary_delta(OLD.student_id, OLD.schedule_id, OLD.status, OLD.grade, -1);
+        CALL apply_academic_summary_delta(NEW.student_id, NEW.schedule_id, NEW.status, NEW.grade, 1);
+    END IF;
+END//
+
+-- Note: ON DELETE CASCADE from schedule does not fire this trigger, and
+-- changing a course's credits does not touch enrolled;
+-- run `flask rebuild-academic-summary` after either
+CREATE TRIGGER after_enrolled_delete_summary
+AFTER DELETE ON enrolled
+FOR EACH ROW
+BEGIN
+    CALL apply_academic_summary_delta(OLD.student_id, OLD.schedule_id, OLD.status, OLD.grade, -1);
+END//
+
+-- Reject edges that would close a cycle: the new prerequisite must not already
+-- (transitively) require the course. Keep in step with web/services/prerequisites.py
+CREATE PROCEDURE check_prerequisite_cycle(
+    IN p_course_id VARCHAR(10),
+    IN p_prerequisite_course_id VARCHAR(10),
+    IN p_exclude_id INT
+)
+BEGIN
+    DECLARE v_cycle INT DEFAULT 0;
+
+    WITH RECURSIVE chain (course_id) AS (
+        SELECT prerequisite_course_id FROM prerequisite
+        WHERE course_id = p_prerequisite_course_id AND prerequisite_id <> p_exclude_id
+        UNION
+        SELECT p.prerequisite_course_id FROM prerequisite p
+        JOIN chain ON p.course_id = chain.course_id
+        WHERE p.prerequisite_id <> p_exclude_id
+    )
+    SELECT COUNT(*) INTO v_cycle FROM chain WHERE course_id = p_course_id;
+
+    IF v_cycle > 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Prerequisite would create a cycle';
+    END IF;
+END//
+
+-- Add trigger to prevent self-prerequisites and cycles
 CREATE TRIGGER before_prerequisite_insert
 BEFORE INSERT ON prerequisite
 FOR EACH ROW
@@ -129,8 +340,8 @@ BEGIN
     IF NEW.course_id = NEW.prerequisite_course_id THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'A course cannot be a prerequisite of itself';
     END IF;
-END;
-//
+    CALL check_prerequisite_cycle(NEW.course_id, NEW.prerequisite_course_id, 0);
+END//
 
 CREATE TRIGGER before_prerequisite_update
 BEFORE UPDATE ON prerequisite
@@ -139,6 +350,7 @@ BEGIN
     IF NEW.course_id = NEW.prerequisite_course_id THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'A course cannot be a prerequisite of itself';
     END IF;
+    CALL check_prerequisite_cycle(NEW.course_id, NEW.prerequisite_course_id, OLD.prerequisite_id);
 END//
 
 -- Add triggers to enforce academic_year >= current year
@@ -155,7 +367,8 @@ CREATE TRIGGER before_schedule_update
 BEFORE UPDATE ON schedule
 FOR EACH ROW
 BEGIN
-    IF NEW.academic_year < YEAR(CURRENT_DATE) THEN
+    -- Only check when the year changes so seat counters on past sections can still be updated
+    IF NEW.academic_year <> OLD.academic_year AND NEW.academic_year < YEAR(CURRENT_DATE) THEN
         SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Academic year must be greater than or equal to the current year';
     END IF;
 END//
@@ -0,0 +1,79 @@
+-- Add a denormalized seat counter to schedule
+ALTER TABLE schedule
+ADD COLUMN enrolled_count INT NOT NULL DEFAULT 0,
+ADD CONSTRAINT chk_schedule_enrolled_count CHECK (enrolled_count >= 0);
+
+-- Let seat counters on past sections be updated
+DROP TRIGGER IF EXISTS before_schedule_update;
+DROP TRIGGER IF EXISTS before_enrolled_insert;
+DROP TRIGGER IF EXISTS before_enrolled_update;
+DROP TRIGGER IF EXISTS after_enrolled_delete;
+
+DELIMITER //
+
+CREATE TRIGGER before_schedule_update
+BEFORE UPDATE ON schedule
+FOR EACH ROW
+BEGIN
+    IF NEW.academic_year <> OLD.academic_year AND NEW.academic_year < YEAR(CURRENT_DATE) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Academic year must be greater than or equal to the current year';
+    END IF;
+END//
+
+DELIMITER ;
+
+-- Backfill from existing enrollments
+UPDATE schedule s
+SET s.enrolled_count = (
+    SELECT COUNT(*) FROM enrolled e
+    WHERE e.schedule_id = s.schedule_id AND e.status = 'enrolled'
+);
+
+DELIMITER //
+
+CREATE TRIGGER before_enrolled_insert
+BEFORE INSERT ON enrolled
+FOR EACH ROW
+BEGIN
+    IF NEW.status <=> 'enrolled' THEN
+        UPDATE schedule s JOIN courses c ON c.course_id = s.course_id
+        SET s.enrolled_count = s.enrolled_count + 1
+        WHERE s.schedule_id = NEW.schedule_id AND s.enrolled_count < c.max_capacity;
+        IF ROW_COUNT() = 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot enroll: Course has reached maximum enrollment';
+        END IF;
+    END IF;
+END//
+
+CREATE TRIGGER before_enrolled_update
+BEFORE UPDATE ON enrolled
+FOR EACH ROW
+BEGIN
+    DECLARE was_enrolled BOOLEAN DEFAULT (OLD.status <=> 'enrolled');
+    DECLARE is_enrolled BOOLEAN DEFAULT (NEW.status <=> 'enrolled');
+    DECLARE moved BOOLEAN DEFAULT (OLD.schedule_id <> NEW.schedule_id);
+    IF was_enrolled AND (NOT is_enrolled OR moved) THEN
+        UPDATE schedule SET enrolled_count = enrolled_count - 1
+        WHERE schedule_id = OLD.schedule_id AND enrolled_count > 0;
+    END IF;
+    IF is_enrolled AND (NOT was_enrolled OR moved) THEN
+        UPDATE schedule s JOIN courses c ON c.course_id = s.course_id
+        SET s.enrolled_count = s.enrolled_count + 1
+        WHERE s.schedule_id = NEW.schedule_id AND s.enrolled_count < c.max_capacity;
+        IF ROW_COUNT() = 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot enroll: Course has reached maximum enrollment';
+        END IF;
+    END IF;
+END//
+
+CREATE TRIGGER after_enrolled_delete
+AFTER DELETE ON enrolled
+FOR EACH ROW
+BEGIN
+    IF OLD.status <=> 'enrolled' THEN
+        UPDATE schedule SET enrolled_count = enrolled_count - 1
+        WHERE schedule_id = OLD.schedule_id AND enrolled_count > 0;
+    END IF;
+END//
+
+DELIMITER ;
@@ -0,0 +1,11 @@
+-- Add waitlist table (queue per section, ordered by request time)
+CREATE TABLE IF NOT EXISTS waitlist (
+    waitlist_id INT AUTO_INCREMENT PRIMARY KEY,
+    student_id VARCHAR(10) NOT NULL,
+    schedule_id VARCHAR(10) NOT NULL,
+    requested_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    FOREIGN KEY (student_id) REFERENCES student(student_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (schedule_id) REFERENCES schedule(schedule_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    UNIQUE KEY unique_waitlist_entry (student_id, schedule_id),
+    INDEX idx_waitlist_queue (schedule_id, requested_at, waitlist_id)
+);
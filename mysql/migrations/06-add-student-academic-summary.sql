@@ -0,0 +1,118 @@
+-- Add a materialized per-student academic summary (credits and GPA)
+CREATE TABLE IF NOT EXISTS student_academic_summary (
+    student_id VARCHAR(10) PRIMARY KEY,
+    completed_credits INT NOT NULL DEFAULT 0,
+    enrolled_credits INT NOT NULL DEFAULT 0,
+    attempted_credits INT NOT NULL DEFAULT 0,
+    graded_credits INT NOT NULL DEFAULT 0,
+    quality_points DECIMAL(8,2) NOT NULL DEFAULT 0,
+    completed_graduate_credits INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (student_id) REFERENCES student(student_id) ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+DROP TRIGGER IF EXISTS after_enrolled_insert_summary;
+DROP TRIGGER IF EXISTS after_enrolled_update_summary;
+DROP TRIGGER IF EXISTS after_enrolled_delete_summary;
+DROP PROCEDURE IF EXISTS apply_academic_summary_delta;
+
+-- Backfill from existing enrollments (same rules as `flask rebuild-academic-summary`)
+DELETE FROM student_academic_summary;
+INSERT INTO student_academic_summary (
+    student_id, completed_credits, enrolled_credits, attempted_credits,
+    graded_credits, quality_points, completed_graduate_credits
+)
+SELECT
+    e.student_id,
+    SUM(IF(e.status <=> 'completed', c.credits, 0)),
+    SUM(IF(e.status <=> 'enrolled', c.credits, 0)),
+    SUM(IF(e.status <=> 'dropped', 0, c.credits)),
+    SUM(IF(e.grade IN ('A+','A','A-','B+','B','B-','C+','C','C-','D+','D','F'), c.credits, 0)),
+    SUM(c.credits * CASE e.grade
+        WHEN 'A+' THEN 4.0 WHEN 'A' THEN 4.0 WHEN 'A-' THEN 3.7
+        WHEN 'B+' THEN 3.3 WHEN 'B' THEN 3.0 WHEN 'B-' THEN 2.7
+        WHEN 'C+' THEN 2.3 WHEN 'C' THEN 2.0 WHEN 'C-' THEN 1.7
+        WHEN 'D+' THEN 1.3 WHEN 'D' THEN 1.0 ELSE 0
+    END),
+    SUM(IF(e.status <=> 'completed' AND c.level <=> 'graduate', c.credits, 0))
+FROM enrolled e
+JOIN schedule s ON s.schedule_id = e.schedule_id
+JOIN courses c ON c.course_id = s.course_id
+GROUP BY e.student_id;
+
+DELIMITER //
+
+-- Add or subtract one enrollment's contribution to the student's academic summary
+CREATE PROCEDURE apply_academic_summary_delta(
+    IN p_student_id VARCHAR(10),
+    IN p_schedule_id VARCHAR(10),
+    IN p_status VARCHAR(10),
+    IN p_grade VARCHAR(2),
+    IN p_sign INT
+)
+BEGIN
+    DECLARE v_credits INT DEFAULT 0;
+    DECLARE v_level VARCHAR(20) DEFAULT NULL;
+    DECLARE v_points DECIMAL(3,1) DEFAULT NULL;
+
+    SELECT c.credits, c.level INTO v_credits, v_level
+    FROM schedule s JOIN courses c ON c.course_id = s.course_id
+    WHERE s.schedule_id = p_schedule_id;
+
+    SET v_points = CASE p_grade
+        WHEN 'A+' THEN 4.0 WHEN 'A' THEN 4.0 WHEN 'A-' THEN 3.7
+        WHEN 'B+' THEN 3.3 WHEN 'B' THEN 3.0 WHEN 'B-' THEN 2.7
+        WHEN 'C+' THEN 2.3 WHEN 'C' THEN 2.0 WHEN 'C-' THEN 1.7
+        WHEN 'D+' THEN 1.3 WHEN 'D' THEN 1.0 WHEN 'F' THEN 0.0
+    END;
+
+    INSERT INTO student_academic_summary (
+        student_id, completed_credits, enrolled_credits, attempted_credits,
+        graded_credits, quality_points, completed_graduate_credits
+    ) VALUES (
+        p_student_id,
+        p_sign * IF(p_status <=> 'completed', v_credits, 0),
+        p_sign * IF(p_status <=> 'enrolled', v_credits, 0),
+        p_sign * IF(p_status <=> 'dropped', 0, v_credits),
+        p_sign * IF(v_points IS NULL, 0, v_credits),
+        p_sign * IFNULL(v_points * v_credits, 0),
+        p_sign * IF(p_status <=> 'completed' AND v_level <=> 'graduate', v_credits, 0)
+    )
+    ON DUPLICATE KEY UPDATE
+        completed_credits = completed_credits + VALUES(completed_credits),
+        enrolled_credits = enrolled_credits + VALUES(enrolled_credits),
+        attempted_credits = attempted_credits + VALUES(attempted_credits),
+        graded_credits = graded_credits + VALUES(graded_credits),
+        quality_points = quality_points + VALUES(quality_points),
+        completed_graduate_credits = completed_graduate_credits + VALUES(completed_graduate_credits);
+END//
+
+CREATE TRIGGER after_enrolled_insert_summary
+AFTER INSERT ON enrolled
+FOR EACH ROW
+BEGIN
+    CALL apply_academic_summary_delta(NEW.student_id, NEW.schedule_id, NEW.status, NEW.grade, 1);
+END//
+
+-- Grade postings and status changes move credits between summary columns
+CREATE TRIGGER after_enrolled_update_summary
+AFTER UPDATE ON enrolled
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.student_id <=> NEW.student_id AND OLD.schedule_id <=> NEW.schedule_id
+            AND OLD.status <=> NEW.status AND OLD.grade <=> NEW.grade) THEN
+        CALL apply_academic_summary_delta(OLD.student_id, OLD.schedule_id, OLD.status, OLD.grade, -1);
+        CALL apply_academic_summary_delta(NEW.student_id, NEW.schedule_id, NEW.status, NEW.grade, 1);
+    END IF;
+END//
+
+-- Note: ON DELETE CASCADE from schedule does not fire this trigger, and
+-- changing a course's credits does not touch enrolled;
+-- run `flask rebuild-academic-summary` after either
+CREATE TRIGGER after_enrolled_delete_summary
+AFTER DELETE ON enrolled
+FOR EACH ROW
+BEGIN
+    CALL apply_academic_summary_delta(OLD.student_id, OLD.schedule_id, OLD.status, OLD.grade, -1);
+END//
+
+DELIMITER ;
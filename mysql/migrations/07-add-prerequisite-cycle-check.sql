@@ -0,0 +1,64 @@
+-- Reject prerequisite cycles in the database as well as in the application
+DROP TRIGGER IF EXISTS before_prerequisite_insert;
+DROP TRIGGER IF EXISTS before_prerequisite_update;
+DROP PROCEDURE IF EXISTS check_prerequisite_cycle;
+
+-- Existing cycles (if any) must be removed by hand before this migration;
+-- this lists every course that can reach itself
+WITH RECURSIVE chain (start_id, course_id) AS (
+    SELECT course_id, prerequisite_course_id FROM prerequisite
+    UNION
+    SELECT chain.start_id, p.prerequisite_course_id FROM prerequisite p
+    JOIN chain ON p.course_id = chain.course_id
+)
+SELECT DISTINCT start_id AS course_in_cycle FROM chain WHERE start_id = course_id;
+
+DELIMITER //
+
+-- Reject edges that would close a cycle: the new prerequisite must not already
+-- (transitively) require the course. Keep in step with web/services/prerequisites.py
+CREATE PROCEDURE check_prerequisite_cycle(
+    IN p_course_id VARCHAR(10),
+    IN p_prerequisite_course_id VARCHAR(10),
+    IN p_exclude_id INT
+)
+BEGIN
+    DECLARE v_cycle INT DEFAULT 0;
+
+    WITH RECURSIVE chain (course_id) AS (
+        SELECT prerequisite_course_id FROM prerequisite
+        WHERE course_id = p_prerequisite_course_id AND prerequisite_id <> p_exclude_id
+        UNION
+        SELECT p.prerequisite_course_id FROM prerequisite p
+        JOIN chain ON p.course_id = chain.course_id
+        WHERE p.prerequisite_id <> p_exclude_id
+    )
+    SELECT COUNT(*) INTO v_cycle FROM chain WHERE course_id = p_course_id;
+
+    IF v_cycle > 0 THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Prerequisite would create a cycle';
+    END IF;
+END//
+
+-- Add trigger to prevent self-prerequisites and cycles
+CREATE TRIGGER before_prerequisite_insert
+BEFORE INSERT ON prerequisite
+FOR EACH ROW
+BEGIN
+    IF NEW.course_id = NEW.prerequisite_course_id THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'A course cannot be a prerequisite of itself';
+    END IF;
+    CALL check_prerequisite_cycle(NEW.course_id, NEW.prerequisite_course_id, 0);
+END//
+
+CREATE TRIGGER before_prerequisite_update
+BEFORE UPDATE ON prerequisite
+FOR EACH ROW
+BEGIN
+    IF NEW.course_id = NEW.prerequisite_course_id THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'A course cannot be a prerequisite of itself';
+    END IF;
+    CALL check_prerequisite_cycle(NEW.course_id, NEW.prerequisite_course_id, OLD.prerequisite_id);
+END//
+
+DELIMITER ;
@@ -0,0 +1,9 @@
+-- Composite indexes for the keyset-paginated student catalog: every sort
+-- option is reachable in index order after the course level filter
+ALTER TABLE courses
+    ADD INDEX idx_course_level_code (level, course_code),
+    ADD INDEX idx_course_level_name (level, course_name),
+    ADD INDEX idx_course_level_credits (level, credits);
+
+ALTER TABLE schedule
+    ADD INDEX idx_schedule_year (academic_year, semester);
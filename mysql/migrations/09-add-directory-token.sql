@@ -0,0 +1,9 @@
+-- Prefix-search token table for the admin student and professor directory.
+-- Fill it afterwards with `flask rebuild-directory-index`
+CREATE TABLE IF NOT EXISTS directory_token (
+    person_type VARCHAR(10) NOT NULL,
+    token VARCHAR(100) NOT NULL,
+    person_id VARCHAR(10) NOT NULL,
+    PRIMARY KEY (person_type, token, person_id),
+    INDEX idx_directory_person (person_type, person_id)
+);
@@ -0,0 +1,8 @@
+-- Block-reserved sequences for generated student, professor and teaching ids.
+-- Rows are created by the application on first use, numbered after the
+-- highest existing id
+CREATE TABLE IF NOT EXISTS id_sequence (
+    name VARCHAR(20) PRIMARY KEY,
+    next_value BIGINT NOT NULL,
+    CONSTRAINT chk_id_sequence_next_value CHECK (next_value > 0)
+);
@@ -0,0 +1,43 @@
+import pytest
+from flask_login import LoginManager
+from flask_wtf.csrf import CSRFProtect
+from web import create_app, identity
+from web.models import db
+from web.services.prerequisites import invalidate_prerequisite_graph
+from web.services.stats import invalidate_dashboard_stats
+from web.services.search import invalidate_course_index
+
+def make_app(directory, **config):
+    """The app on the SQLite database in `directory`, with file sessions next to it"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{directory / 'test.db'}",
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30, 'check_same_thread': False}},
+        'WTF_CSRF_ENABLED': False,
+        'SESSION_FILE_DIR': str(directory / 'sessions'),
+        'IDENTITY_CACHE_TTL': 0,
+        **config,
+    })
+    # Installed by web/app.py rather than the factory
+    CSRFProtect(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(identity.load_user)
+    return app
+
+@pytest.fixture
+def app(tmp_path):
+    """The app on a fresh SQLite database"""
+    app = make_app(tmp_path)
+    # Per-process caches would otherwise outlive the previous test's database
+    invalidate_prerequisite_graph()
+    invalidate_dashboard_stats()
+    invalidate_course_index()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,17 @@
+import pytest
+from web.services.catalog import encode_cursor, decode_cursor
+
+@pytest.mark.parametrize('value', ['CS101', 3, 2.5, None])
+def test_cursor_round_trip(value):
+    assert decode_cursor(encode_cursor(value, 'SC001')) == (value, 'SC001')
+
+@pytest.mark.parametrize('cursor', [
+    encode_cursor({}, 'SC001'),
+    encode_cursor([], 'SC001'),
+    encode_cursor(True, 'SC001'),
+    encode_cursor('CS101', 7),
+    'not base64!',
+    '',
+])
+def test_malformed_cursor_is_ignored(cursor):
+    assert decode_cursor(cursor) is None
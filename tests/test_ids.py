@@ -0,0 +1,80 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import pytest
+from conftest import make_app
+from web.models import db, Student
+from web.services.ids import next_id, reserve_ids
+
+THREADS = 8
+DRAWS = 150
+BLOCK_SIZE = 5
+
+def add_student(student_id=None, name='Hand'):
+    student = Student(student_id=student_id, first_name=name, last_name='Typed', major='History',
+                      email=f'{name.lower()}@example.edu', date_of_birth=date(2000, 1, 1))
+    db.session.add(student)
+    return student
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path, ID_BLOCK_SIZE=BLOCK_SIZE)
+    with app.app_context():
+        db.create_all()
+        add_student('ST005')
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+def draw_ids(app, threads=THREADS):
+    """Ids drawn by `threads` threads at once, each mixing next_id and reserve_ids"""
+    drawn = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def run():
+        with app.app_context():
+            start.wait()
+            ids = [next_id('student') for _ in range(DRAWS)] + reserve_ids('student', 7)
+        with lock:
+            drawn.extend(ids)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return drawn
+
+def draw_ids_in_process(directory):
+    app = make_app(directory, ID_BLOCK_SIZE=BLOCK_SIZE)
+    return draw_ids(app, threads=2)
+
+def test_threads_never_share_an_id(app):
+    ids = draw_ids(app)
+    assert len(ids) == THREADS * (DRAWS + 7)
+    assert len(set(ids)) == len(ids)
+    assert 'ST005' not in ids
+
+def test_processes_never_share_an_id(app, tmp_path):
+    processes = 4
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        results = list(pool.map(draw_ids_in_process, [tmp_path] * processes))
+    ids = [new_id for result in results for new_id in result]
+    assert len(ids) == processes * 2 * (DRAWS + 7)
+    assert len(set(ids)) == len(ids)
+    assert 'ST005' not in ids
+
+def test_rolled_back_insert_does_not_leave_a_reusable_block(app):
+    add_student(name='Rolled')
+    db.session.flush()
+    db.session.rollback()
+
+    reserved = reserve_ids('student', BLOCK_SIZE)
+    inserted = [add_student(name=f'Inserted{n}') for n in range(BLOCK_SIZE)]
+    db.session.commit()
+    inserted = [student.student_id for student in inserted]
+    assert not set(reserved) & set(inserted)
+    assert len(set(inserted)) == BLOCK_SIZE
@@ -0,0 +1,55 @@
+import pytest
+from web.models import db, Course, Prerequisite
+from web.services.prerequisites import PrerequisiteCycleError, get_prerequisite_graph
+
+@pytest.fixture
+def courses(app):
+    for code in ('A', 'B', 'C'):
+        db.session.add(Course(course_id=code, course_code=f'CS{code}', course_name=f'Course {code}',
+                              credits=3, department='Computer Science'))
+    db.session.commit()
+
+def edges():
+    return {(p.course_id, p.prerequisite_course_id) for p in Prerequisite.query}
+
+def test_cycle_within_one_flush_is_rejected(courses):
+    db.session.add(Prerequisite(course_id='A', prerequisite_course_id='B'))
+    db.session.add(Prerequisite(course_id='B', prerequisite_course_id='A'))
+    with pytest.raises(PrerequisiteCycleError):
+        db.session.commit()
+    db.session.rollback()
+    assert edges() == set()
+
+def test_cycle_through_stored_edges_is_rejected(courses):
+    db.session.add_all([Prerequisite(course_id='A', prerequisite_course_id='B'),
+                        Prerequisite(course_id='B', prerequisite_course_id='C')])
+    db.session.commit()
+    db.session.add(Prerequisite(course_id='C', prerequisite_course_id='A'))
+    with pytest.raises(PrerequisiteCycleError) as error:
+        db.session.commit()
+    assert error.value.path == ['A', 'B', 'C']
+    db.session.rollback()
+    assert edges() == {('A', 'B'), ('B', 'C')}
+
+def test_updated_edge_is_checked_without_its_old_version(courses):
+    edge = Prerequisite(course_id='A', prerequisite_course_id='B')
+    db.session.add(edge)
+    db.session.commit()
+    edge.course_id, edge.prerequisite_course_id = 'B', 'A'
+    db.session.commit()
+    assert edges() == {('B', 'A')}
+
+def test_savepoint_rollback_keeps_the_outer_change(courses):
+    assert not get_prerequisite_graph().requires_course('A', 'B')
+    db.session.add(Prerequisite(course_id='A', prerequisite_course_id='B'))
+    db.session.flush()
+    db.session.begin_nested().rollback()
+    db.session.commit()
+    assert get_prerequisite_graph().requires_course('A', 'B')
+
+def test_rollback_discards_the_change(courses):
+    get_prerequisite_graph()
+    db.session.add(Prerequisite(course_id='A', prerequisite_course_id='B'))
+    db.session.flush()
+    db.session.rollback()
+    assert 'prerequisites_changed' not in db.session.info
@@ -0,0 +1,53 @@
+from datetime import date, time
+import pytest
+from flask_login import login_user
+from web.models import db, Student, Professor, Course, Schedule, Teaching, Enrolled, Semester
+from web.profiling import track_queries
+from web.routes import professor_routes
+
+SECTIONS = 6
+
+def add_professor(professor_id, sections):
+    db.session.add(Professor(professor_id=professor_id, first_name='Grace', last_name=f'Hopper {professor_id}',
+                             email=f'{professor_id.lower()}@example.edu', department='Computer Science',
+                             hire_date=date(2010, 1, 1)))
+    for n in range(sections):
+        course_id = f'{professor_id}C{n}'
+        db.session.add(Course(course_id=course_id, course_code=f'CS{course_id}', course_name=f'Course {course_id}',
+                              credits=3, department='Computer Science', max_capacity=30))
+        schedule_id = f'{professor_id}S{n}'
+        db.session.add(Schedule(schedule_id=schedule_id, course_id=course_id, semester=Semester.Fall,
+                                academic_year=2030, start_time=time(9 + n), end_time=time(10 + n),
+                                meeting_days='MWF', room_number='101'))
+        db.session.add(Teaching(teaching_id=f'{professor_id}T{n}', professor_id=professor_id, schedule_id=schedule_id))
+        # Sections of different sizes, so per-row lazy loads would show up in the count
+        for s in range(n + 2):
+            student_id = f'{professor_id}{n}ST{s}'
+            db.session.add(Student(student_id=student_id, first_name='Alan', last_name=f'Student {s}',
+                                   email=f'{student_id.lower()}@example.edu', major='Computer Science',
+                                   date_of_birth=date(2000, 1, 1)))
+            db.session.add(Enrolled(student_id=student_id, schedule_id=schedule_id))
+    db.session.commit()
+
+def count_queries(app, view, professor_id, **kwargs):
+    db.session.remove()
+    with app.test_request_context():
+        login_user(db.session.get(Professor, professor_id))
+        with track_queries() as stats:
+            view(**kwargs)
+    return stats.count
+
+@pytest.mark.parametrize('view, needs_schedule', [
+    (professor_routes.dashboard, False),
+    (professor_routes.schedule, False),
+    (professor_routes.course_management, False),
+    (professor_routes.view_course, True),
+])
+def test_professor_views_run_constant_queries(app, view, needs_schedule):
+    add_professor('P1', 1)
+    add_professor('PN', SECTIONS)
+    counts = [
+        count_queries(app, view, professor_id, **({'schedule_id': schedule_id} if needs_schedule else {}))
+        for professor_id, schedule_id in (('P1', 'P1S0'), ('PN', f'PNS{SECTIONS - 1}'))
+    ]
+    assert counts[0] == counts[1], f'{view.__name__}: {counts[0]} queries for 1 section, {counts[1]} for {SECTIONS}'
@@ -0,0 +1,39 @@
+import pytest
+from flask import Response, stream_with_context
+from web.models import db, Course
+from web.profiling import QueryBudgetExceeded
+
+QUERIES = 3
+
+@pytest.fixture
+def app(app):
+    def count_courses():
+        return str(sum(db.session.scalar(db.select(db.func.count()).select_from(Course)) for _ in range(QUERIES)))
+
+    def stream_courses():
+        return Response(stream_with_context(
+            f'{db.session.scalar(db.select(db.func.count()).select_from(Course))}\n' for _ in range(QUERIES)
+        ))
+
+    app.add_url_rule('/test/count', 'count_courses', count_courses)
+    app.add_url_rule('/test/stream', 'stream_courses', stream_courses)
+    return app
+
+def test_query_count_header(client):
+    response = client.get('/test/count')
+    assert response.headers['X-Query-Count'] == str(QUERIES)
+    assert f'{QUERIES} queries' in response.headers['Server-Timing']
+
+def test_streamed_response_has_no_count_header(client):
+    response = client.get('/test/stream')
+    response.get_data()
+    response.close()
+    assert 'X-Query-Count' not in response.headers
+    assert 'Server-Timing' not in response.headers
+
+def test_streamed_response_is_checked_against_budget_on_close(app, client):
+    app.config['QUERY_BUDGETS'] = {'stream_courses': QUERIES - 1}
+    response = client.get('/test/stream')
+    response.get_data()
+    with pytest.raises(QueryBudgetExceeded, match=f'ran {QUERIES} queries'):
+        response.close()
@@ -0,0 +1,44 @@
+from web.models import db, Course
+from web.services.search import search_course_ids
+
+def add_course(course_id, name):
+    course = Course(course_id=course_id, course_code=f'CS{course_id}', course_name=name, credits=3,
+                    department='Computer Science')
+    db.session.add(course)
+    return course
+
+def test_committed_changes_reach_the_index(app):
+    assert search_course_ids('compilers') == []
+    course = add_course('C1', 'Compilers')
+    db.session.commit()
+    assert search_course_ids('compilers') == ['C1']
+    course.course_name = 'Operating Systems'
+    db.session.commit()
+    assert search_course_ids('compilers') == []
+    assert search_course_ids('operating') == ['C1']
+
+def test_savepoint_rollback_keeps_the_outer_changes(app):
+    search_course_ids('anything')
+    add_course('C1', 'Compilers')
+    db.session.flush()
+    db.session.begin_nested().rollback()
+    db.session.commit()
+    assert search_course_ids('compilers') == ['C1']
+
+def test_savepoint_rollback_drops_only_its_own_changes(app):
+    course = add_course('C1', 'Compilers')
+    db.session.commit()
+    search_course_ids('anything')
+
+    course.course_name = 'Databases'
+    db.session.flush()
+    savepoint = db.session.begin_nested()
+    course.course_name = 'Networks'
+    add_course('C2', 'Graphics')
+    db.session.flush()
+    savepoint.rollback()
+    db.session.commit()
+
+    assert search_course_ids('databases') == ['C1']
+    assert search_course_ids('networks') == []
+    assert search_course_ids('graphics') == []
@@ -0,0 +1,53 @@
+from datetime import date
+from web.identity import identity_cache
+from web.models import db, Student, Professor
+
+def add_people():
+    db.session.add(Student(student_id='ST001', first_name='Ada', last_name='Lovelace', email='ada@example.edu',
+                           major='Mathematics', date_of_birth=date(2000, 1, 1)))
+    db.session.add(Professor(professor_id='PR001', first_name='Alan', last_name='Turing', email='alan@example.edu',
+                             department='Computer Science', hire_date=date(2010, 1, 1)))
+    db.session.commit()
+
+def session_id(client, app):
+    cookie = client.get_cookie(app.config['SESSION_COOKIE_NAME'])
+    return cookie.value if cookie else None
+
+def start_anonymous_session(client, app):
+    with client.session_transaction() as session:
+        session['visited'] = True
+    return session_id(client, app)
+
+def test_login_moves_session_to_new_id(app, client):
+    add_people()
+    store = app.extensions['server_session'].store
+    for user_type, user_id in (('student', 'ST001'), ('professor', 'PR001')):
+        client.get('/logout')
+        before = start_anonymous_session(client, app)
+        assert before and store.get(before) is not None
+
+        response = client.post('/login', data={'user_id': user_id, 'user_type': user_type})
+        assert response.status_code == 302
+
+        after = session_id(client, app)
+        assert after and after != before
+        assert store.get(before) is None
+        with client.session_transaction() as session:
+            assert session['user_type'] == user_type
+            assert session['visited']
+
+def test_logout_discards_session_id(app, client):
+    add_people()
+    store = app.extensions['server_session'].store
+    client.post('/login', data={'user_id': 'ST001', 'user_type': 'student'})
+    logged_in = session_id(client, app)
+    client.get('/logout')
+    assert store.get(logged_in) is None
+
+def test_login_loads_user_through_identity_cache(app, client, monkeypatch):
+    add_people()
+    monkeypatch.setattr(identity_cache, 'ttl', 60)
+    identity_cache.clear()
+    client.post('/login', data={'user_id': 'PR001', 'user_type': 'professor'})
+    assert identity_cache.get(('professor', 'PR001'))['email'] == 'alan@example.edu'
+    identity_cache.clear()
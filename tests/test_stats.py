@@ -0,0 +1,22 @@
+from datetime import date
+from web.models import db, Student
+from web.services.stats import get_dashboard_stats
+
+def add_student(student_id):
+    db.session.add(Student(student_id=student_id, first_name='Ada', last_name='Lovelace', major='Mathematics',
+                           email=f'{student_id.lower()}@example.edu', date_of_birth=date(2000, 1, 1)))
+
+def test_commit_invalidates_cached_stats(app):
+    assert get_dashboard_stats()['total_students'] == 0
+    add_student('ST001')
+    db.session.commit()
+    assert get_dashboard_stats()['total_students'] == 1
+
+def test_savepoint_rollback_keeps_the_outer_change(app):
+    assert get_dashboard_stats()['total_students'] == 0
+    add_student('ST001')
+    db.session.flush()
+    # As promote_from_waitlist does when a promotion fails
+    db.session.begin_nested().rollback()
+    db.session.commit()
+    assert get_dashboard_stats()['total_students'] == 1
@@ -0,0 +1,18 @@
+import pytest
+from test_sessions import add_people
+
+@pytest.mark.parametrize('body, message', [
+    ([1, 2], 'Send the request as a JSON object.'),
+    ({'course_ids': 'CS101'}, 'course_ids must be a list of course ids.'),
+    ({'course_ids': [['CS101']]}, 'course_ids must be a list of course ids.'),
+    ({'course_ids': []}, 'Choose at least one course.'),
+    ({'course_ids': ['CS101'], 'academic_year': 'abc'}, 'academic_year must be a whole number.'),
+    ({'course_ids': ['CS101'], 'academic_year': True}, 'academic_year must be a whole number.'),
+    ({'course_ids': ['CS101'], 'top_k': 'many'}, 'top_k must be a whole number.'),
+])
+def test_timetable_builder_rejects_malformed_json(app, client, body, message):
+    add_people()
+    client.post('/login', data={'user_id': 'ST001', 'user_type': 'student'})
+    response = client.post('/student/timetable-builder', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
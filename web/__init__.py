@@ -10,6 +10,10 @@ import os
 from dotenv import load_dotenv
 from .config import Config
 from flask_migrate import Migrate
+from .commands import register_commands
+from .profiling import QueryProfiler
+from . import identity
+from .sessions import ServerSession
 
 # Load environment variables from .env
 load_dotenv()
@@ -17,12 +21,20 @@ load_dotenv()
 def create_app(config=None):
     app = Flask(__name__)
     
-    # Load the configuration
+    # Load the configuration, then apply any overrides (a config class or a dict)
     app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
     
     # Initialize extensions
     db.init_app(app)
     migrate = Migrate(app, db)
+    register_commands(app)
+    QueryProfiler(app)
+    identity.init_app(app)
+    ServerSession(app)
     
     # Register blueprints
     app.register_blueprint(auth)
@@ -4,6 +4,10 @@ from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from web.models import db, Student, Professor
 from web.config import Config
+from web.commands import register_commands
+from web.profiling import QueryProfiler
+from web import identity
+from web.sessions import ServerSession
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -11,10 +15,21 @@ app.config.from_object(Config)
 # Initialize extensions
 db.init_app(app)
 
+register_commands(app)
+
+# Per-request SQL counters, Server-Timing headers and slow-request logging
+QueryProfiler(app)
+
+# Keep session data server-side; the cookie only holds the session id
+ServerSession(app)
+
 # Initialize CSRF protection
 csrf = CSRFProtect()
 csrf.init_app(app)
 
+# Cache the logged-in student/professor (see web/identity.py)
+identity.init_app(app)
+
 # Initialize Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -22,9 +37,8 @@ login_manager.login_view = 'auth.login'  # Redirect to login page if not authent
 
 @login_manager.user_loader
 def load_user(user_id):
-    # Check if the user is a student or professor
-    user = Student.query.get(user_id) or Professor.query.get(user_id)
-    return user
+    # The id carries the user type, so only one table is queried (and usually none)
+    return identity.load_user(user_id)
 
 # Add teardown context
 @app.teardown_appcontext
@@ -5,26 +5,16 @@ from datetime import datetime
 from web.models import db, Student, StudentStatus, Schedule, Professor, Enrolled, Course, CourseLevel
 from web.forms import StudentForm, ProfessorForm, CourseForm
 from web.utils.decorators import admin_required
+from web.services.stats import get_dashboard_stats
 from sqlalchemy.exc import IntegrityError
 
 admin = Blueprint('admin', __name__, url_prefix='/admin')
 
-def current_year():
-    return datetime.now().year
-
 @admin.route('/dashboard')
 @login_required
 @admin_required
 def dashboard():
-    stats = {
-        'total_students': Student.query.count(),
-        'active_courses': Schedule.query.filter_by(academic_year=current_year()).count(),
-        'total_professors': Professor.query.count(),
-        'active_enrollments': Enrolled.query.join(Schedule).filter(
-            Schedule.academic_year == current_year()
-        ).count()
-    }
-    return render_template('admin/dashboard.html', stats=stats)
+    return render_template('admin/dashboard.html', stats=get_dashboard_stats())
 
 @admin.route('/students')
 @login_required
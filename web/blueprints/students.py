@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from sqlalchemy import or_
 from web.models import Course, Schedule, Professor, Student, Enrolled, CourseLevel, Semester
 from web.extensions import db
+from web.services.waitlist import register_or_waitlist, promote_from_waitlist
 from datetime import datetime
 from werkzeug.security import check_password_hash, generate_password_hash
 from web.forms import ProfileForm
@@ -87,36 +88,13 @@ def register_course():
         flash('Invalid course selection.', 'error')
         return redirect(url_for('students.available_courses'))
     
-    schedule = Schedule.query.get_or_404(schedule_id)
-    
-    # Check if already enrolled
-    existing_enrollment = Enrolled.query.filter_by(
-        student_id=current_user.id,
-        schedule_id=schedule_id
-    ).first()
-    
-    if existing_enrollment:
-        flash('You are already enrolled in this course.', 'error')
-        return redirect(url_for('students.available_courses'))
-    
-    # Check if course is full
-    if schedule.current_enrollment >= schedule.max_enrollment:
-        flash('This course is full.', 'error')
-        return redirect(url_for('students.available_courses'))
-    
-    # Create new enrollment
-    enrollment = Enrolled(
-        student_id=current_user.id,
-        schedule_id=schedule_id,
-        enrollment_date=datetime.now()
-    )
-    
-    # Increment current enrollment
-    schedule.current_enrollment += 1
+    student = Student.query.get_or_404(current_user.id)
     
     try:
-        db.session.add(enrollment)
-        db.session.commit()
+        verdict = register_or_waitlist(student, schedule_id)
+        if not verdict.ok:
+            flash(verdict.message, 'info' if verdict.reason == 'waitlisted' else 'error')
+            return redirect(url_for('students.available_courses'))
         flash('Successfully registered for the course.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -138,11 +116,9 @@ def drop_course():
         schedule_id=schedule_id
     ).first_or_404()
     
-    schedule = Schedule.query.get(schedule_id)
-    schedule.current_enrollment -= 1
-    
     try:
         db.session.delete(enrollment)
+        promote_from_waitlist(schedule_id)
         db.session.commit()
         flash('Successfully dropped the course.', 'success')
     except Exception as e:
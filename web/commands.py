@@ -0,0 +1,222 @@
+import click
+from flask.cli import with_appcontext
+
+@click.command('reconcile-seats')
+@click.option('--dry-run', is_flag=True, help='Only report schedules whose seat counter has drifted.')
+@with_appcontext
+def reconcile_seats_command(dry_run):
+    """Repair schedule.enrolled_count from the enrolled table."""
+    from .services.seats import find_seat_drift, reconcile_seat_counts
+
+    drift = find_seat_drift()
+    for schedule_id, stored, actual in drift:
+        click.echo(f'{schedule_id}: stored {stored}, actual {actual}')
+    if dry_run:
+        click.echo(f'{len(drift)} schedule(s) out of sync.')
+        return
+    repaired = reconcile_seat_counts()
+    click.echo(f'Repaired {repaired} schedule(s).')
+
+@click.command('rebuild-academic-summary')
+@click.option('--student', 'student_ids', multiple=True, help='Only rebuild these student ids (repeatable).')
+@with_appcontext
+def rebuild_academic_summary_command(student_ids):
+    """Recompute student_academic_summary from the enrolled table."""
+    from .services.academic_summary import rebuild_academic_summaries
+
+    rebuilt = rebuild_academic_summaries(student_ids or None)
+    click.echo(f'Rebuilt {rebuilt} academic summary row(s).')
+
+@click.command('rebuild-directory-index')
+@click.option('--type', 'person_types', type=click.Choice(['student', 'professor']), multiple=True,
+              help='Only rebuild this directory (repeatable).')
+@with_appcontext
+def rebuild_directory_index_command(person_types):
+    """Regenerate the student/professor search tokens."""
+    from .services.directory import rebuild_directory_index
+
+    written = rebuild_directory_index(person_types or None)
+    click.echo(f'Wrote {written} directory token(s).')
+
+@click.command('seed')
+@click.option('--students', default=10000, show_default=True, help='Number of students.')
+@click.option('--professors', default=300, show_default=True, help='Number of professors.')
+@click.option('--courses', default=2000, show_default=True, help='Number of courses.')
+@click.option('--sections', default=2, show_default=True, help='Sections per course.')
+@click.option('--prerequisites', default=3, show_default=True, help='Maximum prerequisites per course.')
+@click.option('--years', default=2, show_default=True, help='Academic years of schedules, starting with this one.')
+@click.option('--seed', 'random_seed', default=355, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--prefix', default='SY', show_default=True, help='Id prefix (max 2 characters) marking generated rows.')
+@click.option('--method', type=click.Choice(['executemany', 'load-data']), default='executemany', show_default=True,
+              help='load-data uses MySQL LOAD DATA LOCAL INFILE (server needs local_infile=ON).')
+@click.option('--batch-size', type=int, help='Rows per batch (default 5000, or 100000 with load-data).')
+@click.option('--clear', is_flag=True, help='Delete rows from a previous run with the same prefix first.')
+@with_appcontext
+def seed_command(students, professors, courses, sections, prerequisites, years, random_seed, prefix, method,
+                 batch_size, clear):
+    """Generate a synthetic university dataset."""
+    import time
+    from .seeding import SeedSpec, ExecutemanyWriter, LoadDataWriter, seed_database, clear_synthetic_data
+
+    spec = SeedSpec(students=students, professors=professors, courses=courses, sections_per_course=sections,
+                    max_prerequisites=prerequisites, years=years, seed=random_seed, prefix=prefix)
+    if clear:
+        click.echo(f'Clearing rows with prefix {prefix}')
+        clear_synthetic_data(prefix)
+    if method == 'load-data':
+        writer = LoadDataWriter(batch_size or 100000)
+    else:
+        writer = ExecutemanyWriter(batch_size or 5000)
+
+    started = time.perf_counter()
+    try:
+        counts = seed_database(spec, writer=writer, echo=click.echo)
+    finally:
+        if hasattr(writer, 'close'):
+            writer.close()
+    for table, count in counts.items():
+        click.echo(f'{table}: {count}')
+    click.echo(f'Done in {time.perf_counter() - started:.1f}s.')
+
+@click.command('export-tables')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True, allow_dash=True))
+@click.option('--table', 'tables', multiple=True, help='Only export this table (repeatable; default all).')
+@click.option('--archive', type=click.Choice(['zip', 'tar', 'tar.gz']), default='zip', show_default=True)
+@click.option('--format', 'member_format', type=click.Choice(['csv', 'jsonl']), default='csv', show_default=True)
+@click.option('--semester', type=click.Choice(['Fall', 'Spring', 'Summer']), help='Only sections (and their enrollments/teaching) in this semester.')
+@click.option('--year', 'academic_year', type=int, help='Only sections in this academic year.')
+@click.option('--department', help='Only rows belonging to this department (student major for students).')
+@with_appcontext
+def export_tables_command(output, tables, archive, member_format, semester, academic_year, department):
+    """Stream tables into a zip or tar archive (OUTPUT, or - for stdout)."""
+    import time
+    from .services.exports import archive_chunks, check_archive_request, ExportFormatError
+
+    try:
+        check_archive_request(tables, archive, member_format)
+    except ExportFormatError as e:
+        raise click.UsageError(str(e))
+    counts = {}
+    started = time.perf_counter()
+    with click.open_file(output, 'wb') as f:
+        for chunk in archive_chunks(tables, archive, member_format, counts=counts, semester=semester,
+                                    academic_year=academic_year, department=department):
+            f.write(chunk)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    for table, count in counts.items():
+        click.echo(f'{table}: {count}', err=True)
+    click.echo(f'{total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s).', err=True)
+
+@click.command('import-roster')
+@click.argument('kind', type=click.Choice(['students', 'professors', 'enrollments']))
+@click.argument('file', type=click.File('rb'))
+@click.option('--dry-run', is_flag=True, help='Validate the file without writing anything.')
+@click.option('--report', type=click.Path(dir_okay=False, writable=True), help='Write the rejected rows to this CSV.')
+@with_appcontext
+def import_roster_command(kind, file, dry_run, report):
+    """Bulk-load students, professors or enrollments from a CSV or .xlsx FILE."""
+    import time
+    from .services.roster_import import import_roster, error_report_chunks, RosterImportError
+
+    started = time.perf_counter()
+    try:
+        result = import_roster(kind, file, file.name, dry_run=dry_run)
+    except RosterImportError as e:
+        raise click.ClickException(str(e))
+    elapsed = time.perf_counter() - started
+    verb = 'valid' if dry_run else 'imported'
+    click.echo(f"{result['inserted']} of {result['rows']} rows {verb}, {len(result['errors'])} error(s) "
+               f"in {elapsed:.1f}s.")
+    if report and result['errors']:
+        with open(report, 'wb') as f:
+            for chunk in error_report_chunks(result['errors']):
+                f.write(chunk)
+        click.echo(f'Errors written to {report}.')
+    else:
+        for error in result['errors'][:20]:
+            click.echo(f"line {error['line']}: {error['field']}: {error['message']}", err=True)
+
+@click.command('backup-db')
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--base', type=click.Path(file_okay=False, exists=True),
+              help='Earlier backup to make this one incremental against.')
+@click.option('--table', 'tables', multiple=True, help='Only back up this table (repeatable; full backups only).')
+@click.option('--workers', default=4, show_default=True, help='Tables dumped in parallel (MySQL).')
+@with_appcontext
+def backup_db_command(directory, base, tables, workers):
+    """Write an online, consistent backup of the database into DIRECTORY."""
+    import time
+    from .services.backup import create_backup, BackupError
+
+    started = time.perf_counter()
+    try:
+        manifest = create_backup(directory, base=base, tables=tables, workers=workers, echo=click.echo)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    rows = sum(entry['rows'] for entry in manifest['tables'].values())
+    size = sum(entry['bytes'] for entry in manifest['tables'].values())
+    click.echo(f"{manifest['type'].capitalize()} backup: {rows} rows, {size / 1048576:.1f} MiB "
+               f"in {time.perf_counter() - started:.1f}s.")
+
+@click.command('verify-backup')
+@click.argument('directory', type=click.Path(file_okay=False, exists=True))
+@with_appcontext
+def verify_backup_command(directory):
+    """Check a backup's (and its bases') files against their checksums."""
+    from .services.backup import verify_backup, BackupError
+
+    try:
+        problems = verify_backup(directory)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    for problem in problems:
+        click.echo(problem)
+    if problems:
+        raise click.ClickException(f'{len(problems)} problem(s) found.')
+    click.echo('Backup is intact.')
+
+@click.command('restore-db')
+@click.argument('directory', type=click.Path(file_okay=False, exists=True))
+@click.option('--replace', is_flag=True, help='Delete existing rows first instead of requiring empty tables.')
+@click.option('--method', type=click.Choice(['executemany', 'load-data']), default='executemany', show_default=True,
+              help='load-data uses MySQL LOAD DATA LOCAL INFILE (server needs local_infile=ON).')
+@with_appcontext
+def restore_db_command(directory, replace, method):
+    """Restore a backup made with backup-db (incremental backups bring their bases)."""
+    import time
+    from .services.backup import restore_backup, BackupError
+
+    if replace:
+        click.confirm('This deletes the current data before restoring. Continue?', abort=True)
+    started = time.perf_counter()
+    try:
+        counts = restore_backup(directory, replace=replace, method=method, echo=click.echo)
+    except BackupError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Restored {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s.')
+
+@click.command('sweep-sessions')
+@with_appcontext
+def sweep_sessions_command():
+    """Delete expired server-side sessions."""
+    from flask import current_app
+
+    extension = current_app.extensions.get('server_session')
+    if extension is None or extension.store is None:
+        click.echo('Server-side sessions are not enabled.')
+        return
+    removed = extension.store.sweep()
+    click.echo(f'Removed {removed} expired session(s).')
+
+def register_commands(app):
+    app.cli.add_command(reconcile_seats_command)
+    app.cli.add_command(rebuild_academic_summary_command)
+    app.cli.add_command(rebuild_directory_index_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(export_tables_command)
+    app.cli.add_command(import_roster_command)
+    app.cli.add_command(backup_db_command)
+    app.cli.add_command(verify_backup_command)
+    app.cli.add_command(restore_db_command)
+    app.cli.add_command(sweep_sessions_command)
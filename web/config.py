@@ -10,6 +10,15 @@ class Config:
     PERMANENT_SESSION_LIFETIME = int(os.getenv('PERMANENT_SESSION_LIFETIME', 1800))  # 30 minutes
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 
+    # Server-side sessions (see web/sessions.py); SESSION_TYPE is one of
+    # 'filesystem', 'sqlite', 'redis' or 'cookie'
+    SESSION_FILE_DIR = os.getenv('SESSION_FILE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'flask_session'))
+    SESSION_FILE_SHARD_DEPTH = int(os.getenv('SESSION_FILE_SHARD_DEPTH', 2))
+    SESSION_SQLITE_PATH = os.getenv('SESSION_SQLITE_PATH', os.path.join(SESSION_FILE_DIR, 'sessions.sqlite'))
+    SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_KEY_PREFIX = os.getenv('SESSION_KEY_PREFIX', 'session:')
+    SESSION_SWEEP_INTERVAL = int(os.getenv('SESSION_SWEEP_INTERVAL', 300))  # seconds, 0 disables
+
     # Database configuration
     SQLALCHEMY_DATABASE_URI = (
         f"mysql+pymysql://"
@@ -32,6 +41,46 @@ class Config:
         }
     }
 
+    # Seat reservation
+    # 'row_lock' takes SELECT ... FOR UPDATE on the schedule row before enrolling;
+    # 'guarded' relies only on the conditional UPDATE in the enrolled triggers
+    SEAT_RESERVATION_MODE = os.getenv('SEAT_RESERVATION_MODE', 'row_lock')
+    SEAT_RESERVATION_MAX_RETRIES = int(os.getenv('SEAT_RESERVATION_MAX_RETRIES', 5))
+    SEAT_RESERVATION_BACKOFF = float(os.getenv('SEAT_RESERVATION_BACKOFF', 0.02))  # seconds
+
+    # Seconds a worker keeps its prerequisite graph before reloading it; local
+    # changes through the ORM invalidate it immediately (see web/services/prerequisites.py)
+    PREREQUISITE_GRAPH_TTL = int(os.getenv('PREREQUISITE_GRAPH_TTL', 300))
+
+    # Sections per page in the student catalog
+    CATALOG_PAGE_SIZE = int(os.getenv('CATALOG_PAGE_SIZE', 25))
+
+    # Timetable builder (see web/services/timetable.py)
+    TIMETABLE_TIME_BUDGET_MS = int(os.getenv('TIMETABLE_TIME_BUDGET_MS', 200))
+    TIMETABLE_MAX_OPTIONS = int(os.getenv('TIMETABLE_MAX_OPTIONS', 10))
+
+    # Course search index (see web/services/search.py); rebuilt after the TTL
+    SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', 600))
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 200))
+
+    # Admin dashboard statistics (see web/services/stats.py)
+    DASHBOARD_STATS_TTL = int(os.getenv('DASHBOARD_STATS_TTL', 60))
+    DASHBOARD_TOP_N = int(os.getenv('DASHBOARD_TOP_N', 10))
+
+    # Generated ids (see web/services/ids.py): numbers each worker reserves per database round trip
+    ID_BLOCK_SIZE = int(os.getenv('ID_BLOCK_SIZE', 20))
+
+    # Query profiling (see web/profiling.py)
+    QUERY_PROFILING = os.getenv('QUERY_PROFILING', 'true').lower() == 'true'
+    QUERY_DEBUG_PANEL = os.getenv('QUERY_DEBUG_PANEL', 'false').lower() == 'true'
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+    SLOW_REQUEST_DB_MS = float(os.getenv('SLOW_REQUEST_DB_MS', 500))
+    SLOW_REQUEST_QUERY_COUNT = int(os.getenv('SLOW_REQUEST_QUERY_COUNT', 50))
+    # Maximum statements per request; exceeding it raises under TESTING, otherwise logs.
+    # QUERY_BUDGETS overrides it per endpoint, e.g. {'professors.dashboard': 5}
+    QUERY_BUDGET = int(os.getenv('QUERY_BUDGET')) if os.getenv('QUERY_BUDGET') else None
+    QUERY_BUDGETS = {}
+
     # Upload folder
     UPLOAD_FOLDER = os.path.join(
         os.path.dirname(os.path.dirname(__file__)), 
@@ -43,6 +92,7 @@ class Config:
 class DevelopmentConfig(Config):
     DEBUG = True
     ENV = 'development'
+    QUERY_DEBUG_PANEL = os.getenv('QUERY_DEBUG_PANEL', 'true').lower() == 'true'
 
 class ProductionConfig(Config):
     DEBUG = False
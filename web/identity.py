@@ -0,0 +1,126 @@
+"""Per-request and short-lived in-process caching of the logged-in user.
+
+Flask-Login ids carry the user type ("student:ST001", "professor:PR001"),
+so `load_user` queries the right table once instead of trying both. Loaded
+identities are memoised in `g` for the rest of the request and kept as
+column snapshots in a small TTL/LRU cache shared by the worker's threads;
+a cache hit is attached to the current session with merge(load=False), so
+it costs no query. Updates and deletes of Student/Professor rows through
+the ORM evict the cached entry.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_app_context, session
+from sqlalchemy.orm import make_transient_to_detached
+from .models import db, Student, Professor
+
+USER_TYPES = {
+    'student': Student,
+    'professor': Professor,
+}
+
+class IdentityCache:
+    """Thread-safe LRU of column snapshots with a time-to-live"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return values
+
+    def set(self, key, values):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+identity_cache = IdentityCache()
+
+def init_app(app):
+    app.config.setdefault('IDENTITY_CACHE_TTL', 60)
+    app.config.setdefault('IDENTITY_CACHE_SIZE', 1024)
+    identity_cache.ttl = app.config['IDENTITY_CACHE_TTL']
+    identity_cache.maxsize = app.config['IDENTITY_CACHE_SIZE']
+
+def make_user_id(user_type, key):
+    return f'{user_type}:{key}'
+
+def _snapshot(instance):
+    return {attr.key: getattr(instance, attr.key) for attr in db.inspect(type(instance)).column_attrs}
+
+def _from_snapshot(model, values):
+    instance = model(**values)
+    make_transient_to_detached(instance)
+    return db.session.merge(instance, load=False)
+
+def load_identity(user_type, key):
+    """Return the Student or Professor `key` attached to the current session, or None.
+
+    At most one query per request, and none while the cache entry is fresh.
+    """
+    model = USER_TYPES.get(user_type)
+    if model is None or not key:
+        return None
+    loaded = g.setdefault('_identities', {})
+    cache_key = (user_type, key)
+    if cache_key in loaded:
+        return loaded[cache_key]
+
+    values = identity_cache.get(cache_key)
+    if values is not None:
+        instance = _from_snapshot(model, values)
+    else:
+        instance = db.session.get(model, key)
+        if instance is not None:
+            identity_cache.set(cache_key, _snapshot(instance))
+    loaded[cache_key] = instance
+    return instance
+
+def load_user(user_id):
+    """Flask-Login user loader for "type:key" ids; bare legacy ids are tried as student, then professor"""
+    user_type, _, key = user_id.partition(':')
+    if key:
+        return load_identity(user_type, key)
+    return load_identity('student', user_id) or load_identity('professor', user_id)
+
+def get_current_student():
+    return load_identity('student', session.get('student_id'))
+
+def invalidate_identity(user_type, key):
+    identity_cache.invalidate((user_type, key))
+    if has_app_context():
+        g.pop('_identities', None)
+
+@db.event.listens_for(Student, 'after_update')
+@db.event.listens_for(Student, 'after_delete')
+def evict_student(mapper, connection, target):
+    invalidate_identity('student', target.student_id)
+
+@db.event.listens_for(Professor, 'after_update')
+@db.event.listens_for(Professor, 'after_delete')
+def evict_professor(mapper, connection, target):
+    invalidate_identity('professor', target.professor_id)
@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL
+from sqlalchemy.dialects import mysql
 from datetime import datetime
 import enum
 
@@ -26,6 +28,9 @@ class Semester(enum.Enum):
     Spring = 'Spring'
     Summer = 'Summer'
 
+# Calendar order of the terms within an academic year
+SEMESTER_ORDER = [Semester.Spring, Semester.Summer, Semester.Fall]
+
 class Grade(enum.Enum):
     A_PLUS = 'A+'
     A = 'A'
@@ -42,12 +47,22 @@ class Grade(enum.Enum):
     W = 'W'
     I = 'I'
 
+# Grade points used for GPA; W and I carry no points and are left out of the GPA
+GRADE_POINTS = {
+    'A+': 4.0, 'A': 4.0, 'A-': 3.7,
+    'B+': 3.3, 'B': 3.0, 'B-': 2.7,
+    'C+': 2.3, 'C': 2.0, 'C-': 1.7,
+    'D+': 1.3, 'D': 1.0, 'F': 0.0
+}
+
 class EnrollmentStatus(enum.Enum):
     enrolled = 'enrolled'
     dropped = 'dropped'
     withdrawn = 'withdrawn'
     completed = 'completed'
 
+# CHECK constraints written in MySQL syntax (REGEXP, INTERVAL) are only emitted
+# on MySQL so that db.create_all() also works on SQLite for local benchmarks.
 class Student(db.Model):
     __tablename__ = 'student'
     student_id = db.Column(db.String(10), primary_key=True)
@@ -60,8 +75,8 @@ class Student(db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     enrollments = db.relationship('Enrolled', backref='student', lazy=True)
     __table_args__ = (
-        db.CheckConstraint("email REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'", name='student_email_format_check'),
-        db.CheckConstraint("date_of_birth <= CURRENT_DATE - INTERVAL 16 YEAR", name='chk_student_dob'),
+        db.CheckConstraint("email REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'", name='student_email_format_check').ddl_if(dialect='mysql'),
+        db.CheckConstraint("date_of_birth <= CURRENT_DATE - INTERVAL 16 YEAR", name='chk_student_dob').ddl_if(dialect='mysql'),
         db.Index('idx_student_email', 'email'),
         db.Index('idx_student_status', 'status')
     )
@@ -73,74 +88,40 @@ class Student(db.Model):
         min_birth_date = datetime.now().date() - timedelta(days=16*365)
         return date_of_birth <= min_birth_date
 
+    @property
+    def summary(self):
+        """Materialized academic totals; all zeros if the student has never enrolled"""
+        return self.academic_summary or StudentAcademicSummary(student_id=self.student_id)
+
     def can_upgrade_level(self):
         """Check if student can upgrade their academic level"""
         if self.level == CourseLevel.undergraduate:
             # Check if student has completed required credits for graduation
-            completed_credits = sum(
-                enrollment.schedule.course.credits 
-                for enrollment in self.enrollments 
-                if enrollment.status == EnrollmentStatus.completed
-            )
-            return completed_credits >= 120  # Typical undergraduate requirement
+            return self.summary.completed_credits >= 120  # Typical undergraduate requirement
         elif self.level == CourseLevel.graduate:
             # Check if student has completed required graduate credits
-            completed_credits = sum(
-                enrollment.schedule.course.credits 
-                for enrollment in self.enrollments 
-                if enrollment.status == EnrollmentStatus.completed 
-                and enrollment.schedule.course.level == CourseLevel.graduate
-            )
-            return completed_credits >= 30  # Typical master's requirement
+            return self.summary.completed_graduate_credits >= 30  # Typical master's requirement
         return False
 
     def get_gpa(self):
         """Calculate student's GPA"""
-        grade_points = {
-            'A+': 4.0, 'A': 4.0, 'A-': 3.7,
-            'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-            'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-            'D+': 1.3, 'D': 1.0, 'F': 0.0
-        }
-        
-        completed_courses = [e for e in self.enrollments if e.grade in grade_points]
-        if not completed_courses:
-            return 0.0
-        
-        total_points = sum(grade_points[e.grade] * e.schedule.course.credits for e in completed_courses)
-        total_credits = sum(e.schedule.course.credits for e in completed_courses)
-        
-        return round(total_points / total_credits, 2) if total_credits > 0 else 0.0
+        return self.summary.gpa
 
     def get_completed_credits(self):
         """Get total completed credits"""
-        return sum(
-            enrollment.schedule.course.credits 
-            for enrollment in self.enrollments 
-            if enrollment.status == EnrollmentStatus.completed
-        )
+        return self.summary.completed_credits
 
     def get_current_enrolled_credits(self):
         """Get total credits for currently enrolled courses"""
-        return sum(
-            enrollment.schedule.course.credits
-            for enrollment in self.enrollments
-            if enrollment.status == EnrollmentStatus.enrolled
-        )
+        return self.summary.enrolled_credits
+
+    def get_attempted_credits(self):
+        """Get total credits for every course that was not dropped"""
+        return self.summary.attempted_credits
 
     def get_total_credits(self):
         """Calculate total credits including completed and currently enrolled courses"""
-        completed_credits = sum(
-            enrollment.schedule.course.credits
-            for enrollment in self.enrollments
-            if enrollment.status == EnrollmentStatus.completed
-        )
-        current_enrolled_credits = sum(
-            enrollment.schedule.course.credits
-            for enrollment in self.enrollments
-            if enrollment.status == EnrollmentStatus.enrolled
-        )
-        return completed_credits + current_enrolled_credits
+        return self.summary.completed_credits + self.summary.enrolled_credits
 
     @property
     def is_active(self):
@@ -157,8 +138,8 @@ class Student(db.Model):
         return False
 
     def get_id(self):
-        """Return the student's ID."""
-        return self.student_id
+        """Return the Flask-Login id, which carries the user type (see web/identity.py)."""
+        return f'student:{self.student_id}'
 
 class Professor(db.Model):
     __tablename__ = 'professor'
@@ -173,7 +154,7 @@ class Professor(db.Model):
     teaching_assignments = db.relationship('Teaching', backref='professor', lazy=True)
 
     __table_args__ = (
-        db.CheckConstraint("email REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'", name='chk_professor_email'),
+        db.CheckConstraint("email REGEXP '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}$'", name='chk_professor_email').ddl_if(dialect='mysql'),
         db.Index('idx_professor_email', 'email'),
         db.Index('idx_professor_department', 'department')
     )
@@ -209,8 +190,8 @@ class Professor(db.Model):
         return False
 
     def get_id(self):
-        """Return the professor's ID."""
-        return self.professor_id
+        """Return the Flask-Login id, which carries the user type (see web/identity.py)."""
+        return f'professor:{self.professor_id}'
 
 class Course(db.Model):
     __tablename__ = 'courses'
@@ -239,7 +220,11 @@ class Course(db.Model):
         db.CheckConstraint('credits BETWEEN 1 AND 6', name='chk_course_credits'),
         db.CheckConstraint('max_capacity BETWEEN 5 AND 300', name='chk_course_capacity'),
         db.Index('idx_course_code', 'course_code'),
-        db.Index('idx_course_department', 'department')
+        db.Index('idx_course_department', 'department'),
+        # Catalog sorts (web/services/catalog.py) filter on level first
+        db.Index('idx_course_level_code', 'level', 'course_code'),
+        db.Index('idx_course_level_name', 'level', 'course_name'),
+        db.Index('idx_course_level_credits', 'level', 'credits')
     )
 
 class Prerequisite(db.Model):
@@ -273,6 +258,8 @@ class Schedule(db.Model):
     end_time = db.Column(db.Time, nullable=False)
     meeting_days = db.Column(db.String(10), nullable=False)
     room_number = db.Column(db.String(10), nullable=False)
+    # Denormalized count of rows in `enrolled` with status 'enrolled'; see claim_seat/release_seat
+    enrolled_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     teaching_assignments = db.relationship('Teaching', backref='schedule', lazy=True)
     enrollments = db.relationship('Enrolled', backref='schedule', lazy=True)
     professors = db.relationship(
@@ -282,8 +269,10 @@ class Schedule(db.Model):
     )
     __table_args__ = (
         db.Index('idx_schedule_semester', 'semester', 'academic_year'),
+        db.Index('idx_schedule_year', 'academic_year', 'semester'),
         db.CheckConstraint('start_time < end_time', name='chk_schedule_time'),
-        db.CheckConstraint("meeting_days REGEXP '^[MTWRF]+$'", name='chk_schedule_days'),
+        db.CheckConstraint("meeting_days REGEXP '^[MTWRF]+$'", name='chk_schedule_days').ddl_if(dialect='mysql'),
+        db.CheckConstraint('enrolled_count >= 0', name='chk_schedule_enrolled_count'),
         # db.CheckConstraint('academic_year >= YEAR(CURRENT_DATE)', name='chk_academic_year'),  # Removed for MySQL compatibility
     )
 
@@ -302,6 +291,73 @@ class Enrolled(db.Model):
         db.CheckConstraint("grade IN ('A+','A','A-','B+','B','B-','C+','C','C-','D+','D','F','W','I')", name='chk_grade')
     )
 
+class Waitlist(db.Model):
+    __tablename__ = 'waitlist'
+    waitlist_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    student_id = db.Column(db.String(10), db.ForeignKey('student.student_id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False)
+    schedule_id = db.Column(db.String(10), db.ForeignKey('schedule.schedule_id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False)
+    requested_at = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'), nullable=False, default=datetime.utcnow)
+    student = db.relationship('Student', backref=db.backref('waitlist_entries', lazy=True))
+    schedule = db.relationship('Schedule', backref=db.backref('waitlist_entries', lazy=True))
+
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'schedule_id', name='unique_waitlist_entry'),
+        db.Index('idx_waitlist_queue', 'schedule_id', 'requested_at', 'waitlist_id'),
+    )
+
+class StudentAcademicSummary(db.Model):
+    """Per-student credit and GPA totals, kept in step with `enrolled`.
+
+    MySQL maintains the row with triggers on `enrolled`; other backends use
+    the ORM events below. `flask rebuild-academic-summary` recomputes it.
+    """
+    __tablename__ = 'student_academic_summary'
+    student_id = db.Column(db.String(10), db.ForeignKey('student.student_id', ondelete='CASCADE', onupdate='CASCADE'), primary_key=True)
+    completed_credits = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    enrolled_credits = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    attempted_credits = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    graded_credits = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    quality_points = db.Column(db.Numeric(8, 2), nullable=False, default=0, server_default='0')
+    completed_graduate_credits = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    student = db.relationship('Student', backref=db.backref('academic_summary', uselist=False, lazy=True, passive_deletes=True))
+
+    def __init__(self, **kwargs):
+        for column in ('completed_credits', 'enrolled_credits', 'attempted_credits',
+                       'graded_credits', 'quality_points', 'completed_graduate_credits'):
+            kwargs.setdefault(column, 0)
+        super().__init__(**kwargs)
+
+    @property
+    def gpa(self):
+        if not self.graded_credits:
+            return 0.0
+        return round(float(self.quality_points) / self.graded_credits, 2)
+
+class DirectoryToken(db.Model):
+    """Lowercase name, email and id tokens for prefix search of students and professors.
+
+    Kept in step by the ORM events in web/services/directory.py;
+    `flask rebuild-directory-index` fills it after bulk loads.
+    """
+    __tablename__ = 'directory_token'
+    person_type = db.Column(db.String(10), primary_key=True)
+    token = db.Column(db.String(100), primary_key=True)
+    person_id = db.Column(db.String(10), primary_key=True)
+
+    __table_args__ = (
+        db.Index('idx_directory_person', 'person_type', 'person_id'),
+    )
+
+class IdSequence(db.Model):
+    """Next unreserved number of a generated id sequence"""
+    __tablename__ = 'id_sequence'
+    name = db.Column(db.String(20), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False)
+
+    __table_args__ = (
+        db.CheckConstraint('next_value > 0', name='chk_id_sequence_next_value'),
+    )
+
 class Teaching(db.Model):
     __tablename__ = 'teaching'
     teaching_id = db.Column(db.String(10), primary_key=True)
@@ -323,10 +379,316 @@ def validate_prerequisite_no_self_update(mapper, connection, target):
     if target.course_id == target.prerequisite_course_id:
         raise ValueError('A course cannot be a prerequisite of itself')
 
+# Seat counter maintenance for Schedule.enrolled_count.
+# On MySQL the triggers below keep the counter in step with every write to
+# `enrolled` (including raw SQL); on other backends the ORM events do the same
+# work so the counter never drifts regardless of which path changed a row.
+SEAT_FULL_MESSAGE = 'Cannot enroll: Course has reached maximum enrollment'
+
+def claim_seat(connection, schedule_id):
+    """Atomically take one seat; returns False if the section is already full"""
+    capacity = db.select(Course.max_capacity).where(
+        Course.course_id == Schedule.course_id
+    ).scalar_subquery()
+    result = connection.execute(
+        db.update(Schedule)
+        .where(Schedule.schedule_id == schedule_id, Schedule.enrolled_count < capacity)
+        .values(enrolled_count=Schedule.enrolled_count + 1)
+    )
+    return result.rowcount == 1
+
+def release_seat(connection, schedule_id):
+    connection.execute(
+        db.update(Schedule)
+        .where(Schedule.schedule_id == schedule_id, Schedule.enrolled_count > 0)
+        .values(enrolled_count=Schedule.enrolled_count - 1)
+    )
+
+def _seats_maintained_by_trigger(connection):
+    return connection.dialect.name == 'mysql'
+
+def _mark_seat_counter_stale(target, schedule_id):
+    session = db.inspect(target).session
+    if session is not None:
+        session.info.setdefault('stale_seat_counts', set()).add(schedule_id)
+
+@db.event.listens_for(Enrolled, 'after_insert')
+def claim_seat_after_insert(mapper, connection, target):
+    if target.status != EnrollmentStatus.enrolled:
+        return
+    if not _seats_maintained_by_trigger(connection) and not claim_seat(connection, target.schedule_id):
+        raise ValueError(SEAT_FULL_MESSAGE)
+    _mark_seat_counter_stale(target, target.schedule_id)
+
+@db.event.listens_for(Enrolled.status, 'set', active_history=True)
+@db.event.listens_for(Enrolled.schedule_id, 'set', active_history=True)
+@db.event.listens_for(Enrolled.student_id, 'set', active_history=True)
+def load_previous_enrollment_value(target, value, oldvalue, initiator):
+    """No-op; registering with active_history keeps the old value in history even after expiry"""
+
+@db.event.listens_for(Enrolled, 'after_update')
+def adjust_seats_after_update(mapper, connection, target):
+    state = db.inspect(target)
+    status_history = state.attrs.status.history
+    schedule_history = state.attrs.schedule_id.history
+    if not status_history.has_changes() and not schedule_history.has_changes():
+        return
+
+    old_status = status_history.deleted[0] if status_history.deleted else target.status
+    old_schedule_id = schedule_history.deleted[0] if schedule_history.deleted else target.schedule_id
+    was_enrolled = old_status == EnrollmentStatus.enrolled
+    is_enrolled = target.status == EnrollmentStatus.enrolled
+    moved = old_schedule_id != target.schedule_id
+    by_trigger = _seats_maintained_by_trigger(connection)
+
+    if was_enrolled and (not is_enrolled or moved):
+        if not by_trigger:
+            release_seat(connection, old_schedule_id)
+        _mark_seat_counter_stale(target, old_schedule_id)
+    if is_enrolled and (not was_enrolled or moved):
+        if not by_trigger and not claim_seat(connection, target.schedule_id):
+            raise ValueError(SEAT_FULL_MESSAGE)
+        _mark_seat_counter_stale(target, target.schedule_id)
+
+@db.event.listens_for(Enrolled, 'after_delete')
+def release_seat_after_delete(mapper, connection, target):
+    if target.status != EnrollmentStatus.enrolled:
+        return
+    if not _seats_maintained_by_trigger(connection):
+        release_seat(connection, target.schedule_id)
+    _mark_seat_counter_stale(target, target.schedule_id)
+
+@db.event.listens_for(db.session, 'after_flush_postexec')
+def expire_stale_seat_counts(session, flush_context):
+    """Reload counters that were changed in SQL behind the ORM's back"""
+    for schedule_id in session.info.pop('stale_seat_counts', ()):
+        schedule = session.identity_map.get(db.inspect(Schedule).identity_key_from_primary_key((schedule_id,)))
+        if schedule is not None:
+            session.expire(schedule, ['enrolled_count'])
+
+# Keep the MySQL triggers in step with mysql/init/01-init.sql so that
+# db.create_all() produces the same schema as the init scripts.
+SEAT_COUNT_TRIGGERS = [
+    """
+CREATE TRIGGER before_enrolled_insert
+BEFORE INSERT ON enrolled
+FOR EACH ROW
+BEGIN
+    IF NEW.status <=> 'enrolled' THEN
+        UPDATE schedule s JOIN courses c ON c.course_id = s.course_id
+        SET s.enrolled_count = s.enrolled_count + 1
+        WHERE s.schedule_id = NEW.schedule_id AND s.enrolled_count < c.max_capacity;
+        IF ROW_COUNT() = 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot enroll: Course has reached maximum enrollment';
+        END IF;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER before_enrolled_update
+BEFORE UPDATE ON enrolled
+FOR EACH ROW
+BEGIN
+    DECLARE was_enrolled BOOLEAN DEFAULT (OLD.status <=> 'enrolled');
+    DECLARE is_enrolled BOOLEAN DEFAULT (NEW.status <=> 'enrolled');
+    DECLARE moved BOOLEAN DEFAULT (OLD.schedule_id <> NEW.schedule_id);
+    IF was_enrolled AND (NOT is_enrolled OR moved) THEN
+        UPDATE schedule SET enrolled_count = enrolled_count - 1
+        WHERE schedule_id = OLD.schedule_id AND enrolled_count > 0;
+    END IF;
+    IF is_enrolled AND (NOT was_enrolled OR moved) THEN
+        UPDATE schedule s JOIN courses c ON c.course_id = s.course_id
+        SET s.enrolled_count = s.enrolled_count + 1
+        WHERE s.schedule_id = NEW.schedule_id AND s.enrolled_count < c.max_capacity;
+        IF ROW_COUNT() = 0 THEN
+            SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Cannot enroll: Course has reached maximum enrollment';
+        END IF;
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER after_enrolled_delete
+AFTER DELETE ON enrolled
+FOR EACH ROW
+BEGIN
+    IF OLD.status <=> 'enrolled' THEN
+        UPDATE schedule SET enrolled_count = enrolled_count - 1
+        WHERE schedule_id = OLD.schedule_id AND enrolled_count > 0;
+    END IF;
+END
+""",
+]
+
+for _trigger in SEAT_COUNT_TRIGGERS:
+    db.event.listen(Enrolled.__table__, 'after_create', DDL(_trigger).execute_if(dialect='mysql'))
+
+# Academic summary maintenance for StudentAcademicSummary.
+# On MySQL the triggers below apply each enrollment change as a delta. On other
+# backends the mapper events only collect the affected student ids during the
+# flush (no SQL, no lazy loads); once the flush has run, their summaries are
+# recomputed together in one aggregate INSERT ... SELECT.
+def academic_summary_totals(student_ids=None):
+    """Aggregate enrollments into StudentAcademicSummary columns, one row per student"""
+    credits = Course.credits
+    points = db.case(GRADE_POINTS, value=Enrolled.grade)
+    completed = Enrolled.status == EnrollmentStatus.completed
+    query = db.select(
+        Enrolled.student_id,
+        db.func.sum(db.case((completed, credits), else_=0)).label('completed_credits'),
+        db.func.sum(db.case((Enrolled.status == EnrollmentStatus.enrolled, credits), else_=0)).label('enrolled_credits'),
+        db.func.sum(db.case((Enrolled.status == EnrollmentStatus.dropped, 0), else_=credits)).label('attempted_credits'),
+        db.func.sum(db.case((Enrolled.grade.in_(list(GRADE_POINTS)), credits), else_=0)).label('graded_credits'),
+        db.func.sum(db.func.coalesce(points * credits, 0)).label('quality_points'),
+        db.func.sum(db.case((db.and_(completed, Course.level == CourseLevel.graduate), credits), else_=0)).label('completed_graduate_credits'),
+    ).select_from(Enrolled).join(
+        Schedule, Schedule.schedule_id == Enrolled.schedule_id
+    ).join(
+        Course, Course.course_id == Schedule.course_id
+    ).join(
+        Student, Student.student_id == Enrolled.student_id
+    ).group_by(Enrolled.student_id)
+    if student_ids is not None:
+        query = query.where(Enrolled.student_id.in_(student_ids))
+    return query
+
+def recompute_academic_summaries(connection, student_ids=None):
+    """Replace the summaries of `student_ids` (all students if None) with fresh totals.
+
+    Always two statements regardless of how many students or enrollments are
+    involved. Returns the number of summary rows written.
+    """
+    delete = db.delete(StudentAcademicSummary)
+    if student_ids is not None:
+        delete = delete.where(StudentAcademicSummary.student_id.in_(student_ids))
+    connection.execute(delete)
+
+    totals = academic_summary_totals(student_ids)
+    result = connection.execute(
+        db.insert(StudentAcademicSummary).from_select(
+            [column.name for column in totals.selected_columns], totals
+        )
+    )
+    return result.rowcount
+
+def _summary_maintained_by_trigger(connection):
+    return connection.dialect.name == 'mysql'
+
+def _mark_summary_stale(target, *student_ids):
+    session = db.inspect(target).session
+    if session is not None:
+        session.info.setdefault('stale_academic_summaries', set()).update(student_ids)
+
+@db.event.listens_for(Enrolled, 'after_insert')
+@db.event.listens_for(Enrolled, 'after_delete')
+def collect_summary_after_insert_or_delete(mapper, connection, target):
+    _mark_summary_stale(target, target.student_id)
+
 @db.event.listens_for(Enrolled, 'after_update')
-def update_total_credits_after_completion(mapper, connection, target):
-    student = db.session.get(Student, target.student_id)
-    if target.status == EnrollmentStatus.completed:
-        student.total_credits = student.get_completed_credits() + student.get_current_enrolled_credits()
-    elif target.status == EnrollmentStatus.enrolled:
-        student.total_credits = student.get_completed_credits() + student.get_current_enrolled_credits()
\ No newline at end of file
+def collect_summary_after_update(mapper, connection, target):
+    state = db.inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in ('schedule_id', 'status', 'grade', 'student_id')):
+        return
+    _mark_summary_stale(target, target.student_id, *state.attrs.student_id.history.deleted)
+
+def refresh_academic_summaries(session, student_ids):
+    """Recompute the given students' summaries in one batch, then reload them in the ORM.
+
+    Also used directly after bulk UPDATEs, which bypass the mapper events.
+    """
+    connection = session.connection()
+    if not _summary_maintained_by_trigger(connection):
+        recompute_academic_summaries(connection, sorted(student_ids))
+    for student_id in student_ids:
+        student = session.identity_map.get(db.inspect(Student).identity_key_from_primary_key((student_id,)))
+        if student is not None:
+            session.expire(student, ['academic_summary'])
+        summary = session.identity_map.get(db.inspect(StudentAcademicSummary).identity_key_from_primary_key((student_id,)))
+        if summary is not None:
+            session.expire(summary)
+
+@db.event.listens_for(db.session, 'after_flush_postexec')
+def refresh_stale_academic_summaries(session, flush_context):
+    student_ids = session.info.pop('stale_academic_summaries', None)
+    if student_ids:
+        refresh_academic_summaries(session, student_ids)
+
+# Keep in step with mysql/init/01-init.sql. Created once every table exists,
+# since the procedure reads schedule and courses and writes the summary.
+ACADEMIC_SUMMARY_DDL = [
+    """
+CREATE PROCEDURE apply_academic_summary_delta(
+    IN p_student_id VARCHAR(10),
+    IN p_schedule_id VARCHAR(10),
+    IN p_status VARCHAR(10),
+    IN p_grade VARCHAR(2),
+    IN p_sign INT
+)
+BEGIN
+    DECLARE v_credits INT DEFAULT 0;
+    DECLARE v_level VARCHAR(20) DEFAULT NULL;
+    DECLARE v_points DECIMAL(3,1) DEFAULT NULL;
+
+    SELECT c.credits, c.level INTO v_credits, v_level
+    FROM schedule s JOIN courses c ON c.course_id = s.course_id
+    WHERE s.schedule_id = p_schedule_id;
+
+    SET v_points = CASE p_grade
+        WHEN 'A+' THEN 4.0 WHEN 'A' THEN 4.0 WHEN 'A-' THEN 3.7
+        WHEN 'B+' THEN 3.3 WHEN 'B' THEN 3.0 WHEN 'B-' THEN 2.7
+        WHEN 'C+' THEN 2.3 WHEN 'C' THEN 2.0 WHEN 'C-' THEN 1.7
+        WHEN 'D+' THEN 1.3 WHEN 'D' THEN 1.0 WHEN 'F' THEN 0.0
+    END;
+
+    INSERT INTO student_academic_summary (
+        student_id, completed_credits, enrolled_credits, attempted_credits,
+        graded_credits, quality_points, completed_graduate_credits
+    ) VALUES (
+        p_student_id,
+        p_sign * IF(p_status <=> 'completed', v_credits, 0),
+        p_sign * IF(p_status <=> 'enrolled', v_credits, 0),
+        p_sign * IF(p_status <=> 'dropped', 0, v_credits),
+        p_sign * IF(v_points IS NULL, 0, v_credits),
+        p_sign * IFNULL(v_points * v_credits, 0),
+        p_sign * IF(p_status <=> 'completed' AND v_level <=> 'graduate', v_credits, 0)
+    )
+    ON DUPLICATE KEY UPDATE
+        completed_credits = completed_credits + VALUES(completed_credits),
+        enrolled_credits = enrolled_credits + VALUES(enrolled_credits),
+        attempted_credits = attempted_credits + VALUES(attempted_credits),
+        graded_credits = graded_credits + VALUES(graded_credits),
+        quality_points = quality_points + VALUES(quality_points),
+        completed_graduate_credits = completed_graduate_credits + VALUES(completed_graduate_credits);
+END
+""",
+    """
+CREATE TRIGGER after_enrolled_insert_summary
+AFTER INSERT ON enrolled
+FOR EACH ROW
+BEGIN
+    CALL apply_academic_summary_delta(NEW.student_id, NEW.schedule_id, NEW.status, NEW.grade, 1);
+END
+""",
+    """
+CREATE TRIGGER after_enrolled_update_summary
+AFTER UPDATE ON enrolled
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.student_id <=> NEW.student_id AND OLD.schedule_id <=> NEW.schedule_id
+            AND OLD.status <=> NEW.status AND OLD.grade <=> NEW.grade) THEN
+        CALL apply_academic_summary_delta(OLD.student_id, OLD.schedule_id, OLD.status, OLD.grade, -1);
+        CALL apply_academic_summary_delta(NEW.student_id, NEW.schedule_id, NEW.status, NEW.grade, 1);
+    END IF;
+END
+""",
+    """
+CREATE TRIGGER after_enrolled_delete_summary
+AFTER DELETE ON enrolled
+FOR EACH ROW
+BEGIN
+    CALL apply_academic_summary_delta(OLD.student_id, OLD.schedule_id, OLD.status, OLD.grade, -1);
+END
+""",
+]
+
+for _statement in ACADEMIC_SUMMARY_DDL:
+    db.event.listen(db.metadata, 'after_create', DDL(_statement).execute_if(dialect='mysql'))
@@ -0,0 +1,152 @@
+import time
+from contextlib import contextmanager
+from html import escape
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its configured budget"""
+
+class QueryStats:
+    """SQL statements run during one request (or one `track_queries` block)"""
+
+    def __init__(self, keep_slowest=5):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest = []
+        self.keep_slowest = keep_slowest
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total_time += duration
+        self.slowest.append((duration, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[self.keep_slowest:]
+
+    @property
+    def total_ms(self):
+        return self.total_time * 1000
+
+def _stats_stack():
+    if not has_request_context():
+        return None
+    return g.setdefault('_query_stats', [])
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_start_time')
+    if not started:
+        return
+    duration = time.perf_counter() - started.pop()
+    for stats in _stats_stack() or ():
+        stats.record(statement, duration)
+
+@contextmanager
+def track_queries(max_queries=None):
+    """Count the statements run inside the block; raise QueryBudgetExceeded past `max_queries`.
+
+    Needs a request context, e.g. inside `app.test_request_context()`.
+    """
+    stack = _stats_stack()
+    if stack is None:
+        raise RuntimeError('track_queries() needs a request context')
+    stats = QueryStats()
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.remove(stats)
+    if max_queries is not None and stats.count > max_queries:
+        raise QueryBudgetExceeded(f'{stats.count} queries run, budget is {max_queries}')
+
+class QueryProfiler:
+    """Per-request SQL instrumentation.
+
+    Adds `Server-Timing` and `X-Query-Count` headers, logs requests that run
+    too many or too slow statements, optionally appends a debug panel to HTML
+    pages, and enforces per-endpoint query budgets (raising under TESTING).
+    Streamed responses get no headers; they are logged and checked against
+    their budget when the response closes.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_PROFILING', True)
+        app.config.setdefault('QUERY_DEBUG_PANEL', False)
+        app.config.setdefault('SLOW_QUERY_MS', 100)
+        app.config.setdefault('SLOW_REQUEST_DB_MS', 500)
+        app.config.setdefault('SLOW_REQUEST_QUERY_COUNT', 50)
+        app.config.setdefault('QUERY_BUDGET', None)
+        app.config.setdefault('QUERY_BUDGETS', {})
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _start_request(self):
+        if current_app.config['QUERY_PROFILING'] and request.endpoint != 'static':
+            stats = QueryStats()
+            _stats_stack().append(stats)
+            g.request_query_stats = stats
+
+    def _finish_request(self, response):
+        stats = g.pop('request_query_stats', None)
+        if stats is None:
+            return response
+        request_info = (current_app._get_current_object(), request.method, request.path, request.endpoint)
+
+        if response.is_streamed:
+            # A streamed body runs its queries after the headers have gone out, so
+            # no count header is sent; the total is checked once the response closes
+            response.call_on_close(lambda: self._check_request(stats, *request_info))
+            return response
+
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers.add('Server-Timing', f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"')
+        self._check_request(stats, *request_info)
+
+        if current_app.config['QUERY_DEBUG_PANEL'] and response.mimetype == 'text/html':
+            self._inject_panel(response, stats)
+        return response
+
+    @staticmethod
+    def _check_request(stats, app, method, path, endpoint):
+        """Log slow requests and enforce the endpoint's query budget"""
+        config = app.config
+        slow_statements = [(d, s) for d, s in stats.slowest if d * 1000 >= config['SLOW_QUERY_MS']]
+        if (stats.count > config['SLOW_REQUEST_QUERY_COUNT'] or stats.total_ms > config['SLOW_REQUEST_DB_MS']
+                or slow_statements):
+            app.logger.warning(
+                'Slow request %s %s: %d queries, %.1f ms in database',
+                method, path, stats.count, stats.total_ms
+            )
+            for duration, statement in slow_statements:
+                app.logger.warning('  %.1f ms: %s', duration * 1000, ' '.join(statement.split()))
+
+        budget = config['QUERY_BUDGETS'].get(endpoint, config['QUERY_BUDGET'])
+        if budget is not None and stats.count > budget:
+            message = f'{endpoint} ran {stats.count} queries, budget is {budget}'
+            if app.testing:
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+
+    @staticmethod
+    def _inject_panel(response, stats):
+        rows = ''.join(
+            f'<li><code>{duration * 1000:.1f} ms</code> {escape(" ".join(statement.split()))}</li>'
+            for duration, statement in stats.slowest
+        )
+        panel = (
+            '<div id="query-debug-panel" class="container small text-muted border-top py-2">'
+            f'<strong>{stats.count} queries, {stats.total_ms:.1f} ms in database</strong>'
+            f'<ol class="mb-0">{rows}</ol></div>'
+        )
+        body = response.get_data(as_text=True)
+        if '</body>' in body:
+            response.set_data(body.replace('</body>', panel + '</body>', 1))
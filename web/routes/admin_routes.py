@@ -1,9 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, Response
 from ..models import db, Course, Professor, Schedule, Teaching, CourseLevel, Semester, StudentStatus
 from datetime import datetime
 from web.models import Student
 from web.forms import StudentForm, ProfessorForm, CourseForm
 from flask_wtf.csrf import generate_csrf
+from ..services.search import search_course_ids, order_by_relevance
+from ..services.directory import filter_directory, typeahead
+from ..services.stats import get_dashboard_stats
+from ..services.exports import archive_response, ExportFormatError
+from ..services.roster_import import import_roster, error_report_chunks, RosterImportError, IMPORTERS
 
 admin = Blueprint('admin', __name__)
 
@@ -18,24 +23,46 @@ def require_admin():
 
 @admin.route('/admin/dashboard')
 def dashboard():
-    total_students = db.session.query(db.func.count()).select_from(db.Model.metadata.tables['student']).scalar()
-    total_professors = db.session.query(db.func.count()).select_from(db.Model.metadata.tables['professor']).scalar()
-    total_courses = db.session.query(db.func.count()).select_from(db.Model.metadata.tables['courses']).scalar()
-    total_enrollments = db.session.query(db.func.count()).select_from(db.Model.metadata.tables['enrolled']).scalar()
-    stats = {
-        'total_students': total_students,
-        'active_courses': total_courses,  # No active field, so use total
-        'total_professors': total_professors,
-        'active_enrollments': total_enrollments  # No active field, so use total
-    }
-    courses = Course.query.all()
-    professors = Professor.query.all()
-    schedules = Schedule.query.all()
-    return render_template('admin/dashboard.html',
-                         courses=courses,
-                         professors=professors,
-                         schedules=schedules,
-                         stats=stats)
+    return render_template('admin/dashboard.html', stats=get_dashboard_stats())
+
+@admin.route('/admin/export')
+def export_tables():
+    """Stream tables as one zip/tar archive, e.g. ?tables=student&tables=enrolled&archive=tar.gz&format=jsonl&semester=Fall"""
+    try:
+        return archive_response(
+            request.args.getlist('tables'),
+            archive=request.args.get('archive', 'zip'),
+            member_format=request.args.get('format', 'csv'),
+            semester=request.args.get('semester', '').strip() or None,
+            academic_year=request.args.get('academic_year', type=int),
+            department=request.args.get('department', '').strip() or None,
+        )
+    except ExportFormatError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin.dashboard'))
+
+@admin.route('/admin/import', methods=['GET', 'POST'])
+def import_roster_file():
+    """Bulk-load students, professors or enrollments from an uploaded CSV or Excel file"""
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        kind = request.form.get('kind', 'students')
+        if not upload or not upload.filename:
+            flash('Choose a file to import', 'error')
+            return redirect(url_for('admin.import_roster_file'))
+        try:
+            result = import_roster(kind, upload.stream, upload.filename, dry_run=bool(request.form.get('dry_run')))
+        except RosterImportError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('admin.import_roster_file'))
+        if request.form.get('report') and result['errors']:
+            return Response(error_report_chunks(result['errors']), mimetype='text/csv',
+                            headers={'Content-Disposition': f'attachment; filename={kind}_import_errors.csv'})
+        verb = 'would be imported' if result['dry_run'] else 'imported'
+        flash(f"{result['inserted']} of {result['rows']} {kind} {verb}; {len(result['errors'])} error(s)",
+              'error' if result['errors'] else 'success')
+    return render_template('admin/import.html', result=result, kinds=list(IMPORTERS), csrf_token=generate_csrf())
 
 @admin.route('/admin/courses')
 def course_list():
@@ -45,16 +72,16 @@ def course_list():
 
     query = Course.query
     if search:
-        query = query.filter(
-            (Course.course_code.ilike(f'%{search}%')) |
-            (Course.course_name.ilike(f'%{search}%'))
-        )
+        matches = search_course_ids(search)
+        query = query.filter(Course.course_id.in_(matches)) if matches else query.filter(db.false())
     if department:
         query = query.filter(Course.department == department)
     if level:
         query = query.filter(Course.level == level)
 
     courses = query.all()
+    if search:
+        courses = order_by_relevance(courses, matches)
 
     # For dropdowns
     departments = db.session.query(Course.department).distinct().all()
@@ -123,7 +150,7 @@ def assign_teaching():
     if request.method == 'POST':
         try:
             teaching = Teaching(
-                teaching_id=request.form['teaching_id'],
+                teaching_id=request.form.get('teaching_id') or None,
                 professor_id=request.form['professor_id'],
                 schedule_id=request.form['schedule_id']
             )
@@ -163,12 +190,7 @@ def student_list():
 
     query = Student.query
     if search:
-        query = query.filter(
-            (Student.first_name.ilike(f'%{search}%')) |
-            (Student.last_name.ilike(f'%{search}%')) |
-            (Student.email.ilike(f'%{search}%')) |
-            (Student.student_id.ilike(f'%{search}%'))
-        )
+        query = filter_directory(query, 'student', search)
     if status:
         query = query.filter(Student.status == status)
     if major:
@@ -176,17 +198,12 @@ def student_list():
 
     # Pagination (optional, adjust as needed)
     page = request.args.get('page', 1, type=int)
-    pagination = query.order_by(Student.student_id).paginate(page=page, per_page=20, error_out=False)
+    pagination = query.options(db.joinedload(Student.academic_summary)).order_by(Student.student_id).paginate(page=page, per_page=20, error_out=False)
     students = pagination.items
 
-    # Calculate completed_credits for each student
+    # Completed credits come from the materialized academic summary
     for student in students:
-        completed_credits = 0
-        for e in getattr(student, 'enrollments', []):
-            if hasattr(e, 'status') and hasattr(e, 'schedule') and hasattr(e.schedule, 'course'):
-                if (getattr(e, 'status', None) and getattr(e, 'status', None).name == 'completed') or getattr(e, 'grade', None) is not None:
-                    completed_credits += getattr(e.schedule.course, 'credits', 0)
-        student.completed_credits = completed_credits
+        student.completed_credits = student.get_completed_credits()
 
     # Get all unique statuses and majors for the filter dropdowns
     student_statuses = StudentStatus
@@ -199,6 +216,20 @@ def student_list():
                            pagination=pagination,
                            csrf_token=generate_csrf())
 
+@admin.route('/admin/directory/typeahead.json')
+def directory_typeahead():
+    """Prefix matches for the student/professor search boxes"""
+    person_type = request.args.get('type', 'student')
+    if person_type not in ('student', 'professor'):
+        return jsonify({'error': 'type must be student or professor'}), 400
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    if person_type == 'student':
+        filters = {'status': request.args.get('status', '').strip(), 'major': request.args.get('major', '').strip()}
+    else:
+        filters = {'department': request.args.get('department', '').strip()}
+    items = typeahead(person_type, request.args.get('q', ''), limit, **filters)
+    return jsonify({'items': items})
+
 @admin.route('/admin/students/add', methods=['GET', 'POST'])
 def add_student():
     form = StudentForm()
@@ -226,12 +257,7 @@ def professor_list():
 
     query = Professor.query
     if search:
-        query = query.filter(
-            (Professor.first_name.ilike(f'%{search}%')) |
-            (Professor.last_name.ilike(f'%{search}%')) |
-            (Professor.email.ilike(f'%{search}%')) |
-            (Professor.department.ilike(f'%{search}%'))
-        )
+        query = filter_directory(query, 'professor', search)
     if department:
         query = query.filter(Professor.department == department)
 
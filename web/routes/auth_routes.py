@@ -3,7 +3,9 @@ from ..models import db, Student, Professor, StudentStatus, ProfessorStatus
 from datetime import datetime
 from flask_login import login_user, logout_user, current_user
 from ..forms import LoginForm, RegisterStudentForm, RegisterProfessorForm
-import re
+from ..services.ids import next_id
+from ..identity import load_identity
+from ..sessions import regenerate_session
 
 auth = Blueprint('auth', __name__)
 
@@ -33,7 +35,7 @@ def login():
             return redirect(url_for('auth.login'))
 
         if user_type == 'student':
-            student = Student.query.get(user_id)
+            student = load_identity('student', user_id)
             if not student:
                 flash('Student not found', 'error')
                 return redirect(url_for('auth.login'))
@@ -42,6 +44,7 @@ def login():
                 flash('Student account is not active', 'error')
                 return redirect(url_for('auth.login'))
 
+            regenerate_session()
             login_user(student)
             session['user_type'] = 'student'
             session['student_id'] = student.student_id  # Add student_id to session
@@ -49,7 +52,7 @@ def login():
             return redirect(url_for('students.dashboard'))
 
         elif user_type == 'professor':
-            professor = Professor.query.get(user_id)
+            professor = load_identity('professor', user_id)
             if not professor:
                 flash('Professor not found', 'error')
                 return redirect(url_for('auth.login'))
@@ -58,6 +61,7 @@ def login():
                 flash('Professor account is not active', 'error')
                 return redirect(url_for('auth.login'))
 
+            regenerate_session()
             login_user(professor)
             session['user_type'] = 'professor'
             session['professor_id'] = professor.professor_id  # Add professor_id to session
@@ -66,6 +70,7 @@ def login():
 
         elif user_type == 'admin':
             if user_id == 'admin':
+                regenerate_session()
                 session['user_type'] = 'admin'
                 return redirect(url_for('admin.dashboard'))
             flash('Invalid admin credentials', 'error')
@@ -79,23 +84,15 @@ def login():
 def logout():
     logout_user()
     session.clear()
+    regenerate_session()
     return redirect(url_for('auth.index'))
 
-def generate_next_student_id():
-    last_student = Student.query.order_by(Student.student_id.desc()).first()
-    if last_student and re.match(r"ST\\d{3,}", last_student.student_id):
-        last_num = int(last_student.student_id[2:])
-        next_num = last_num + 1
-    else:
-        next_num = 1
-    return f"ST{next_num:03d}"
-
 @auth.route('/register/student', methods=['GET', 'POST'])
 def register_student():
     form = RegisterStudentForm()  # Create the form object
     if request.method == 'POST' and form.validate_on_submit():
         try:
-            new_student_id = generate_next_student_id()
+            new_student_id = next_id('student')
             student = Student(
                 student_id=new_student_id,
                 first_name=request.form['first_name'],
@@ -116,24 +113,12 @@ def register_student():
             flash(f'Registration failed: {str(e)}', 'error')
     return render_template('auth/register_student.html', form=form)
 
-def generate_next_professor_id():
-    last_prof = Professor.query.order_by(Professor.professor_id.desc()).first()
-    if last_prof:
-        try:
-            last_num = int(re.search(r"\d+", last_prof.professor_id).group())
-            next_num = last_num + 1
-        except (ValueError, AttributeError):
-            next_num = 1
-    else:
-        next_num = 1
-    return f"PR{next_num:03d}"
-
 @auth.route('/register/professor', methods=['GET', 'POST'])
 def register_professor():
     form = RegisterProfessorForm()
     if request.method == 'POST' and form.validate_on_submit():
         try:
-            new_professor_id = generate_next_professor_id()
+            new_professor_id = next_id('professor')
             professor = Professor(
                 professor_id=new_professor_id,
                 first_name=form.first_name.data,
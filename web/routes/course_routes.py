@@ -1,5 +1,9 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from ..models import db, Course, Schedule, Enrolled, Prerequisite
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app
+from ..models import db, Student, Course, Schedule, Enrolled, Prerequisite
+from ..services.waitlist import register_or_waitlist, promote_from_waitlist
+from ..services.prerequisites import get_prerequisite_graph, get_completed_course_ids
+from ..services.search import search_course_ids, order_by_relevance
+from ..identity import get_current_student
 from datetime import datetime
 
 courses = Blueprint('courses', __name__)
@@ -31,18 +35,12 @@ def enroll():
     
     schedule_id = request.form.get('schedule_id')
     try:
-        schedule = Schedule.query.get(schedule_id)
-        if not schedule:
-            return jsonify({'success': False, 'message': 'Schedule not found'})
-        enrolled_count = sum(1 for e in schedule.enrollments if e.status.name == 'enrolled')
-        if enrolled_count >= schedule.course.max_capacity:
-            return jsonify({'success': False, 'message': 'Course is full'})
-        enrollment = Enrolled(
-            student_id=session['student_id'],
-            schedule_id=schedule_id
-        )
-        db.session.add(enrollment)
-        db.session.commit()
+        student = get_current_student()
+        if not student:
+            return jsonify({'success': False, 'message': 'Student not found'})
+        verdict = register_or_waitlist(student, schedule_id)
+        if not verdict.ok:
+            return jsonify(verdict.to_dict())
         return jsonify({'success': True, 'message': 'Successfully enrolled in the course!'})
     except Exception as e:
         db.session.rollback()
@@ -61,6 +59,7 @@ def withdraw():
         ).first()
         if enrollment:
             db.session.delete(enrollment)
+            promote_from_waitlist(schedule_id)
             db.session.commit()
             return jsonify({'success': True, 'message': 'Successfully withdrawn from the course!'})
         return jsonify({'success': False, 'message': 'Enrollment not found'})
@@ -73,10 +72,11 @@ def search():
     if 'student_id' not in session:
         return redirect(url_for('auth.index'))
     search_term = request.args.get('q', '')
-    schedules = Schedule.query.join(Course).filter(
-        (Course.course_id.like(f'%{search_term}%')) |
-        (Course.course_name.like(f'%{search_term}%'))
-    ).all()
+    matches = search_course_ids(search_term, current_app.config.get('SEARCH_MAX_RESULTS', 200))
+    schedules = Schedule.query.join(Course).options(db.contains_eager(Schedule.course)).filter(
+        Course.course_id.in_(matches)
+    ).all() if matches else []
+    schedules = order_by_relevance(schedules, matches)
     return render_template('search.html', courses=schedules, search_term=search_term)
 
 @courses.route('/prerequisites/<course_id>')
@@ -86,6 +86,14 @@ def prerequisites(course_id):
     
     course = Course.query.get_or_404(course_id)
     prerequisites = course.prerequisites.all()
+
+    # Full chain in the order it can be taken, flagged against the student's record
+    chain_ids = get_prerequisite_graph().prerequisites_of(course_id)
+    by_id = {c.course_id: c for c in Course.query.filter(Course.course_id.in_(chain_ids))} if chain_ids else {}
+    chain = [by_id[chain_id] for chain_id in chain_ids if chain_id in by_id]
+    completed = get_completed_course_ids(session['student_id'])
     return render_template('prerequisites.html', 
                          prerequisites=prerequisites, 
+                         chain=chain,
+                         completed=completed,
                          course=course) 
\ No newline at end of file
@@ -1,10 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from ..models import db, Professor, Course, Schedule, Teaching, Enrolled, Grade
+from ..models import db, Professor, Course, Schedule, Teaching, Enrolled
 from datetime import datetime
 from ..forms import ProfessorForm
 from flask_login import current_user, login_required
 import os
 from werkzeug.utils import secure_filename
+from ..services.queries import get_teaching_assignments, get_schedule, get_roster, get_enrolled_roster
+from ..services.grades import parse_grade, parse_grade_rows, parse_grade_csv, submit_grades
+from ..services.exports import (export_response, ExportFormatError, TEACHING_SCHEDULE_FIELDS,
+                                teaching_schedule_statement, teaching_schedule_rows)
 
 professors = Blueprint('professors', __name__)
 
@@ -14,16 +18,13 @@ def dashboard():
     professor = current_user
 
     # Fetch teaching assignments
-    teaching_assignments = Teaching.query.filter_by(professor_id=professor.professor_id).all()
+    teaching_assignments = get_teaching_assignments(professor.professor_id)
 
     # Calculate total courses
     total_courses = len(teaching_assignments)
 
     # Calculate total students
-    total_students = sum(
-        sum(1 for e in teaching.schedule.enrollments if e.status.name == 'enrolled')
-        for teaching in teaching_assignments
-    )
+    total_students = sum(teaching.schedule.enrolled_count for teaching in teaching_assignments)
 
     total_course_load = sum(
         teaching.schedule.course.credits
@@ -39,7 +40,7 @@ def dashboard():
         {
             "course_code": teaching.schedule.course.course_code,
             "course_name": teaching.schedule.course.course_name,
-            "current_enrollment": sum(1 for e in teaching.schedule.enrollments if e.status.name == 'enrolled'),
+            "current_enrollment": teaching.schedule.enrolled_count,
             "max_capacity": teaching.schedule.course.max_capacity,
             "schedule_id": teaching.schedule.schedule_id,
         }
@@ -60,7 +61,7 @@ def dashboard():
 @login_required
 def courses():
     professor = current_user
-    teaching_assignments = Teaching.query.filter_by(professor_id=professor.professor_id).all()
+    teaching_assignments = get_teaching_assignments(professor.professor_id)
 
     # Transform teaching assignments into courses list
     courses = [
@@ -77,7 +78,7 @@ def courses():
 def my_courses():
     if 'professor_id' not in session:
         return redirect(url_for('auth.index'))
-    teaching_assignments = Teaching.query.filter_by(professor_id=session['professor_id']).all()
+    teaching_assignments = get_teaching_assignments(session['professor_id'])
     return render_template('professors/courses.html', teaching_assignments=teaching_assignments)
 
 @professors.route('/profile')
@@ -122,13 +123,13 @@ def course_details(schedule_id):
     if 'professor_id' not in session:
         return redirect(url_for('auth.index'))
     
-    schedule = Schedule.query.get(schedule_id)
+    schedule = get_schedule(schedule_id)
     if not schedule:
         flash('Course schedule not found', 'error')
         return redirect(url_for('professors_bp.dashboard'))
     
     # Get enrolled students
-    enrollments = Enrolled.query.filter_by(schedule_id=schedule_id).all()
+    enrollments = get_roster(schedule_id)
     
     return render_template('professors/course_details.html',
                          schedule=schedule,
@@ -142,7 +143,8 @@ def update_grade():
     grade = request.form.get('grade')
 
     try:
-        if grade not in Grade.__members__:
+        grade = parse_grade(grade)
+        if grade is None:
             return jsonify({'success': False, 'message': 'Invalid grade'})
 
         enrollment = Enrolled.query.get(enrollment_id)
@@ -157,20 +159,50 @@ def update_grade():
         if not teaching:
             return jsonify({'success': False, 'message': 'Unauthorized to update this grade'})
 
-        enrollment.grade = Grade[grade]
+        enrollment.grade = grade
         db.session.commit()
         return jsonify({'success': True, 'message': 'Grade updated successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)})
 
+@professors.route('/professor/grades/bulk', methods=['POST'])
+@login_required
+def bulk_update_grades():
+    """Grade a whole roster at once from JSON or an uploaded CSV (enrollment_id,grade)"""
+    professor = current_user
+
+    try:
+        upload = request.files.get('file')
+        if upload:
+            rows = parse_grade_csv(upload.stream)
+        else:
+            rows = parse_grade_rows(request.get_json(silent=True))
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not rows:
+        return jsonify({'success': False, 'message': 'No grades submitted'}), 400
+
+    try:
+        results = submit_grades(professor.professor_id, rows)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+    updated = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': updated == len(results),
+        'message': f'Updated {updated} of {len(results)} grade(s)',
+        'updated': updated,
+        'results': results
+    })
+
 @professors.route('/schedule')
 @login_required
 def schedule():
     professor = current_user
 
     # Fetch teaching assignments and related schedule data
-    teaching_assignments = Teaching.query.filter_by(professor_id=professor.professor_id).all()
+    teaching_assignments = get_teaching_assignments(professor.professor_id)
     schedule_data = {}
 
     for teaching in teaching_assignments:
@@ -194,47 +226,21 @@ def schedule():
 @professors.route('/schedule/download')
 @login_required
 def download_schedule():
-    professor = current_user
-
-    # Fetch teaching assignments and related schedule data
-    teaching_assignments = Teaching.query.filter_by(professor_id=professor.professor_id).all()
-    schedule_data = []
-
-    for teaching in teaching_assignments:
-        schedule = teaching.schedule
-        course = schedule.course
-
-        # Parse meeting days and organize data
-        for day in schedule.meeting_days:
-            schedule_data.append({
-                "day": day,
-                "course_code": course.course_code,
-                "course_name": course.course_name,
-                "start_time": schedule.start_time.strftime('%H:%M'),
-                "end_time": schedule.end_time.strftime('%H:%M'),
-                "room_number": schedule.room_number
-            })
-
-    # Generate a CSV file
-    import csv
-    from io import StringIO
-    from flask import Response
-
-    output = StringIO()
-    writer = csv.DictWriter(output, fieldnames=["day", "course_code", "course_name", "start_time", "end_time", "room_number"])
-    writer.writeheader()
-    writer.writerows(schedule_data)
-
-    # Return the CSV file as a response
-    output.seek(0)
-    return Response(output, mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=schedule.csv"})
+    try:
+        return export_response(
+            teaching_schedule_statement(current_user.professor_id), TEACHING_SCHEDULE_FIELDS, 'schedule',
+            request.args.get('format', 'csv'), transform=teaching_schedule_rows
+        )
+    except ExportFormatError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('professors.schedule'))
 
 # Removed the reference to `Material` in the `course_management` function.
 @professors.route('/course-management')
 @login_required
 def course_management():
     professor = current_user
-    teaching_assignments = Teaching.query.filter_by(professor_id=professor.professor_id).all()
+    teaching_assignments = get_teaching_assignments(professor.professor_id)
 
     # Fetch courses dynamically without materials
     courses = [
@@ -252,7 +258,7 @@ def view_course(schedule_id):
     professor = current_user
 
     # Fetch the schedule details
-    schedule = Schedule.query.get(schedule_id)
+    schedule = get_schedule(schedule_id)
     if not schedule:
         flash('Schedule not found', 'error')
         return redirect(url_for('professors.dashboard'))
@@ -264,7 +270,7 @@ def view_course(schedule_id):
         return redirect(url_for('professors.dashboard'))
 
     # Fetch enrolled students
-    enrollments = Enrolled.query.filter_by(schedule_id=schedule_id, status='enrolled').all()
+    enrollments = get_enrolled_roster(schedule_id)
 
     return render_template('professor/course_details.html', schedule=schedule, enrollments=enrollments)
 
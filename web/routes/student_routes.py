@@ -1,8 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from ..models import db, Student, StudentStatus, Schedule, Enrolled, EnrollmentStatus, Course, CourseLevel, Semester
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app
+from ..models import db, Student, StudentStatus, Schedule, Enrolled, EnrollmentStatus, Course, CourseLevel, Semester, SEAT_FULL_MESSAGE
 from datetime import datetime
 from flask_login import login_required, current_user
 from ..forms import StudentForm
+from ..services.registration import get_current_load
+from ..services.timeslots import find_conflicting_schedule_ids
+from ..services.timetable import build_timetables
+from ..services.catalog import catalog_query, get_catalog_page, get_prerequisite_codes, schedule_to_dict
+from ..services.waitlist import register_or_waitlist, leave_waitlist, promote_from_waitlist
+from ..services.exports import (export_response, ExportFormatError, ACADEMIC_HISTORY_FIELDS,
+                                academic_history_statement, academic_history_rows)
+from ..identity import get_current_student
 
 students = Blueprint('students', __name__)
 
@@ -11,7 +19,7 @@ def profile():
     if 'student_id' not in session:
         return redirect(url_for('auth.login'))
 
-    student = Student.query.get(session['student_id'])
+    student = get_current_student()
     if not student:
         flash('Student not found', 'error')
         return redirect(url_for('auth.login'))
@@ -41,7 +49,7 @@ def update_profile():
     if 'student_id' not in session:
         return jsonify({'success': False, 'message': 'Not logged in'})
     
-    student = Student.query.get(session['student_id'])
+    student = get_current_student()
     if not student:
         return jsonify({'success': False, 'message': 'Student not found'})
     
@@ -62,7 +70,7 @@ def dashboard():
     if 'student_id' not in session:
         return redirect(url_for('auth.login'))
 
-    student = Student.query.get(session['student_id'])
+    student = get_current_student()
     if not student:
         flash('Student not found', 'error')
         return redirect(url_for('auth.login'))
@@ -73,18 +81,9 @@ def dashboard():
         Enrolled.status == EnrollmentStatus.enrolled
     ).all()
 
-    # Calculate completed credits
-    completed_credits = sum(
-        enrollment.schedule.course.credits
-        for enrollment in student.enrollments
-        if enrollment.status == EnrollmentStatus.completed
-    )
-
-    total_credits = sum(
-        current_enrollments[i].schedule.course.credits
-        for i in range(len(current_enrollments))
-        if current_enrollments[i].status == EnrollmentStatus.enrolled
-    )
+    # Credit totals come from the materialized academic summary
+    completed_credits = student.get_completed_credits()
+    total_credits = student.get_current_enrolled_credits()
 
     # Initialize a dummy form for CSRF protection
     form = StudentForm()
@@ -104,7 +103,7 @@ def academic_history():
     if 'student_id' not in session:
         return redirect(url_for('auth.login'))
     
-    student = Student.query.get(session['student_id'])
+    student = get_current_student()
     if not student:
         flash('Student not found', 'error')
         return redirect(url_for('auth.login'))
@@ -112,8 +111,8 @@ def academic_history():
     enrollments = student.enrollments
     completed_courses = [e for e in student.enrollments if e.status == EnrollmentStatus.completed or e.grade is not None]
     gpa = student.get_gpa()
-    attempted_credits = sum(e.schedule.course.credits for e in enrollments if e.status != EnrollmentStatus.dropped)
-    completed_credits = sum(e.schedule.course.credits for e in enrollments if e.status == EnrollmentStatus.completed)
+    attempted_credits = student.get_attempted_credits()
+    completed_credits = student.get_completed_credits()
     return render_template(
         'student/academic_history.html',
         student=student,
@@ -128,98 +127,52 @@ def academic_history():
 def download_academic_history_csv():
     if 'student_id' not in session:
         return redirect(url_for('auth.login'))
-    import csv
-    from io import StringIO
-    student = Student.query.get(session['student_id'])
-    enrollments = student.enrollments
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Year/Semester', 'Course Code', 'Course Name', 'Professor', 'Credits', 'Level', 'Status', 'Grade'])
-    for e in enrollments:
-        prof = e.schedule.professors[0].last_name if e.schedule.professors and len(e.schedule.professors) > 0 else ''
-        writer.writerow([
-            f"{e.schedule.academic_year} {e.schedule.semester}",
-            e.schedule.course.course_code,
-            e.schedule.course.course_name,
-            prof,
-            e.schedule.course.credits,
-            e.schedule.course.level.value.capitalize(),
-            e.status.value.capitalize(),
-            e.grade if e.grade else 'N/A'
-        ])
-    output.seek(0)
-    from flask import Response
-    return Response(output, mimetype="text/csv", headers={"Content-Disposition": "attachment;filename=academic_history.csv"})
+    try:
+        return export_response(
+            academic_history_statement(session['student_id']), ACADEMIC_HISTORY_FIELDS, 'academic_history',
+            request.args.get('format', 'csv'), transform=academic_history_rows
+        )
+    except ExportFormatError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('students.academic_history'))
+
+def _catalog_page(student):
+    """Read the catalog filters from the request and load one keyset page"""
+    filters = {
+        'search': request.args.get('search', '').strip(),
+        'semester': request.args.get('semester', '').strip(),
+        'level': request.args.get('level', '').strip(),
+        'sort': request.args.get('sort', 'course_code'),  # default sort
+        'sort_dir': request.args.get('sort_dir', 'asc'),
+    }
+    query = catalog_query(get_allowed_course_levels(student.level),
+                          filters['search'], filters['semester'], filters['level'])
+    page_size = min(request.args.get('page_size', current_app.config.get('CATALOG_PAGE_SIZE', 25), type=int), 100)
+    schedules, next_cursor = get_catalog_page(query, filters['sort'], filters['sort_dir'],
+                                              after=request.args.get('after'), page_size=max(page_size, 1))
+
+    # Only the student's rows for the sections on this page
+    page_ids = [schedule.schedule_id for schedule in schedules]
+    enrolled_schedule_ids = {row.schedule_id for row in db.session.query(Enrolled.schedule_id).filter(
+        Enrolled.student_id == student.student_id,
+        Enrolled.schedule_id.in_(page_ids)
+    )} if page_ids else set()
+
+    # Flag sections that clash with the student's timetable (one bitmap pass)
+    conflicting_schedule_ids = find_conflicting_schedule_ids(schedules, get_current_load(student.student_id))
+    return filters, schedules, next_cursor, enrolled_schedule_ids, conflicting_schedule_ids
 
 @students.route('/student/available-courses')
 def available_courses():
     if 'student_id' not in session:
         return redirect(url_for('auth.login'))
 
-    student = Student.query.get(session['student_id'])
+    student = get_current_student()
     if not student:
         flash('Student not found', 'error')
         return redirect(url_for('auth.login'))
 
-    # Get filter and sort parameters from request
-    search = request.args.get('search', '').strip()
-    semester = request.args.get('semester', '').strip()
-    level = request.args.get('level', '').strip()
-    sort = request.args.get('sort', 'course_code')  # default sort
-    sort_dir = request.args.get('sort_dir', 'asc')
-
-    allowed_levels = get_allowed_course_levels(student.level)
-
-    # Build the base query
-    query = Schedule.query.join(Course).filter(
-        Course.level.in_(allowed_levels)
-    )
-
-    # Apply search filter
-    if search:
-        query = query.filter(
-            (Course.course_code.ilike(f"%{search}%")) |
-            (Course.course_name.ilike(f"%{search}%"))
-        )
-
-    # Apply semester filter
-    if semester:
-        query = query.filter(Schedule.semester == semester)
-
-    # Apply level filter
-    if level:
-        query = query.filter(Course.level == level)
-
-    # Sorting
-    sort_options = {
-        'course_code': Course.course_code,
-        'course_name': Course.course_name,
-        'credits': Course.credits,
-        'semester': Schedule.semester,
-        'academic_year': Schedule.academic_year
-    }
-    sort_column = sort_options.get(sort, Course.course_code)
-    if sort_dir == 'desc':
-        sort_column = sort_column.desc()
-    else:
-        sort_column = sort_column.asc()
-    query = query.order_by(sort_column)
-
-    schedules = query.all()
-
-    # Dynamically filter schedules with available spots and annotate with enrolled count
-    available_schedules = []
-    for schedule in schedules:
-        enrolled_count = sum(1 for e in schedule.enrollments if e.status == EnrollmentStatus.enrolled)
-        if enrolled_count < schedule.course.max_capacity:
-            schedule._enrolled_count = enrolled_count  # attach for template use
-            available_schedules.append(schedule)
-
-    # Get student's current enrollments to check for duplicates
-    student_enrollments = Enrolled.query.filter_by(
-        student_id=session['student_id']
-    ).all()
-    enrolled_schedule_ids = [e.schedule_id for e in student_enrollments]
+    filters, schedules, next_cursor, enrolled_schedule_ids, conflicting_schedule_ids = _catalog_page(student)
 
     # For filter dropdowns
     semesters = list(Semester)
@@ -229,17 +182,41 @@ def available_courses():
     form = StudentForm()
 
     return render_template('student/available_courses.html',
-                         schedules=available_schedules,
+                         schedules=schedules,
                          enrolled_schedule_ids=enrolled_schedule_ids,
+                         conflicting_schedule_ids=conflicting_schedule_ids,
+                         prerequisite_codes=get_prerequisite_codes(schedules),
+                         next_cursor=next_cursor,
+                         is_first_page=not request.args.get('after'),
                          student_level=student.level,
                          semesters=semesters,
                          course_levels=course_levels,
                          form=form,
-                         search=search,
-                         semester=semester,
-                         level=level,
-                         sort=sort,
-                         sort_dir=sort_dir)
+                         **filters)
+
+@students.route('/student/available-courses.json')
+def available_courses_json():
+    """Same catalog as available_courses, one page at a time for infinite scrolling"""
+    if 'student_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+
+    student = get_current_student()
+    if not student:
+        return jsonify({'success': False, 'message': 'Student not found'}), 404
+
+    filters, schedules, next_cursor, enrolled_schedule_ids, conflicting_schedule_ids = _catalog_page(student)
+    prerequisite_codes = get_prerequisite_codes(schedules)
+    return jsonify({
+        'success': True,
+        'items': [
+            schedule_to_dict(schedule, prerequisite_codes[schedule.course_id],
+                             enrolled=schedule.schedule_id in enrolled_schedule_ids,
+                             conflicting=schedule.schedule_id in conflicting_schedule_ids)
+            for schedule in schedules
+        ],
+        'next_cursor': next_cursor,
+        'next_url': url_for('students.available_courses_json', after=next_cursor, **filters) if next_cursor else None,
+    })
 
 def get_allowed_course_levels(student_level):
     """Determine which course levels a student can take based on their academic level"""
@@ -250,38 +227,55 @@ def get_allowed_course_levels(student_level):
     else:  # undergraduate
         return [CourseLevel.undergraduate]
 
-def check_credit_limits(student, course):
-    """Check if adding this course would exceed credit limits for the semester"""
-    # Get current semester enrollments
-    current_semester = get_current_semester()
-    semester_enrollments = Enrolled.query.join(Schedule).filter(
-        Enrolled.student_id == student.student_id,
-        Enrolled.status == EnrollmentStatus.enrolled,
-        Schedule.semester == current_semester
-    ).all()
-    
-    # Calculate current semester credits
-    current_credits = sum(e.schedule.course.credits for e in semester_enrollments)
-    
-    # Define credit limits based on student level
-    if student.level == CourseLevel.undergraduate:
-        max_credits = 18
-    elif student.level == CourseLevel.graduate:
-        max_credits = 12
-    else:  # PhD
-        max_credits = 9
-    
-    return current_credits + course.credits <= max_credits
-
-def get_current_semester():
-    """Determine the current semester based on the date"""
-    month = datetime.utcnow().month
-    if month >= 8 and month <= 12:
-        return Semester.Fall
-    elif month >= 1 and month <= 5:
-        return Semester.Spring
+@students.route('/student/timetable-builder', methods=['GET', 'POST'])
+def timetable_builder():
+    """Propose conflict-free section combinations for the requested courses (JSON)"""
+    if 'student_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'}), 401
+
+    student = get_current_student()
+    if not student:
+        return jsonify({'success': False, 'message': 'Student not found'}), 404
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = {}
+    if not isinstance(payload, dict):
+        return jsonify({'success': False, 'message': 'Send the request as a JSON object.'}), 400
+    course_ids = payload.get('course_ids') or request.values.getlist('course_id')
+    semester = payload.get('semester') or request.values.get('semester')
+    max_options = current_app.config.get('TIMETABLE_MAX_OPTIONS', 10)
+    try:
+        top_k = min(int(payload.get('top_k') or request.values.get('top_k', 5)), max_options)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'top_k must be a whole number.'}), 400
+    academic_year = payload.get('academic_year') or request.values.get('academic_year')
+    if academic_year is not None:
+        try:
+            if isinstance(academic_year, (bool, float)):
+                raise TypeError
+            academic_year = int(academic_year)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'academic_year must be a whole number.'}), 400
+    if not course_ids:
+        return jsonify({'success': False, 'message': 'Choose at least one course.'}), 400
+    if not isinstance(course_ids, list) or not all(isinstance(course_id, str) for course_id in course_ids):
+        return jsonify({'success': False, 'message': 'course_ids must be a list of course ids.'}), 400
+    if semester and semester not in Semester.__members__:
+        return jsonify({'success': False, 'message': f'Unknown semester: {semester}'}), 400
+
+    result = build_timetables(
+        student, course_ids,
+        semester=Semester[semester] if semester else None,
+        academic_year=academic_year,
+        top_k=max(top_k, 1),
+        time_budget=current_app.config.get('TIMETABLE_TIME_BUDGET_MS', 200) / 1000
+    )
+    if result['options']:
+        message = f"Found {len(result['options'])} timetable(s)."
     else:
-        return Semester.Summer
+        message = 'No conflict-free combination of open sections fits your schedule.'
+    return jsonify({'success': bool(result['options']), 'message': message, **result})
 
 @students.route('/student/register_course', methods=['POST'])
 def register_course():
@@ -293,92 +287,29 @@ def register_course():
     print(f"Debug: schedule_id={schedule_id}, student_id={session.get('student_id')}")
 
     try:
-        student = Student.query.get(session['student_id'])
+        student = get_current_student()
         if not student:
             flash('Student not found.', 'error')
             return redirect(url_for('students.available_courses'))
 
-        # Check if already enrolled - using the shared session
-        existing_enrollment = Enrolled.query.filter_by(
-            student_id=session['student_id'],
-            schedule_id=schedule_id
-        ).first()
-
-        if existing_enrollment:
-            if existing_enrollment.status == EnrollmentStatus.dropped:
-                existing_enrollment.status = EnrollmentStatus.enrolled
-                db.session.commit()
-                flash('Successfully re-registered for the course.', 'success')
-                return redirect(url_for('students.dashboard'))
-            flash('You are already enrolled in this course.', 'error')
-            return redirect(url_for('students.available_courses'))
-
-        # Get course and schedule information - using the shared session
-        schedule = Schedule.query.get(schedule_id)
-        if not schedule:
-            flash('Course schedule not found.', 'error')
+        verdict = register_or_waitlist(student, schedule_id)
+        if verdict.reason == 'waitlisted':
+            flash(verdict.message, 'info')
             return redirect(url_for('students.available_courses'))
-
-        # Prerequisite check
-        course = schedule.course
-        prerequisites = course.prerequisites.all() if hasattr(course.prerequisites, 'all') else course.prerequisites
-        missing_prereqs = []
-        for prereq in prerequisites:
-            completed = any(
-                e.schedule.course.course_id == prereq.course_id and e.status == EnrollmentStatus.completed
-                for e in student.enrollments
-            )
-            if not completed:
-                missing_prereqs.append(prereq.course_code)
-        if missing_prereqs:
-            flash(f"Cannot register: Missing prerequisite(s): {', '.join(missing_prereqs)}.", 'error')
+        if not verdict.ok:
+            flash(verdict.message, 'error')
             return redirect(url_for('students.available_courses'))
 
-        # Schedule conflict check
-        new_days = set(schedule.meeting_days)
-        new_start = schedule.start_time
-        new_end = schedule.end_time
-        current_enrollments = Enrolled.query.filter_by(
-            student_id=session['student_id'],
-            status=EnrollmentStatus.enrolled
-        ).all()
-        for enrollment in current_enrollments:
-            other_schedule = enrollment.schedule
-            overlap_days = new_days.intersection(set(other_schedule.meeting_days))
-            if overlap_days:
-                if (new_start < other_schedule.end_time and new_end > other_schedule.start_time):
-                    flash(
-                        f"Schedule conflict with {other_schedule.course.course_code} on {', '.join(overlap_days)} "
-                        f"({other_schedule.start_time.strftime('%H:%M')}-{other_schedule.end_time.strftime('%H:%M')})",
-                        'error'
-                    )
-                    return redirect(url_for('students.available_courses'))
-
-        # Check if the course has reached maximum enrollment
-        enrolled_count = sum(1 for e in schedule.enrollments if e.status == EnrollmentStatus.enrolled)
-        if enrolled_count >= schedule.course.max_capacity:
-            flash('Cannot register: The course has reached its maximum enrollment.', 'error')
-            return redirect(url_for('students.available_courses'))
-
-        # Create new enrollment within the same transaction
-        enrollment = Enrolled(
-            student_id=session['student_id'],
-            schedule_id=schedule_id,
-            status=EnrollmentStatus.enrolled
-        )
-
-        db.session.add(enrollment)
-        db.session.commit()
         print(f"Debug: Enrollment created for schedule_id={schedule_id}")
 
-        flash('Course registered successfully.', 'success')
+        flash(verdict.message, 'success')
         return redirect(url_for('students.dashboard'))
 
     except Exception as e:
         db.session.rollback()
         error_message = str(e)
         print(f"Error: {error_message}")
-        if 'Cannot enroll: Course has reached maximum enrollment' in error_message:
+        if SEAT_FULL_MESSAGE in error_message:
             flash('Cannot register: The course has reached its maximum enrollment.', 'error')
         else:
             flash(f'Error registering for the course: {error_message}', 'error')
@@ -410,6 +341,7 @@ def drop_course():
             return redirect(url_for('students.dashboard'))
 
         enrollment.status = EnrollmentStatus.dropped
+        promote_from_waitlist(enrollment.schedule_id)
         db.session.commit()
         print(f"Debug: Enrollment {enrollment_id} status updated to dropped.")
 
@@ -423,10 +355,28 @@ def drop_course():
         flash(f'Error dropping the course: {error_message}', 'error')
         return redirect(url_for('students.dashboard'))
 
+@students.route('/student/leave_waitlist', methods=['POST'])
+def leave_course_waitlist():
+    if 'student_id' not in session:
+        flash('You must be logged in to leave a waitlist.', 'error')
+        return redirect(url_for('auth.login'))
+
+    schedule_id = request.form.get('schedule_id')
+    try:
+        if leave_waitlist(session['student_id'], schedule_id):
+            db.session.commit()
+            flash('You have been removed from the waitlist.', 'success')
+        else:
+            flash('You are not on the waitlist for this course.', 'error')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error leaving the waitlist: {str(e)}', 'error')
+    return redirect(url_for('students.dashboard'))
+
 @students.route('/check-level-upgrade')
 @login_required
 def check_level_upgrade():
-    student = Student.query.get(current_user.id)
+    student = get_current_student()
     
     if student.level.value == 'phd':
         return jsonify({
@@ -462,7 +412,7 @@ def schedule():
     if 'student_id' not in session:
         return redirect(url_for('auth.login'))
 
-    student = Student.query.get(session['student_id'])
+    student = get_current_student()
     if not student:
         flash('Student not found', 'error')
         return redirect(url_for('auth.login'))
@@ -0,0 +1,355 @@
+"""Synthetic university data for benchmarks and sizing.
+
+Rows are generated deterministically from a seed and written with batched
+executemany INSERTs. Every generated row satisfies the CHECK constraints and
+triggers in mysql/init/01-init.sql: ids fit their columns, students are at
+least 16, schedules are in the current year or later, a section is never
+filled past max_capacity, and prerequisites only point at lower-numbered
+courses of the same department, so the prerequisite graph is acyclic.
+
+Sections of one term are spread over disjoint time slots; a professor never
+teaches two sections in the same slot and a student never takes two, so
+nothing conflicts. Terms earlier in the current year than the current
+semester hold completed enrollments with grades; later terms hold active
+enrollments.
+
+Students and enrollments are streamed, so memory stays flat for millions of
+students. On MySQL, `LoadDataWriter` loads each batch with LOAD DATA LOCAL
+INFILE instead of INSERTs; the enrolled triggers still fire for every row.
+"""
+import enum
+import os
+import random
+import tempfile
+from datetime import date, time
+from sqlalchemy import create_engine, text
+from .models import (db, Student, Professor, Course, Prerequisite, Schedule, Teaching, Enrolled, Waitlist,
+                     StudentAcademicSummary, DirectoryToken, StudentStatus, CourseLevel, SEMESTER_ORDER,
+                     EnrollmentStatus)
+from .services.registration import CREDIT_LIMITS, get_current_semester
+from .services.seats import reconcile_seat_counts
+from .services.academic_summary import rebuild_academic_summaries
+from .services.directory import rebuild_directory_index
+
+DEPARTMENTS = ['Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Biology',
+               'Economics', 'History', 'Psychology', 'English', 'Engineering']
+FIRST_NAMES = ['James', 'Mary', 'Wei', 'Priya', 'Carlos', 'Aisha', 'Olga', 'Kenji', 'Fatima', 'Liam',
+               'Sofia', 'Noah', 'Chen', 'Amara', 'Diego', 'Hana', 'Ivan', 'Zara', 'Omar', 'Grace']
+LAST_NAMES = ['Smith', 'Garcia', 'Nguyen', 'Patel', 'Kim', 'Okafor', 'Rossi', 'Cohen', 'Silva', 'Haddad',
+              'Novak', 'Tanaka', 'Brown', 'Khan', 'Lopez', 'Murphy', 'Schmidt', 'Ali', 'Jones', 'Sato']
+
+# Disjoint weekly meeting slots: any two share no day or do not overlap in time
+TIME_SLOTS = (
+    [('MWF', time(hour, 0), time(hour, 50)) for hour in range(8, 17)] +
+    [('TR', time(hour, minute), time(hour + 1, minute + 15))
+     for hour, minute in [(8, 0), (9, 30), (11, 0), (12, 30), (14, 0), (15, 30), (17, 0)]]
+)
+ALLOWED_LEVELS = {
+    CourseLevel.undergraduate: [CourseLevel.undergraduate],
+    CourseLevel.graduate: [CourseLevel.undergraduate, CourseLevel.graduate],
+    CourseLevel.phd: [CourseLevel.undergraduate, CourseLevel.graduate, CourseLevel.phd],
+}
+GRADE_WEIGHTS = {'A+': 2, 'A': 15, 'A-': 12, 'B+': 12, 'B': 15, 'B-': 10, 'C+': 8, 'C': 8,
+                 'C-': 5, 'D+': 3, 'D': 3, 'F': 4, 'W': 3}
+
+class SeedSpec:
+    """How much data to generate; ids are prefixed with `prefix` so runs can be removed again"""
+
+    def __init__(self, students=1000, professors=50, courses=200, sections_per_course=2,
+                 max_prerequisites=2, courses_per_term=(2, 5), years=2, seed=355, prefix='SY'):
+        if len(prefix) > 2:
+            raise ValueError('prefix must be at most 2 characters')
+        if not 1 <= years <= 5:
+            raise ValueError('years must be between 1 and 5')
+        self.students = students
+        self.professors = professors
+        self.courses = courses
+        self.sections_per_course = sections_per_course
+        self.max_prerequisites = max_prerequisites
+        self.courses_per_term = courses_per_term
+        self.years = years
+        self.seed = seed
+        self.prefix = prefix
+
+def get_terms(years):
+    """(semester, academic_year, is_past) for every term from this January on"""
+    this_year = date.today().year
+    current = SEMESTER_ORDER.index(get_current_semester())
+    return [
+        (semester, this_year + offset, offset == 0 and index < current)
+        for offset in range(years)
+        for index, semester in enumerate(SEMESTER_ORDER)
+    ]
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class UniversityGenerator:
+    """Produces row dicts for each table; students and enrollments are streamed"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.terms = get_terms(spec.years)
+        self.courses = []
+        self.schedules = []
+        self.sections = {}
+
+    def professors(self):
+        prefix = self.spec.prefix
+        for i in range(self.spec.professors):
+            professor_id = f'{prefix}P{i:06d}'
+            yield {
+                'professor_id': professor_id,
+                'first_name': self.rng.choice(FIRST_NAMES),
+                'last_name': self.rng.choice(LAST_NAMES),
+                'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+                'hire_date': date(self.rng.randint(1990, date.today().year - 1), self.rng.randint(1, 12), 1),
+                'email': f'{professor_id.lower()}@synthetic.edu',
+                'office_number': f'{i % 500:03d}',
+                'phone': f'555-{i % 10000:04d}',
+            }
+
+    def course_rows(self):
+        prefix = self.spec.prefix
+        levels = [CourseLevel.undergraduate] * 6 + [CourseLevel.graduate] * 3 + [CourseLevel.phd]
+        for i in range(self.spec.courses):
+            course = {
+                'course_id': f'{prefix}C{i:06d}',
+                'course_code': f'{prefix}-{i:06d}',
+                'course_name': f'{DEPARTMENTS[i % len(DEPARTMENTS)]} Topics {i}',
+                'description': None,
+                'credits': self.rng.choice([3, 3, 3, 3, 4, 4, 1, 2, 6]),
+                'department': DEPARTMENTS[i % len(DEPARTMENTS)],
+                'level': self.rng.choice(levels),
+                'max_capacity': self.rng.choice([20, 25, 30, 30, 40, 60, 120]),
+            }
+            self.courses.append(course)
+            yield course
+
+    def prerequisites(self):
+        """Edges only point at earlier courses of the same department, so there are no cycles"""
+        by_department = {}
+        for course in self.courses:
+            earlier = by_department.setdefault(course['department'], [])
+            count = min(len(earlier), self.rng.randint(0, self.spec.max_prerequisites))
+            for prerequisite in self.rng.sample(earlier, count):
+                yield {'course_id': course['course_id'], 'prerequisite_course_id': prerequisite['course_id']}
+            earlier.append(course)
+
+    def schedule_rows(self):
+        prefix = self.spec.prefix
+        per_term = {}
+        for i, course in enumerate(self.courses):
+            for section in range(self.spec.sections_per_course):
+                term_index = (i + section) % len(self.terms)
+                semester, year, is_past = self.terms[term_index]
+                position = per_term.get(term_index, 0)
+                per_term[term_index] = position + 1
+                slot = position % len(TIME_SLOTS)
+                lane = position // len(TIME_SLOTS)
+                days, start, end = TIME_SLOTS[slot]
+                schedule = {
+                    'schedule_id': f'{prefix}S{len(self.schedules):07d}',
+                    'course_id': course['course_id'],
+                    'semester': semester,
+                    'academic_year': year,
+                    'start_time': start,
+                    'end_time': end,
+                    'meeting_days': days,
+                    'room_number': f'R{lane:04d}',
+                    'enrolled_count': 0,
+                }
+                self.schedules.append((schedule, course, lane, {'seats': course['max_capacity'], 'past': is_past}))
+                self.sections.setdefault((term_index, slot), []).append(len(self.schedules) - 1)
+                yield schedule
+
+    def teaching_rows(self):
+        """One professor per section; lanes beyond the faculty size stay unstaffed to avoid clashes"""
+        prefix = self.spec.prefix
+        for i, (schedule, _, lane, _) in enumerate(self.schedules):
+            if lane < self.spec.professors:
+                yield {
+                    'teaching_id': f'{prefix}T{i:07d}',
+                    'professor_id': f'{prefix}P{lane:06d}',
+                    'schedule_id': schedule['schedule_id'],
+                }
+
+    def students_and_enrollments(self):
+        """Yield ('student', row) and ('enrolled', row) pairs, one student at a time"""
+        prefix = self.spec.prefix
+        today = date.today()
+        levels = [CourseLevel.undergraduate] * 15 + [CourseLevel.graduate] * 4 + [CourseLevel.phd]
+        statuses = [StudentStatus.active] * 18 + [StudentStatus.on_leave, StudentStatus.inactive]
+        grades = list(GRADE_WEIGHTS)
+        grade_weights = list(GRADE_WEIGHTS.values())
+        low, high = self.spec.courses_per_term
+
+        for i in range(self.spec.students):
+            student_id = f'{prefix}{i:08d}'
+            level = self.rng.choice(levels)
+            yield 'student', {
+                'student_id': student_id,
+                'first_name': self.rng.choice(FIRST_NAMES),
+                'last_name': self.rng.choice(LAST_NAMES),
+                'date_of_birth': date(today.year - self.rng.randint(18, 40), self.rng.randint(1, 12), self.rng.randint(1, 28)),
+                'major': self.rng.choice(DEPARTMENTS),
+                'status': self.rng.choice(statuses),
+                'level': level,
+                'email': f'{student_id.lower()}@synthetic.edu',
+            }
+
+            allowed = ALLOWED_LEVELS[level]
+            limit = CREDIT_LIMITS[level]
+            for term_index, (semester, year, is_past) in enumerate(self.terms):
+                credits = 0
+                slots = self.rng.sample(range(len(TIME_SLOTS)), min(len(TIME_SLOTS), self.rng.randint(low, high)))
+                for slot in slots:
+                    candidates = self.sections.get((term_index, slot))
+                    if not candidates:
+                        continue
+                    # A few random probes are enough; a full section or wrong level just skips the slot
+                    for _ in range(3):
+                        schedule, course, _, state = self.schedules[self.rng.choice(candidates)]
+                        if course['level'] in allowed and state['seats'] > 0 and credits + course['credits'] <= limit:
+                            break
+                    else:
+                        continue
+                    state['seats'] -= 1
+                    if is_past:
+                        grade = self.rng.choices(grades, grade_weights)[0]
+                        status = EnrollmentStatus.withdrawn if grade == 'W' else EnrollmentStatus.completed
+                    else:
+                        grade = None
+                        status = EnrollmentStatus.enrolled
+                    credits += course['credits']
+                    yield 'enrolled', {
+                        'student_id': student_id,
+                        'schedule_id': schedule['schedule_id'],
+                        'enrollment_date': date(year, 1 + SEMESTER_ORDER.index(semester) * 4, 1),
+                        'grade': grade,
+                        'status': status,
+                    }
+
+class ExecutemanyWriter:
+    """Batched INSERT ... VALUES through the app's session; works on every backend"""
+
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+
+    def __call__(self, table, rows):
+        count = 0
+        for batch in _batched(rows, self.batch_size):
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            count += len(batch)
+        return count
+
+def tsv_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, enum.Enum):
+        value = value.value
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+class LoadDataWriter:
+    """MySQL LOAD DATA LOCAL INFILE from temporary tab-separated files.
+
+    Needs local_infile enabled on the server. Uses its own engine because
+    the client side has to opt in to LOCAL INFILE per connection.
+    """
+
+    def __init__(self, batch_size=100000):
+        if db.engine.dialect.name != 'mysql':
+            raise ValueError('LOAD DATA is only available on MySQL')
+        self.batch_size = batch_size
+        self.engine = create_engine(db.engine.url, connect_args={'local_infile': True})
+
+    def __call__(self, table, rows):
+        count = 0
+        for batch in _batched(rows, self.batch_size):
+            columns = list(batch[0])
+            with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8', newline='') as f:
+                for row in batch:
+                    f.write('\t'.join(tsv_value(row[column]) for column in columns) + '\n')
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(text(
+                        f"LOAD DATA LOCAL INFILE :path INTO TABLE {table.name} CHARACTER SET utf8mb4 "
+                        f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(columns)})"
+                    ), {'path': f.name})
+            finally:
+                os.unlink(f.name)
+            count += len(batch)
+        return count
+
+    def close(self):
+        self.engine.dispose()
+
+def seed_database(spec, writer=None, echo=None):
+    """Generate and insert a synthetic university; returns the row count per table.
+
+    `writer` is called with (table, rows) and defaults to ExecutemanyWriter.
+    On MySQL the enrolled triggers maintain seat counters and academic
+    summaries while loading; elsewhere they are reconciled once at the end.
+    The directory search tokens are rebuilt at the end on every backend.
+    """
+    writer = writer or ExecutemanyWriter()
+    batch_size = writer.batch_size
+    echo = echo or (lambda message: None)
+    generator = UniversityGenerator(spec)
+    counts = {}
+
+    echo('Inserting professors and courses')
+    counts['professor'] = writer(Professor.__table__, generator.professors())
+    counts['courses'] = writer(Course.__table__, generator.course_rows())
+    counts['prerequisite'] = writer(Prerequisite.__table__, generator.prerequisites())
+    echo('Inserting schedules and teaching assignments')
+    counts['schedule'] = writer(Schedule.__table__, generator.schedule_rows())
+    counts['teaching'] = writer(Teaching.__table__, generator.teaching_rows())
+
+    echo('Inserting students and enrollments')
+    counts['student'] = counts['enrolled'] = 0
+    students, enrollments = [], []
+    for kind, row in generator.students_and_enrollments():
+        if kind == 'student':
+            students.append(row)
+        else:
+            enrollments.append(row)
+        if len(enrollments) >= batch_size or len(students) >= batch_size:
+            counts['student'] += writer(Student.__table__, students)
+            counts['enrolled'] += writer(Enrolled.__table__, enrollments)
+            students, enrollments = [], []
+            echo(f"  {counts['student']} students, {counts['enrolled']} enrollments")
+    counts['student'] += writer(Student.__table__, students)
+    counts['enrolled'] += writer(Enrolled.__table__, enrollments)
+
+    if db.engine.dialect.name != 'mysql':
+        echo('Reconciling seat counters and academic summaries')
+        reconcile_seat_counts()
+        rebuild_academic_summaries()
+    echo('Indexing the student and professor directory')
+    rebuild_directory_index()
+    return counts
+
+def clear_synthetic_data(prefix='SY'):
+    """Delete every row generated with `prefix`"""
+    pattern = f'{prefix}%'
+    db.session.execute(db.delete(Waitlist).where(db.or_(Waitlist.student_id.like(pattern), Waitlist.schedule_id.like(pattern))))
+    db.session.execute(db.delete(Enrolled).where(db.or_(Enrolled.student_id.like(pattern), Enrolled.schedule_id.like(pattern))))
+    db.session.execute(db.delete(Teaching).where(Teaching.teaching_id.like(pattern)))
+    db.session.execute(db.delete(Schedule).where(Schedule.schedule_id.like(pattern)))
+    db.session.execute(db.delete(Prerequisite).where(Prerequisite.course_id.like(pattern)))
+    db.session.execute(db.delete(Course).where(Course.course_id.like(pattern)))
+    db.session.execute(db.delete(Professor).where(Professor.professor_id.like(pattern)))
+    db.session.execute(db.delete(StudentAcademicSummary).where(StudentAcademicSummary.student_id.like(pattern)))
+    db.session.execute(db.delete(DirectoryToken).where(DirectoryToken.person_id.like(pattern)))
+    db.session.execute(db.delete(Student).where(Student.student_id.like(pattern)))
+    db.session.commit()
@@ -0,0 +1,17 @@
+from ..models import db, recompute_academic_summaries
+
+def rebuild_academic_summaries(student_ids=None):
+    """Recompute summaries from the enrolled table in one DELETE and one INSERT ... SELECT.
+
+    Use after backfills or after writes that bypass the enrolled triggers,
+    such as ON DELETE CASCADE from schedule or a change to a course's credits.
+    Rebuilds every student when `student_ids` is None. Commits and returns the
+    number of summaries written.
+    """
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        if not student_ids:
+            return 0
+    rebuilt = recompute_academic_summaries(db.session.connection(), student_ids)
+    db.session.commit()
+    return rebuilt
@@ -0,0 +1,439 @@
+"""Online database backups and restores.
+
+A backup is a directory holding one gzip-compressed, tab-separated file per
+table (MySQL LOAD DATA format, NULL as \\N) and a `manifest.json` with row
+counts and SHA-256 checksums. Tables are dumped in parallel, each worker on
+its own connection. On MySQL every worker opens
+`START TRANSACTION WITH CONSISTENT SNAPSHOT` under REPEATABLE READ while a
+coordinator holds FLUSH TABLES WITH READ LOCK for a moment, so all workers
+read the same point in time without blocking writers during the dump. If the
+account lacks the RELOAD privilege the dump falls back to one connection and
+one snapshot. Other backends always use a single read transaction.
+
+Incremental backups copy every table except `enrolled`, which usually
+dominates the database. For that table they only copy rows added since the
+base backup (enrollment_id above the base's highest id) or dated on or after
+the base's oldest still-open enrollment, since grades and status changes
+land on those. Older enrollments are treated as final.
+
+Restores verify every checksum first. They then drop the secondary indexes
+(and, on MySQL, the triggers), bulk-load the tables in dependency order and
+recreate the indexes and triggers. Tables derived from others
+(`student_academic_summary`, `directory_token`) are not backed up but rebuilt
+after a restore.
+"""
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time
+from decimal import Decimal
+from sqlalchemy.exc import DBAPIError
+from ..models import db, Enrolled, EnrollmentStatus, StudentAcademicSummary, DirectoryToken
+from ..seeding import tsv_value, LoadDataWriter
+from .academic_summary import rebuild_academic_summaries
+from .directory import rebuild_directory_index
+from .prerequisites import invalidate_prerequisite_graph
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+BATCH_SIZE = 5000
+DERIVED_TABLES = (StudentAcademicSummary.__tablename__, DirectoryToken.__tablename__)
+
+class BackupError(Exception):
+    """A backup could not be written, verified or restored"""
+
+def backup_tables():
+    """Tables to back up, parents before children"""
+    return [table for table in db.metadata.sorted_tables if table.name not in DERIVED_TABLES]
+
+class _HashingFile:
+    """Binary file wrapper that hashes and counts what is written through it"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        self.raw.flush()
+
+def _file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        raise BackupError(f'{directory} is not a backup (no {MANIFEST})')
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise BackupError(f"{directory}: unsupported backup format {manifest.get('format_version')}")
+    return manifest
+
+# Snapshots
+def _begin_snapshot(connection):
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        connection.exec_driver_sql('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        connection.exec_driver_sql('START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY')
+    elif dialect == 'sqlite':
+        connection.exec_driver_sql('BEGIN')  # pysqlite would not begin a transaction for SELECTs
+    else:
+        connection.exec_driver_sql('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+def open_snapshots(engine, workers):
+    """Connections that all read the same consistent point in time"""
+    if engine.dialect.name != 'mysql' or workers <= 1:
+        connection = engine.connect()
+        _begin_snapshot(connection)
+        return [connection]
+    coordinator = engine.connect()
+    try:
+        try:
+            coordinator.exec_driver_sql('FLUSH TABLES WITH READ LOCK')
+        except DBAPIError:
+            workers = 1  # without RELOAD, separate snapshots could differ
+        connections = [engine.connect() for _ in range(workers)]
+        for connection in connections:
+            _begin_snapshot(connection)
+        return connections
+    finally:
+        if workers > 1:
+            coordinator.exec_driver_sql('UNLOCK TABLES')
+        coordinator.close()
+
+# Backup
+def _enrolled_filter(select, after_enrollment_id, since):
+    return select.where(db.or_(Enrolled.enrollment_id > after_enrollment_id, Enrolled.enrollment_date >= since))
+
+def _dump_table(connection, table, directory, partial=None):
+    select = db.select(*table.columns).order_by(*table.primary_key.columns)
+    if partial is not None:
+        select = _enrolled_filter(select, partial['after_enrollment_id'], date.fromisoformat(partial['since']))
+    filename = f'{table.name}.tsv.gz'
+    rows = 0
+    with open(os.path.join(directory, filename), 'wb') as raw:
+        hashing = _HashingFile(raw)
+        with gzip.GzipFile(filename=filename, mode='wb', fileobj=hashing, compresslevel=6) as out:
+            result = connection.execution_options(yield_per=BATCH_SIZE).execute(select)
+            for partition in result.partitions():
+                out.write(''.join(
+                    '\t'.join(tsv_value(value) for value in row) + '\n' for row in partition
+                ).encode('utf-8'))
+                rows += len(partition)
+    entry = {
+        'file': filename,
+        'rows': rows,
+        'bytes': hashing.size,
+        'sha256': hashing.sha256.hexdigest(),
+        'columns': [column.name for column in table.columns],
+        'mode': 'full' if partial is None else 'incremental',
+    }
+    if partial is not None:
+        entry.update(partial)
+    return entry
+
+def _high_water_marks(connection):
+    """Highest enrollment id, and the date of the oldest enrollment that can still change"""
+    max_id = connection.execute(db.select(db.func.max(Enrolled.enrollment_id))).scalar() or 0
+    open_since = connection.execute(db.select(db.func.min(Enrolled.enrollment_date)).where(
+        Enrolled.status == EnrollmentStatus.enrolled
+    )).scalar()
+    if isinstance(open_since, str):
+        open_since = date.fromisoformat(open_since[:10])
+    return max_id, (open_since or date.today()).isoformat()
+
+def create_backup(directory, base=None, tables=None, workers=4, echo=None):
+    """Write a backup of the database into the new directory `directory`.
+
+    `base` is the directory of an earlier backup to make this one
+    incremental against. `tables` limits a full backup to some tables.
+    Returns the manifest.
+    """
+    echo = echo or (lambda message: None)
+    base_manifest = read_manifest(base) if base else None
+    if os.path.exists(directory) and os.listdir(directory):
+        raise BackupError(f'{directory} already exists and is not empty')
+    os.makedirs(directory, exist_ok=True)
+
+    selected = backup_tables()
+    if tables:
+        unknown = set(tables) - {table.name for table in selected}
+        if unknown:
+            raise BackupError(f"Unknown or derived table(s): {', '.join(sorted(unknown))}")
+        if base:
+            raise BackupError('An incremental backup always covers every table')
+        selected = [table for table in selected if table.name in tables]
+
+    connections = open_snapshots(db.engine, workers)
+    try:
+        max_enrollment_id, open_since = _high_water_marks(connections[0])
+        partial = None
+        if base_manifest is not None:
+            partial = {'after_enrollment_id': base_manifest['max_enrollment_id'], 'since': base_manifest['open_since']}
+
+        # Largest tables first so the slowest dump starts earliest
+        pending = queue.Queue()
+        for table in sorted(selected, key=lambda t: t.name != Enrolled.__tablename__):
+            pending.put(table)
+        entries, errors = {}, []
+        lock = threading.Lock()
+
+        def work(connection):
+            while not errors:
+                try:
+                    table = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    entry = _dump_table(connection, table, directory,
+                                        partial if table.name == Enrolled.__tablename__ else None)
+                except Exception as e:
+                    errors.append(e)
+                    return
+                with lock:
+                    entries[table.name] = entry
+                echo(f"  {table.name}: {entry['rows']} rows")
+
+        if len(connections) == 1:
+            work(connections[0])
+        else:
+            with ThreadPoolExecutor(max_workers=len(connections)) as pool:
+                list(pool.map(work, connections))
+        if errors:
+            raise errors[0]
+    finally:
+        for connection in connections:
+            connection.rollback()
+            connection.close()
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'dialect': db.engine.dialect.name,
+        'type': 'incremental' if base else 'full',
+        'base': os.path.relpath(os.path.abspath(base), os.path.abspath(directory)) if base else None,
+        'consistent_workers': len(connections),
+        'max_enrollment_id': max_enrollment_id,
+        'open_since': open_since,
+        'tables': {table.name: entries[table.name] for table in selected},
+    }
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+# Verify
+def backup_chain(directory):
+    """[(directory, manifest)] from the full backup up to `directory`"""
+    chain = []
+    seen = set()
+    while directory is not None:
+        path = os.path.realpath(directory)
+        if path in seen:
+            raise BackupError(f'{directory}: backup chain loops')
+        seen.add(path)
+        manifest = read_manifest(directory)
+        chain.append((directory, manifest))
+        directory = os.path.join(directory, manifest['base']) if manifest.get('base') else None
+    if chain[-1][1]['type'] != 'full':
+        raise BackupError(f'{chain[-1][0]}: the chain does not start with a full backup')
+    return chain[::-1]
+
+def verify_backup(directory):
+    """Problems found checking the files of `directory` and its base backups (empty when intact)"""
+    problems = []
+    for path, manifest in backup_chain(directory):
+        for name, entry in manifest['tables'].items():
+            file_path = os.path.join(path, entry['file'])
+            if not os.path.exists(file_path):
+                problems.append(f'{path}: {entry["file"]} is missing')
+            elif os.path.getsize(file_path) != entry['bytes'] or _file_sha256(file_path) != entry['sha256']:
+                problems.append(f'{path}: {entry["file"]} does not match its checksum')
+    return problems
+
+# Restore
+def _unescape(field):
+    if field == '\\N':
+        return None
+    if '\\' not in field:
+        return field
+    out, chars = [], iter(field)
+    for char in chars:
+        if char == '\\':
+            char = {'t': '\t', 'n': '\n', '\\': '\\'}.get(next(chars, ''), '')
+        out.append(char)
+    return ''.join(out)
+
+def _converter(column):
+    column_type = column.type
+    if isinstance(column_type, db.Enum) and column_type.enum_class is not None:
+        return column_type.enum_class
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return None
+    if python_type is int:
+        return int
+    if python_type is Decimal:
+        return Decimal
+    if python_type is datetime:
+        return datetime.fromisoformat
+    if python_type is date:
+        return lambda value: date.fromisoformat(value[:10])
+    if python_type is time:
+        return time.fromisoformat
+    if python_type is bool:
+        return lambda value: value in ('1', 'True', 'true')
+    return None
+
+def _read_rows(path, entry, table, keep=None):
+    """Typed row dicts from one backup file; `keep` filters them"""
+    columns = [table.c[name] for name in entry['columns']]
+    converters = [_converter(column) for column in columns]
+    names = [column.key for column in columns]
+    with gzip.open(os.path.join(path, entry['file']), 'rt', encoding='utf-8', newline='\n') as f:
+        for line in f:
+            values = []
+            for field, convert in zip(line.rstrip('\n').split('\t'), converters):
+                value = _unescape(field)
+                if value is not None and convert is not None:
+                    value = convert(value)
+                values.append(value)
+            row = dict(zip(names, values))
+            if keep is None or keep(row):
+                yield row
+
+def _superseded_by(later_entries):
+    """A predicate keeping the enrolled rows that no later incremental backup replaces"""
+    marks = [(entry['after_enrollment_id'], date.fromisoformat(entry['since'])) for entry in later_entries]
+    if not marks:
+        return None
+
+    def keep(row):
+        return not any(row['enrollment_id'] > after or row['enrollment_date'] >= since for after, since in marks)
+    return keep
+
+def _deferrable_indexes(table):
+    """Secondary indexes safe to drop while loading (not needed to back a foreign key)"""
+    fk_columns = {element.parent.name for constraint in table.foreign_key_constraints for element in constraint.elements}
+    return [index for index in table.indexes
+            if not index.unique and list(index.columns)[0].name not in fk_columns]
+
+def _mysql_triggers(connection):
+    rows = connection.exec_driver_sql(
+        'SELECT trigger_name FROM information_schema.triggers WHERE trigger_schema = DATABASE()'
+    ).all()
+    triggers = []
+    for (name,) in rows:
+        statement = connection.exec_driver_sql(f'SHOW CREATE TRIGGER `{name}`').mappings().one()
+        triggers.append((name, statement['SQL Original Statement']))
+    return triggers
+
+def restore_backup(directory, replace=False, method='executemany', echo=None):
+    """Load a backup (and the backups it is based on) into the current database.
+
+    The target tables must be empty unless `replace` is set, in which case
+    their rows are deleted first. `method` is 'executemany' (any backend)
+    or 'load-data' (MySQL LOAD DATA LOCAL INFILE). Returns rows loaded per table.
+    """
+    echo = echo or (lambda message: None)
+    chain = backup_chain(directory)
+    problems = verify_backup(directory)
+    if problems:
+        raise BackupError('Backup failed verification: ' + '; '.join(problems))
+
+    tables = {table.name: table for table in backup_tables()}
+    latest = chain[-1][1]['tables']
+    restore_names = [name for name in tables if name in latest]
+    engine = db.engine
+    mysql = engine.dialect.name == 'mysql'
+    db.session.remove()
+
+    counts = {}
+    with engine.connect() as connection:
+        if mysql:
+            connection.exec_driver_sql('SET FOREIGN_KEY_CHECKS = 0')
+            connection.exec_driver_sql('SET UNIQUE_CHECKS = 0')
+        non_empty = [name for name in restore_names
+                     if connection.execute(db.select(db.literal(1)).select_from(tables[name]).limit(1)).first()]
+        if non_empty and not replace:
+            raise BackupError(f"Tables are not empty: {', '.join(non_empty)} (restore with --replace to overwrite them)")
+        for name in reversed(restore_names):
+            connection.execute(tables[name].delete())
+        for name in DERIVED_TABLES:
+            connection.execute(db.metadata.tables[name].delete())
+
+        triggers = _mysql_triggers(connection) if mysql else []
+        for name, _ in triggers:
+            connection.exec_driver_sql(f'DROP TRIGGER `{name}`')
+        deferred = [index for name in restore_names for index in _deferrable_indexes(tables[name])]
+        for index in deferred:
+            index.drop(connection)
+        connection.commit()
+        echo(f'Dropped {len(deferred)} index(es) and {len(triggers)} trigger(s) for the load')
+
+        try:
+            writer = LoadDataWriter(BATCH_SIZE * 20) if method == 'load-data' else None
+            for name in restore_names:
+                table = tables[name]
+                # The newest file of a fully copied table wins; enrolled rows
+                # are gathered across the chain, minus those replaced later
+                sources = []
+                for level, (path, manifest) in enumerate(chain):
+                    entry = manifest['tables'].get(name)
+                    if entry is None:
+                        continue
+                    if entry['mode'] == 'full':
+                        sources = []
+                    later = [m['tables'][name] for _, m in chain[level + 1:]
+                             if m['tables'].get(name, {}).get('mode') == 'incremental']
+                    sources.append((path, entry, _superseded_by(later)))
+                counts[name] = 0
+                for path, entry, keep in sources:
+                    rows = _read_rows(path, entry, table, keep)
+                    if writer is not None:
+                        connection.commit()
+                        counts[name] += writer(table, rows)
+                        continue
+                    batch = []
+                    for row in rows:
+                        batch.append(row)
+                        if len(batch) >= BATCH_SIZE:
+                            connection.execute(table.insert(), batch)
+                            counts[name] += len(batch)
+                            batch = []
+                    if batch:
+                        connection.execute(table.insert(), batch)
+                        counts[name] += len(batch)
+                    connection.commit()
+                echo(f'  {name}: {counts[name]} rows')
+        finally:
+            if writer is not None:
+                writer.close()
+            for index in deferred:
+                index.create(connection)
+            for _, statement in triggers:
+                connection.exec_driver_sql(statement)
+            if mysql:
+                connection.exec_driver_sql('SET UNIQUE_CHECKS = 1')
+                connection.exec_driver_sql('SET FOREIGN_KEY_CHECKS = 1')
+            connection.commit()
+
+    echo('Rebuilding academic summaries and the directory index')
+    rebuild_academic_summaries()
+    rebuild_directory_index()
+    invalidate_prerequisite_graph()
+    return counts
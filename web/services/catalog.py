@@ -0,0 +1,131 @@
+"""Keyset-paginated course catalog for students.
+
+Pages are addressed by an opaque cursor holding the sort value and
+schedule_id of the last row shown, so page N costs the same as page 1.
+With the composite indexes on courses (level, <sort column>) and schedule
+(academic_year, semester), the database reads about one page of rows
+instead of sorting the whole catalog. Full sections are filtered in SQL
+with the schedule.enrolled_count counter.
+"""
+import base64
+import json
+from ..models import db, Schedule, Course, Semester
+from .prerequisites import get_prerequisite_graph
+from .search import filter_by_search
+
+SORT_COLUMNS = {
+    'course_code': Course.course_code,
+    'course_name': Course.course_name,
+    'credits': Course.credits,
+    'semester': Schedule.semester,
+    'academic_year': Schedule.academic_year,
+}
+
+def encode_cursor(value, schedule_id):
+    raw = json.dumps([value, schedule_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (value, schedule_id), or None for a missing or malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, schedule_id = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(schedule_id, str):
+        return None
+    # Only scalars can be compared with a sort column; bool is an int subclass
+    if isinstance(value, bool) or not isinstance(value, (str, int, float, type(None))):
+        return None
+    return value, schedule_id
+
+def _sort_value(schedule, sort):
+    if sort == 'semester':
+        return schedule.semester.value
+    if sort == 'academic_year':
+        return schedule.academic_year
+    return getattr(schedule.course, sort)
+
+def catalog_query(allowed_levels, search='', semester='', level=''):
+    """Open sections the student may take, with course and professors loaded"""
+    query = Schedule.query.join(Course).options(
+        db.contains_eager(Schedule.course),
+        db.selectinload(Schedule.professors)
+    ).filter(
+        Course.level.in_(allowed_levels),
+        Schedule.enrolled_count < Course.max_capacity
+    )
+    if search:
+        query = filter_by_search(query, search)
+    if semester:
+        query = query.filter(Schedule.semester == semester)
+    if level:
+        query = query.filter(Course.level == level)
+    return query
+
+def get_catalog_page(query, sort='course_code', sort_dir='asc', after=None, page_size=25):
+    """One page of `query` in (sort column, schedule_id) order.
+
+    Returns (schedules, next_cursor); next_cursor is None on the last page.
+    """
+    if sort not in SORT_COLUMNS:
+        sort = 'course_code'
+    column = SORT_COLUMNS[sort]
+    descending = sort_dir == 'desc'
+
+    position = decode_cursor(after)
+    if position is not None:
+        value, schedule_id = position
+        if sort == 'semester':
+            # ENUM order (Fall, Spring, Summer) matches string order, so the comparison agrees with ORDER BY
+            value = Semester(value) if value in Semester._value2member_map_ else None
+        if value is not None:
+            key = db.tuple_(column, Schedule.schedule_id)
+            query = query.filter(key < (value, schedule_id) if descending else key > (value, schedule_id))
+
+    if descending:
+        query = query.order_by(column.desc(), Schedule.schedule_id.desc())
+    else:
+        query = query.order_by(column.asc(), Schedule.schedule_id.asc())
+
+    rows = query.limit(page_size + 1).all()
+    schedules = rows[:page_size]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = schedules[-1]
+        next_cursor = encode_cursor(_sort_value(last, sort), last.schedule_id)
+    return schedules, next_cursor
+
+def get_prerequisite_codes(schedules):
+    """Direct prerequisite course codes per course id, from the cached graph (no query)"""
+    graph = get_prerequisite_graph()
+    return {
+        schedule.course_id: [graph.codes[course_id] for course_id in graph.prerequisites_of(schedule.course_id, transitive=False)]
+        for schedule in schedules
+    }
+
+def schedule_to_dict(schedule, prerequisite_codes=(), enrolled=False, conflicting=False):
+    course = schedule.course
+    return {
+        'schedule_id': schedule.schedule_id,
+        'course_id': course.course_id,
+        'course_code': course.course_code,
+        'course_name': course.course_name,
+        'description': course.description,
+        'credits': course.credits,
+        'level': course.level.value if course.level else None,
+        'semester': schedule.semester.value,
+        'academic_year': schedule.academic_year,
+        'meeting_days': schedule.meeting_days,
+        'start_time': schedule.start_time.strftime('%H:%M'),
+        'end_time': schedule.end_time.strftime('%H:%M'),
+        'room_number': schedule.room_number,
+        'professor': schedule.professors[0].last_name if schedule.professors else None,
+        'enrolled_count': schedule.enrolled_count,
+        'max_capacity': course.max_capacity,
+        'prerequisites': list(prerequisite_codes),
+        'enrolled': enrolled,
+        'time_conflict': conflicting,
+    }
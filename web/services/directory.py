@@ -0,0 +1,190 @@
+"""Prefix search over the student and professor directory.
+
+Each person is broken into lowercase tokens (name words, the full email, the
+email's local part and its pieces, the id and, for professors, department
+words) stored in `directory_token`. Every word of a query must be the prefix
+of one of a person's tokens, so "jo sm" finds John Smith. Each word becomes a
+range scan on the (person_type, token, person_id) primary key, so the lookup
+does not depend on table size the way `LIKE '%x%'` over four columns does.
+
+The ORM events below collect the tokens of inserted, updated and deleted
+people during a flush and write them in one batch once the flush has run.
+Bulk loads that bypass the ORM should be followed by
+`flask rebuild-directory-index`.
+"""
+import re
+from ..models import db, Student, Professor, DirectoryToken
+
+TOKEN_LENGTH = DirectoryToken.__table__.c.token.type.length
+BATCH_SIZE = 5000
+
+PEOPLE = {
+    'student': (Student, Student.student_id, ('first_name', 'last_name', 'email', 'student_id')),
+    'professor': (Professor, Professor.professor_id, ('first_name', 'last_name', 'email', 'professor_id', 'department')),
+}
+PERSON_TYPES = {model: person_type for person_type, (model, _, _) in PEOPLE.items()}
+
+_WORD = re.compile(r'[^\W_]+')
+
+def person_tokens(first_name=None, last_name=None, email=None, person_id=None, department=None):
+    """The set of lowercase tokens one person is found by"""
+    tokens = set()
+    for value in (first_name, last_name, department):
+        if value:
+            tokens.update(_WORD.findall(value.lower()))
+    if email:
+        email = email.lower()
+        local = email.split('@', 1)[0]
+        tokens.update((email, local))
+        tokens.update(_WORD.findall(local))
+    if person_id:
+        tokens.add(person_id.lower())
+    return {token[:TOKEN_LENGTH] for token in tokens if token}
+
+def _tokens_of(person_type, fields):
+    fields = dict(fields)
+    fields['person_id'] = fields.pop(PEOPLE[person_type][1].key)
+    return person_tokens(**fields)
+
+def query_terms(query):
+    return list(dict.fromkeys((query or '').lower().split()))
+
+def matching_ids(person_type, term):
+    """Subquery of ids of `person_type` with a token starting with `term`"""
+    return db.select(DirectoryToken.person_id).where(
+        DirectoryToken.person_type == person_type,
+        DirectoryToken.token.startswith(term[:TOKEN_LENGTH], autoescape=True)
+    )
+
+def filter_directory(query, person_type, search):
+    """Restrict a Student or Professor query to people matching every word of `search`"""
+    id_column = PEOPLE[person_type][1]
+    for term in query_terms(search):
+        query = query.filter(id_column.in_(matching_ids(person_type, term)))
+    return query
+
+def typeahead(person_type, search, limit=10, **filters):
+    """Up to `limit` people matching `search`, as dicts for the typeahead endpoint.
+
+    `filters` are equality filters on the person's columns (status, major,
+    department); empty values are ignored.
+    """
+    model, id_column, _ = PEOPLE[person_type]
+    if not query_terms(search):
+        return []
+    query = filter_directory(model.query, person_type, search)
+    for column, value in filters.items():
+        if value:
+            query = query.filter(getattr(model, column) == value)
+    people = query.order_by(id_column).limit(limit).all()
+    items = []
+    for person in people:
+        item = {
+            'type': person_type,
+            'id': getattr(person, id_column.key),
+            'name': f'{person.first_name} {person.last_name}',
+            'email': person.email,
+        }
+        if person_type == 'student':
+            item.update(major=person.major, status=person.status.value if person.status else None)
+        else:
+            item.update(department=person.department)
+        items.append(item)
+    return items
+
+def _insert_tokens(connection, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(db.insert(DirectoryToken), rows[start:start + BATCH_SIZE])
+
+def index_people(connection, person_type, people):
+    """Write the tokens of people inserted without the ORM (dicts of their columns)"""
+    fields = PEOPLE[person_type][2]
+    id_key = PEOPLE[person_type][1].key
+    _insert_tokens(connection, [
+        {'person_type': person_type, 'token': token, 'person_id': person[id_key]}
+        for person in people
+        for token in _tokens_of(person_type, {field: person.get(field) for field in fields})
+    ])
+
+def rebuild_directory_index(person_types=None):
+    """Regenerate the tokens of every student and professor. Commits; returns the rows written."""
+    connection = db.session.connection()
+    written = 0
+    for person_type in person_types or PEOPLE:
+        model, id_column, fields = PEOPLE[person_type]
+        connection.execute(db.delete(DirectoryToken).where(DirectoryToken.person_type == person_type))
+        columns = [getattr(model, field) for field in fields]
+        last_id = None
+        while True:
+            # Keyset batches, so inserts can run on the same connection between reads
+            select = db.select(*columns).order_by(id_column).limit(BATCH_SIZE)
+            if last_id is not None:
+                select = select.where(id_column > last_id)
+            people = connection.execute(select).mappings().all()
+            if not people:
+                break
+            rows = [{'person_type': person_type, 'token': token, 'person_id': person[id_column.key]}
+                    for person in people for token in _tokens_of(person_type, person)]
+            _insert_tokens(connection, rows)
+            written += len(rows)
+            last_id = people[-1][id_column.key]
+    db.session.commit()
+    return written
+
+# Incremental maintenance: mapper events record each changed person's new
+# tokens (None when deleted); the batch is written after the flush.
+def _pending(target):
+    session = db.inspect(target).session
+    if session is None:
+        return None
+    return session.info.setdefault('stale_directory_entries', {})
+
+def _collect(target, deleted=False):
+    pending = _pending(target)
+    if pending is None:
+        return
+    person_type = PERSON_TYPES[type(target)]
+    _, id_column, fields = PEOPLE[person_type]
+    state = db.inspect(target)
+    for old_id in state.attrs[id_column.key].history.deleted:
+        pending[person_type, old_id] = None
+    person_id = getattr(target, id_column.key)
+    pending[person_type, person_id] = None if deleted else _tokens_of(
+        person_type, {field: getattr(target, field) for field in fields})
+
+@db.event.listens_for(Student, 'after_insert')
+@db.event.listens_for(Professor, 'after_insert')
+def collect_directory_after_insert(mapper, connection, target):
+    _collect(target)
+
+@db.event.listens_for(Student, 'after_update')
+@db.event.listens_for(Professor, 'after_update')
+def collect_directory_after_update(mapper, connection, target):
+    state = db.inspect(target)
+    fields = PEOPLE[PERSON_TYPES[type(target)]][2]
+    if any(state.attrs[field].history.has_changes() for field in fields):
+        _collect(target)
+
+@db.event.listens_for(Student, 'after_delete')
+@db.event.listens_for(Professor, 'after_delete')
+def collect_directory_after_delete(mapper, connection, target):
+    _collect(target, deleted=True)
+
+@db.event.listens_for(db.session, 'after_flush_postexec')
+def write_directory_tokens(session, flush_context):
+    pending = session.info.pop('stale_directory_entries', None)
+    if not pending:
+        return
+    connection = session.connection()
+    for person_type in PEOPLE:
+        person_ids = [person_id for kind, person_id in pending if kind == person_type]
+        if person_ids:
+            connection.execute(db.delete(DirectoryToken).where(
+                DirectoryToken.person_type == person_type,
+                DirectoryToken.person_id.in_(person_ids)
+            ))
+    _insert_tokens(connection, [
+        {'person_type': person_type, 'token': token, 'person_id': person_id}
+        for (person_type, person_id), tokens in pending.items() if tokens
+        for token in tokens
+    ])
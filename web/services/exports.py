@@ -0,0 +1,357 @@
+"""Streaming file exports.
+
+Rows come from a Core select executed with `yield_per`, which on MySQL uses
+a server-side cursor, so only one batch of rows is in memory at a time.
+They are encoded into chunks of about CHUNK_SIZE bytes as they arrive, and
+the generator is sent as a streamed response, so the first bytes go out
+before the query has finished. The export queries select joined columns
+directly instead of ORM objects, so nothing is lazy-loaded per row.
+
+Formats: csv, csv.gz, jsonl, jsonl.gz, and (when pyarrow is installed)
+arrow (IPC stream) and parquet, written one record batch / row group per
+database batch. Whole tables can also be bundled into one zip or tar
+archive of CSV or JSONL members (`archive_chunks`).
+"""
+import csv
+import io
+import json
+import tarfile
+import tempfile
+import zipfile
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from flask import Response, stream_with_context
+from ..models import db, Student, Professor, Teaching, Schedule, Course, Enrolled
+
+BATCH_SIZE = 2000
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'csv.gz': ('application/gzip', '.csv.gz'),
+    'jsonl': ('application/x-ndjson', '.jsonl'),
+    'jsonl.gz': ('application/gzip', '.jsonl.gz'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrow'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+class ExportFormatError(ValueError):
+    """Unknown export format, or one whose optional dependency is missing"""
+
+def plain(value):
+    """A CSV/JSON/Arrow-friendly version of a column value"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+def stream_rows(statement, batch_size=BATCH_SIZE, connection=None):
+    """Yield lists of row tuples from `statement`, `batch_size` rows at a time"""
+    connection = connection or db.session.connection()
+    result = connection.execution_options(yield_per=batch_size).execute(statement)
+    try:
+        for partition in result.partitions():
+            yield [tuple(plain(value) for value in row) for row in partition]
+    finally:
+        result.close()
+
+def _rechunk(pieces, chunk_size=CHUNK_SIZE):
+    """Join small byte strings into chunks of about `chunk_size`"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+def csv_chunks(fieldnames, batches):
+    text = io.StringIO()
+    writer = csv.writer(text)
+
+    def pieces():
+        writer.writerow(fieldnames)
+        for batch in batches:
+            writer.writerows(batch)
+            yield text.getvalue().encode('utf-8')
+            text.seek(0)
+            text.truncate()
+        yield text.getvalue().encode('utf-8')
+    return _rechunk(pieces())
+
+def jsonl_chunks(fieldnames, batches):
+    def pieces():
+        for batch in batches:
+            yield ''.join(
+                json.dumps(dict(zip(fieldnames, row)), default=str, separators=(',', ':')) + '\n' for row in batch
+            ).encode('utf-8')
+    return _rechunk(pieces())
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+class _Drain(io.RawIOBase):
+    """Write-only file that hands its contents to a generator between writes"""
+
+    def __init__(self):
+        self.pending = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.pending.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.pending)
+        self.pending = []
+        return data
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportFormatError('Arrow and Parquet exports need the optional pyarrow package')
+    return pyarrow
+
+def arrow_chunks(fieldnames, batches, fmt='arrow'):
+    """Arrow IPC stream or Parquet, one record batch / row group per database batch.
+
+    The schema is inferred from the first batch; columns that are all null
+    there are typed as strings.
+    """
+    pa = _import_pyarrow()
+    sink = _Drain()
+    writer = schema = None
+    try:
+        for batch in batches:
+            columns = list(zip(*batch)) if batch else [[] for _ in fieldnames]
+            if schema is None:
+                arrays = [pa.array(column) for column in columns]
+                schema = pa.schema([
+                    pa.field(name, pa.string() if pa.types.is_null(array.type) else array.type)
+                    for name, array in zip(fieldnames, arrays)
+                ])
+                if fmt == 'parquet':
+                    writer = pa.parquet.ParquetWriter(sink, schema)
+                else:
+                    writer = pa.ipc.new_stream(sink, schema)
+            table = pa.table([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+            writer.write_table(table)
+            data = sink.take()
+            if data:
+                yield data
+        if writer is None:
+            schema = pa.schema([pa.field(name, pa.string()) for name in fieldnames])
+            writer = pa.parquet.ParquetWriter(sink, schema) if fmt == 'parquet' else pa.ipc.new_stream(sink, schema)
+        writer.close()
+        writer = None
+        yield sink.take()
+    finally:
+        if writer is not None:
+            writer.close()
+
+def encode(fieldnames, batches, fmt='csv'):
+    """Byte chunks of `batches` in export format `fmt`"""
+    if fmt not in FORMATS:
+        raise ExportFormatError(f"Unknown export format '{fmt}'; choose one of {', '.join(FORMATS)}")
+    if fmt in ('arrow', 'parquet'):
+        return arrow_chunks(fieldnames, batches, fmt)
+    chunks = csv_chunks(fieldnames, batches) if fmt.startswith('csv') else jsonl_chunks(fieldnames, batches)
+    return gzip_chunks(chunks) if fmt.endswith('.gz') else chunks
+
+def _content_response(chunks, mimetype, filename):
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+def export_response(statement, fieldnames, basename, fmt='csv', transform=None):
+    """A streamed download of `statement` in format `fmt`.
+
+    `transform`, when given, maps each row tuple to a list of exported rows.
+    Raises ExportFormatError before anything is sent if `fmt` is unusable.
+    """
+    if fmt in ('arrow', 'parquet'):
+        _import_pyarrow()
+    elif fmt not in FORMATS:
+        raise ExportFormatError(f"Unknown export format '{fmt}'; choose one of {', '.join(FORMATS)}")
+    mimetype, extension = FORMATS[fmt]
+
+    def batches():
+        for batch in stream_rows(statement):
+            yield [out for row in batch for out in transform(row)] if transform else batch
+
+    return _content_response(encode(fieldnames, batches(), fmt), mimetype, basename + extension)
+
+# Exports offered to students and professors
+ACADEMIC_HISTORY_FIELDS = ['Year/Semester', 'Course Code', 'Course Name', 'Professor', 'Credits', 'Level', 'Status', 'Grade']
+
+def academic_history_statement(student_id):
+    """A student's enrollments with course and (first by name) professor, in one query"""
+    professor = db.select(db.func.min(Professor.last_name)).join(
+        Teaching, Teaching.professor_id == Professor.professor_id
+    ).where(Teaching.schedule_id == Schedule.schedule_id).correlate(Schedule).scalar_subquery()
+    return db.select(
+        Schedule.academic_year, Schedule.semester, Course.course_code, Course.course_name, professor,
+        Course.credits, Course.level, Enrolled.status, Enrolled.grade
+    ).join(Schedule, Schedule.schedule_id == Enrolled.schedule_id).join(
+        Course, Course.course_id == Schedule.course_id
+    ).where(Enrolled.student_id == student_id).order_by(
+        Schedule.academic_year, Schedule.semester, Course.course_code
+    )
+
+def academic_history_rows(row):
+    year, semester, code, name, professor, credits, level, status, grade = row
+    return [(f'{year} {semester}', code, name, professor or '', credits,
+             (level or '').capitalize(), (status or '').capitalize(), grade or 'N/A')]
+
+TEACHING_SCHEDULE_FIELDS = ['day', 'course_code', 'course_name', 'start_time', 'end_time', 'room_number']
+
+def teaching_schedule_statement(professor_id):
+    return db.select(
+        Schedule.meeting_days, Course.course_code, Course.course_name,
+        Schedule.start_time, Schedule.end_time, Schedule.room_number
+    ).select_from(Teaching).join(Schedule, Schedule.schedule_id == Teaching.schedule_id).join(
+        Course, Course.course_id == Schedule.course_id
+    ).where(Teaching.professor_id == professor_id).order_by(Teaching.schedule_id)
+
+def teaching_schedule_rows(row):
+    """One row per meeting day"""
+    days, code, name, start, end, room = row
+    return [(day, code, name, start[:5], end[:5], room) for day in days]
+
+# Table exports for admins: whole tables, optionally narrowed to one term
+# (sections, enrollments, teaching) and/or one department (also matched
+# against professors' departments, course departments and student majors).
+EXPORT_TABLES = {
+    'student': Student,
+    'professor': Professor,
+    'courses': Course,
+    'schedule': Schedule,
+    'enrolled': Enrolled,
+    'teaching': Teaching,
+}
+ARCHIVES = {
+    'zip': ('application/zip', '.zip'),
+    'tar': ('application/x-tar', '.tar'),
+    'tar.gz': ('application/gzip', '.tar.gz'),
+}
+ARCHIVE_MEMBER_FORMATS = ('csv', 'jsonl')
+
+def table_statement(name, semester=None, academic_year=None, department=None):
+    """SELECT of every column of export table `name`, in primary key order, with the filters applied"""
+    model = EXPORT_TABLES[name]
+    table = model.__table__
+    statement = db.select(*table.columns).order_by(*table.primary_key.columns)
+    if name in ('enrolled', 'teaching') and (semester or academic_year or department):
+        statement = statement.join(Schedule, Schedule.schedule_id == model.schedule_id)
+    if name in ('schedule', 'enrolled', 'teaching'):
+        if semester:
+            statement = statement.where(Schedule.semester == semester)
+        if academic_year:
+            statement = statement.where(Schedule.academic_year == academic_year)
+        if department:
+            statement = statement.join(Course, Course.course_id == Schedule.course_id).where(Course.department == department)
+    elif department:
+        column = {'student': Student.major, 'professor': Professor.department, 'courses': Course.department}[name]
+        statement = statement.where(column == department)
+    return statement
+
+def _member_chunks(name, member_format, filters, counts):
+    fieldnames = [column.name for column in EXPORT_TABLES[name].__table__.columns]
+
+    def batches():
+        counts[name] = 0
+        for batch in stream_rows(table_statement(name, **filters)):
+            counts[name] += len(batch)
+            yield batch
+
+    if member_format == 'csv':
+        return csv_chunks(fieldnames, batches())
+    return jsonl_chunks(fieldnames, batches())
+
+def _zip_chunks(members):
+    sink = _Drain()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, chunks in members:
+            # Unseekable output: sizes and CRC go in a data descriptor after each member
+            with archive.open(filename, 'w', force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    data = sink.take()
+                    if data:
+                        yield data
+            yield sink.take()
+    yield sink.take()
+
+def _tar_chunks(members, compress=False):
+    # A tar header holds the member size, so each member is spooled (to disk
+    # past 8 MiB) before its header is written; memory stays bounded.
+    sink = _Drain()
+    with tarfile.open(fileobj=sink, mode='w|gz' if compress else 'w|') as archive:
+        for filename, chunks in members:
+            with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+                for chunk in chunks:
+                    spool.write(chunk)
+                info = tarfile.TarInfo(filename)
+                info.size = spool.tell()
+                info.mtime = int(datetime.now().timestamp())
+                spool.seek(0)
+                archive.addfile(info, spool)
+            data = sink.take()
+            if data:
+                yield data
+    yield sink.take()
+
+def archive_chunks(tables=None, archive='zip', member_format='csv', counts=None, **filters):
+    """Byte chunks of a zip or tar holding one `member_format` file per table.
+
+    `counts`, when given, is filled with rows written per table as the
+    archive is produced. `filters` are semester, academic_year and department.
+    """
+    tables = list(tables or EXPORT_TABLES)
+    counts = {} if counts is None else counts
+    members = ((f'{name}.{member_format}', _member_chunks(name, member_format, filters, counts)) for name in tables)
+    if archive == 'zip':
+        return _zip_chunks(members)
+    return _tar_chunks(members, compress=archive == 'tar.gz')
+
+def check_archive_request(tables, archive, member_format):
+    """Raise ExportFormatError for unknown tables or formats"""
+    unknown = [name for name in tables if name not in EXPORT_TABLES]
+    if unknown:
+        raise ExportFormatError(f"Unknown table(s): {', '.join(unknown)}; choose from {', '.join(EXPORT_TABLES)}")
+    if archive not in ARCHIVES:
+        raise ExportFormatError(f"Unknown archive '{archive}'; choose one of {', '.join(ARCHIVES)}")
+    if member_format not in ARCHIVE_MEMBER_FORMATS:
+        raise ExportFormatError(f"Archive members can be {' or '.join(ARCHIVE_MEMBER_FORMATS)}, not '{member_format}'")
+
+def archive_response(tables=None, archive='zip', member_format='csv', **filters):
+    """A streamed download of `archive_chunks`"""
+    tables = list(tables or EXPORT_TABLES)
+    check_archive_request(tables, archive, member_format)
+    mimetype, extension = ARCHIVES[archive]
+    return _content_response(archive_chunks(tables, archive, member_format, **filters), mimetype, 'export' + extension)
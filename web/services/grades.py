@@ -0,0 +1,108 @@
+import csv
+import io
+from ..models import db, Enrolled, EnrollmentStatus, Teaching, Grade, refresh_academic_summaries
+
+def parse_grade(raw):
+    """Map a submitted grade ('A+' or the enum name 'A_PLUS') to the stored value, or None if invalid"""
+    if raw is None:
+        return None
+    raw = str(raw).strip()
+    for grade in Grade:
+        if raw == grade.value or raw.upper() == grade.name:
+            return grade.value
+    return None
+
+def parse_grade_rows(payload):
+    """Normalize a bulk submission into a list of (enrollment_id, grade) pairs.
+
+    Accepts `{"grades": {enrollment_id: grade}}`, a plain `{enrollment_id: grade}`
+    mapping, or a list of `{"enrollment_id": ..., "grade": ...}` objects.
+    """
+    if isinstance(payload, dict):
+        payload = payload.get('grades', payload)
+    if isinstance(payload, dict):
+        return list(payload.items())
+    if isinstance(payload, list):
+        return [(row.get('enrollment_id'), row.get('grade')) for row in payload if isinstance(row, dict)]
+    raise ValueError('Expected a mapping of enrollment_id to grade or a list of rows')
+
+def parse_grade_csv(stream):
+    """Read (enrollment_id, grade) pairs from an uploaded CSV with those two header columns"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig'))
+    if not reader.fieldnames or not {'enrollment_id', 'grade'} <= set(reader.fieldnames):
+        raise ValueError('CSV must have enrollment_id and grade columns')
+    return [(row['enrollment_id'], row['grade']) for row in reader]
+
+def submit_grades(professor_id, rows):
+    """Validate and apply a roster of grades in one transaction.
+
+    Runs a fixed number of queries however many rows are submitted: one to
+    load the enrollments, one to check the professor teaches their sections,
+    and a single executemany UPDATE for every valid row. Invalid rows are
+    reported and skipped. Commits and returns one result dict per input row.
+    """
+    results = []
+    wanted = {}
+    for raw_id, raw_grade in rows:
+        result = {'enrollment_id': raw_id, 'grade': raw_grade, 'success': False, 'message': ''}
+        results.append(result)
+        try:
+            enrollment_id = int(raw_id)
+        except (TypeError, ValueError):
+            result['message'] = 'Invalid enrollment id'
+            continue
+        result['enrollment_id'] = enrollment_id
+        grade = parse_grade(raw_grade)
+        if grade is None:
+            result['message'] = 'Invalid grade'
+            continue
+        if enrollment_id in wanted:
+            result['message'] = 'Duplicate enrollment id'
+            continue
+        result['grade'] = grade
+        wanted[enrollment_id] = result
+
+    enrollments = {}
+    if wanted:
+        enrollments = {
+            row.enrollment_id: row
+            for row in db.session.query(Enrolled.enrollment_id, Enrolled.student_id, Enrolled.schedule_id, Enrolled.status)
+            .filter(Enrolled.enrollment_id.in_(list(wanted)))
+        }
+
+    schedule_ids = {row.schedule_id for row in enrollments.values()}
+    authorized = set()
+    if schedule_ids:
+        authorized = {
+            row.schedule_id
+            for row in db.session.query(Teaching.schedule_id).filter(
+                Teaching.professor_id == professor_id,
+                Teaching.schedule_id.in_(list(schedule_ids))
+            )
+        }
+
+    updates = []
+    student_ids = set()
+    for enrollment_id, result in wanted.items():
+        enrollment = enrollments.get(enrollment_id)
+        if enrollment is None:
+            result['message'] = 'Enrollment not found'
+        elif enrollment.schedule_id not in authorized:
+            result['message'] = 'Unauthorized to update this grade'
+        elif enrollment.status == EnrollmentStatus.dropped:
+            result['message'] = 'Cannot grade a dropped enrollment'
+        else:
+            updates.append({'enrollment_id': enrollment_id, 'grade': result['grade']})
+            student_ids.add(enrollment.student_id)
+            result['success'] = True
+            result['message'] = 'Grade updated successfully'
+
+    if updates:
+        try:
+            db.session.execute(db.update(Enrolled), updates)
+            refresh_academic_summaries(db.session, student_ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return results
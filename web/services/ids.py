@@ -0,0 +1,135 @@
+"""Generated ids for students (ST001), professors (PR001) and teaching assignments (TA001).
+
+Each sequence has a row in `id_sequence` holding its next unreserved
+number. A worker reserves a block of ID_BLOCK_SIZE numbers with one UPDATE,
+in a short transaction of its own. It then hands ids out of that block from
+memory until the block runs out, so concurrent registrations never read the
+same maximum and collide. Numbers reserved by a worker that exits unused
+leave gaps; ids only need to be unique, not dense. Each new block is checked
+against ids already in the table, so ids typed in by hand are skipped rather
+than handed out again.
+
+On SQLite, which allows one writer at a time, an insert's id is reserved on
+the insert's own connection, so it cannot wait on that connection's write
+lock. Such a reservation is undone if the caller rolls back, so it is one
+number only and never cached; a cached block could otherwise be handed out
+again by the next reservation.
+
+Student, Professor and Teaching rows inserted through the ORM without an id
+get one from `before_insert`; bulk loads reserve many at once with
+`reserve_ids`.
+"""
+import threading
+from contextlib import nullcontext
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from ..models import db, Student, Professor, Teaching, IdSequence
+
+SEQUENCES = {
+    'student': ('ST', Student.student_id),
+    'professor': ('PR', Professor.professor_id),
+    'teaching': ('TA', Teaching.teaching_id),
+}
+
+def format_id(name, number):
+    return f'{SEQUENCES[name][0]}{number:03d}'
+
+def _highest_number(connection, name):
+    prefix, id_column = SEQUENCES[name]
+    suffix = db.func.substr(id_column, len(prefix) + 1)
+    return connection.execute(
+        db.select(db.func.max(db.cast(suffix, db.Integer))).where(id_column.like(f'{prefix}%'))
+    ).scalar() or 0
+
+def _in_caller_transaction(connection):
+    return connection is not None and connection.dialect.name == 'sqlite'
+
+def _transaction(connection):
+    if _in_caller_transaction(connection):
+        return nullcontext(connection)
+    return db.engine.begin()
+
+def _reserve_block(connection, name, size):
+    """Advance the sequence by `size`; returns the first number of the reserved block"""
+    sequence = IdSequence.__table__
+    while True:
+        advanced = connection.execute(
+            sequence.update().where(sequence.c.name == name)
+            .values(next_value=sequence.c.next_value + size)
+        )
+        if advanced.rowcount:
+            return connection.execute(
+                db.select(sequence.c.next_value).where(sequence.c.name == name)
+            ).scalar_one() - size
+        start = _highest_number(connection, name) + 1
+        try:
+            with connection.begin_nested():
+                connection.execute(sequence.insert().values(name=name, next_value=start + size))
+            return start
+        except IntegrityError:
+            continue  # Another worker created the row first; advance it instead
+
+def _reserve_free(name, count, connection=None):
+    """`count` numbers of `name` that no worker has reserved and no row uses yet"""
+    id_column = SEQUENCES[name][1]
+    numbers = []
+    with _transaction(connection) as conn:
+        while len(numbers) < count:
+            size = count - len(numbers)
+            start = _reserve_block(conn, name, size)
+            block = range(start, start + size)
+            taken = set(conn.execute(
+                db.select(id_column).where(id_column.in_([format_id(name, number) for number in block]))
+            ).scalars())
+            numbers.extend(number for number in block if format_id(name, number) not in taken)
+    return numbers
+
+class IdAllocator:
+    """Hands out the ids of one sequence from blocks reserved in the database"""
+
+    def __init__(self, name, block_size):
+        self.name = name
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.numbers = iter(())
+
+    def next_id(self, connection=None):
+        if _in_caller_transaction(connection):
+            return format_id(self.name, _reserve_free(self.name, 1, connection)[0])
+        with self.lock:
+            number = next(self.numbers, None)
+            if number is None:
+                self.numbers = iter(_reserve_free(self.name, self.block_size, connection))
+                number = next(self.numbers)
+        return format_id(self.name, number)
+
+_allocators_lock = threading.Lock()
+_allocators = {}  # (database url, sequence name) -> IdAllocator
+
+def get_allocator(name):
+    key = (db.engine.url.render_as_string(), name)
+    allocator = _allocators.get(key)
+    if allocator is None:
+        with _allocators_lock:
+            allocator = _allocators.get(key)
+            if allocator is None:
+                allocator = IdAllocator(name, current_app.config.get('ID_BLOCK_SIZE', 20))
+                _allocators[key] = allocator
+    return allocator
+
+def next_id(name, connection=None):
+    """The next unused id of sequence `name` ('student', 'professor' or 'teaching')"""
+    return get_allocator(name).next_id(connection)
+
+def reserve_ids(name, count, connection=None):
+    """`count` unused ids of sequence `name`, reserved in one go for bulk inserts"""
+    return [format_id(name, number) for number in _reserve_free(name, count, connection)] if count else []
+
+def assign_missing_id(mapper, connection, target):
+    model_name = {Student: 'student', Professor: 'professor', Teaching: 'teaching'}[type(target)]
+    id_key = SEQUENCES[model_name][1].key
+    if getattr(target, id_key) is None:
+        setattr(target, id_key, next_id(model_name, connection))
+
+for _model in (Student, Professor, Teaching):
+    db.event.listen(_model, 'before_insert', assign_missing_id)
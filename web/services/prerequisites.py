@@ -0,0 +1,338 @@
+"""In-memory prerequisite graph.
+
+The whole `prerequisite` table is loaded in one query into a DAG where each
+course is a bit position and its direct and transitive prerequisites are
+Python int bitsets, so "does X (eventually) require Y", "what is missing"
+and "what does completing Y unlock" are a few bitwise operations. The graph
+is cached per process and rebuilt after a commit that touched prerequisites
+(or after PREREQUISITE_GRAPH_TTL seconds, for changes made elsewhere).
+
+ORM inserts and updates that would close a cycle are rejected with
+PrerequisiteCycleError; on MySQL the prerequisite triggers also reject them
+for raw SQL writes.
+"""
+import threading
+import time
+from flask import current_app
+from ..models import db, Course, Prerequisite, Schedule, Enrolled, EnrollmentStatus
+
+class PrerequisiteCycleError(ValueError):
+    """Adding an edge would make a course (transitively) its own prerequisite"""
+
+    def __init__(self, course_id, prerequisite_course_id, path=None):
+        self.course_id = course_id
+        self.prerequisite_course_id = prerequisite_course_id
+        self.path = path or []
+        chain = ' -> '.join(self.path) if self.path else prerequisite_course_id
+        super().__init__(
+            f'{prerequisite_course_id} cannot be a prerequisite of {course_id}: '
+            f'it already requires it ({chain})'
+        )
+
+def _bits(mask):
+    """Yield the positions of the set bits of `mask`, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class PrerequisiteGraph:
+    """Immutable prerequisite DAG with precomputed transitive closure"""
+
+    def __init__(self, edges, codes=None):
+        self.edges = list(edges)
+        self.codes = dict(codes or {})
+        self.ids = []
+        self.index = {}
+        for course_id, prerequisite_id in self.edges:
+            self._node(course_id)
+            self._node(prerequisite_id)
+
+        size = len(self.ids)
+        self.requires = [0] * size      # direct prerequisites
+        self.required_by = [0] * size   # direct dependents
+        for course_id, prerequisite_id in self.edges:
+            course, prerequisite = self.index[course_id], self.index[prerequisite_id]
+            self.requires[course] |= 1 << prerequisite
+            self.required_by[prerequisite] |= 1 << course
+
+        self.order, cyclic = self._topological_order()
+        self.cyclic = [self.ids[i] for i in cyclic]
+        self.position = {node: rank for rank, node in enumerate(self.order)}
+        self.closure = self._close(self.requires, self.order, cyclic)
+        self.dependents = self._close(self.required_by, list(reversed(self.order)), cyclic)
+
+    def _node(self, course_id):
+        if course_id not in self.index:
+            self.index[course_id] = len(self.ids)
+            self.ids.append(course_id)
+
+    def _topological_order(self):
+        """Kahn's algorithm, prerequisites first; nodes left over sit on (or behind) a cycle"""
+        remaining = [bin(mask).count('1') for mask in self.requires]
+        ready = [i for i, count in enumerate(remaining) if count == 0]
+        order = []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for dependent in _bits(self.required_by[node]):
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        placed = set(order)
+        cyclic = [i for i in range(len(self.ids)) if i not in placed]
+        # Keep cyclic leftovers in the order so every course has a position
+        return order + cyclic, cyclic
+
+    @staticmethod
+    def _close(direct, order, cyclic):
+        closure = [0] * len(direct)
+        for node in order:
+            mask = direct[node]
+            for other in _bits(direct[node]):
+                mask |= closure[other]
+            closure[node] = mask
+        # Rows written before cycle checking could still hold a cycle: iterate to a fixpoint
+        changed = bool(cyclic)
+        while changed:
+            changed = False
+            for node in order:
+                mask = closure[node]
+                for other in _bits(closure[node]):
+                    mask |= closure[other]
+                if mask != closure[node]:
+                    closure[node] = mask
+                    changed = True
+        return closure
+
+    @classmethod
+    def load(cls, connection=None, exclude_ids=()):
+        """Build the graph from the prerequisite table (one query), leaving out rows with `exclude_ids`"""
+        course = db.aliased(Course)
+        prerequisite = db.aliased(Course)
+        statement = db.select(
+            Prerequisite.course_id, Prerequisite.prerequisite_course_id,
+            course.course_code, prerequisite.course_code
+        ).join(course, course.course_id == Prerequisite.course_id).join(
+            prerequisite, prerequisite.course_id == Prerequisite.prerequisite_course_id
+        )
+        if exclude_ids:
+            statement = statement.where(Prerequisite.prerequisite_id.not_in(exclude_ids))
+        rows = (connection or db.session).execute(statement).all()
+        codes = {}
+        for course_id, prerequisite_id, course_code, prerequisite_code in rows:
+            codes[course_id] = course_code
+            codes[prerequisite_id] = prerequisite_code
+        return cls([(row[0], row[1]) for row in rows], codes)
+
+    def _mask(self, course_ids):
+        mask = 0
+        for course_id in course_ids:
+            position = self.index.get(course_id)
+            if position is not None:
+                mask |= 1 << position
+        return mask
+
+    def _ids(self, mask):
+        """Course ids of `mask`, prerequisites before the courses that need them"""
+        return sorted((self.ids[i] for i in _bits(mask)), key=lambda course_id: self.position[self.index[course_id]])
+
+    def prerequisites_of(self, course_id, transitive=True):
+        """Every course that must be completed before `course_id`, in a valid order"""
+        position = self.index.get(course_id)
+        if position is None:
+            return []
+        return self._ids((self.closure if transitive else self.requires)[position])
+
+    def dependents_of(self, course_id, transitive=True):
+        """Every course that (eventually) requires `course_id`"""
+        position = self.index.get(course_id)
+        if position is None:
+            return []
+        return self._ids((self.dependents if transitive else self.required_by)[position])
+
+    def requires_course(self, course_id, prerequisite_id):
+        """True if `course_id` directly or transitively requires `prerequisite_id`"""
+        course, prerequisite = self.index.get(course_id), self.index.get(prerequisite_id)
+        if course is None or prerequisite is None:
+            return False
+        return bool(self.closure[course] >> prerequisite & 1)
+
+    def would_create_cycle(self, course_id, prerequisite_id):
+        return course_id == prerequisite_id or self.requires_course(prerequisite_id, course_id)
+
+    def path(self, course_id, prerequisite_id):
+        """One chain of direct prerequisites leading from `course_id` to `prerequisite_id`"""
+        if not self.requires_course(course_id, prerequisite_id):
+            return []
+        target = self.index[prerequisite_id]
+        node, path = self.index[course_id], [course_id]
+        while node != target:
+            node = next(p for p in _bits(self.requires[node]) if p == target or self.closure[p] >> target & 1)
+            path.append(self.ids[node])
+        return path
+
+    def check_edge(self, course_id, prerequisite_id):
+        """Raise PrerequisiteCycleError if the edge would close a cycle"""
+        if self.would_create_cycle(course_id, prerequisite_id):
+            raise PrerequisiteCycleError(course_id, prerequisite_id, self.path(prerequisite_id, course_id))
+
+    def missing(self, course_id, completed_ids, transitive=False):
+        """Prerequisites of `course_id` not in `completed_ids`"""
+        position = self.index.get(course_id)
+        if position is None:
+            return []
+        needed = (self.closure if transitive else self.requires)[position]
+        return self._ids(needed & ~self._mask(completed_ids))
+
+    def unlocked_by(self, course_id, completed_ids=()):
+        """Courses whose direct prerequisites are all met once `course_id` is added to `completed_ids`"""
+        position = self.index.get(course_id)
+        if position is None:
+            return []
+        done = self._mask(completed_ids) | 1 << position
+        unlocked = 0
+        for dependent in _bits(self.required_by[position] & ~done):
+            if self.requires[dependent] & ~done == 0:
+                unlocked |= 1 << dependent
+        return self._ids(unlocked)
+
+    def degree_plan(self, target_ids, completed_ids=(), max_courses_per_term=5):
+        """Split everything still needed for `target_ids` into terms, respecting prerequisites.
+
+        Each term takes up to `max_courses_per_term` courses whose prerequisites
+        were completed in earlier terms, preferring courses that unlock the most
+        remaining work. Returns a list of terms, each a list of course ids.
+        """
+        completed_ids = set(completed_ids)
+        done = self._mask(completed_ids)
+        needed = 0
+        standalone = []  # targets without any prerequisite edges
+        for course_id in dict.fromkeys(target_ids):
+            position = self.index.get(course_id)
+            if position is not None:
+                needed |= self.closure[position] | 1 << position
+            elif course_id not in completed_ids:
+                standalone.append(course_id)
+        needed &= ~done
+
+        terms = []
+        while needed or standalone:
+            ready = [i for i in _bits(needed) if self.requires[i] & ~done == 0]
+            if needed and not ready:
+                raise ValueError('Prerequisites form a cycle among: ' + ', '.join(self._ids(needed)))
+            ready.sort(key=lambda i: (-bin(self.dependents[i] & needed).count('1'), self.position[i]))
+            chosen = ready[:max_courses_per_term]
+            term = [self.ids[i] for i in chosen]
+            while standalone and len(term) < max_courses_per_term:
+                term.append(standalone.pop(0))
+            terms.append(term)
+            for i in chosen:
+                done |= 1 << i
+                needed &= ~(1 << i)
+        return terms
+
+_cache_lock = threading.Lock()
+_cached_graph = None
+_cached_at = 0.0
+
+def get_prerequisite_graph():
+    """The cached graph, rebuilt after prerequisite changes or PREREQUISITE_GRAPH_TTL seconds"""
+    global _cached_graph, _cached_at
+    ttl = current_app.config.get('PREREQUISITE_GRAPH_TTL', 300)
+    graph = _cached_graph
+    if graph is not None and time.monotonic() - _cached_at < ttl:
+        return graph
+    with _cache_lock:
+        if _cached_graph is None or time.monotonic() - _cached_at >= ttl:
+            _cached_graph = PrerequisiteGraph.load()
+            _cached_at = time.monotonic()
+        return _cached_graph
+
+def invalidate_prerequisite_graph():
+    global _cached_graph
+    _cached_graph = None
+
+def get_completed_course_ids(student_id):
+    """Ids of the courses a student has completed (one query)"""
+    rows = db.session.query(Schedule.course_id).join(
+        Enrolled, Enrolled.schedule_id == Schedule.schedule_id
+    ).filter(
+        Enrolled.student_id == student_id,
+        Enrolled.status == EnrollmentStatus.completed
+    ).distinct()
+    return {row.course_id for row in rows}
+
+def get_missing_prerequisites(student_id, course_id, transitive=False, completed_ids=None):
+    """Course ids the student still has to complete before taking `course_id`"""
+    if completed_ids is None:
+        completed_ids = get_completed_course_ids(student_id)
+    return get_prerequisite_graph().missing(course_id, completed_ids, transitive=transitive)
+
+def get_unlocked_courses(student_id, course_id, completed_ids=None):
+    """Course ids the student becomes eligible for by completing `course_id`"""
+    if completed_ids is None:
+        completed_ids = get_completed_course_ids(student_id)
+    return get_prerequisite_graph().unlocked_by(course_id, completed_ids)
+
+def plan_degree(student_id, target_course_ids, max_courses_per_term=5):
+    """Terms of course ids leading the student to every course in `target_course_ids`"""
+    return get_prerequisite_graph().degree_plan(
+        target_course_ids, get_completed_course_ids(student_id), max_courses_per_term
+    )
+
+def add_prerequisite(course_id, prerequisite_course_id):
+    """Stage a new prerequisite edge; raises PrerequisiteCycleError if it would close a cycle"""
+    PrerequisiteGraph.load().check_edge(course_id, prerequisite_course_id)
+    prerequisite = Prerequisite(course_id=course_id, prerequisite_course_id=prerequisite_course_id)
+    db.session.add(prerequisite)
+    return prerequisite
+
+# Cycle rejection for every ORM write. The graph is loaded once per flush,
+# before any row is written, and every new or changed edge is checked in
+# turn against it plus the edges checked before it. A cycle split over
+# several rows of one flush (A -> B and B -> A) is therefore caught too.
+@db.event.listens_for(db.session, 'before_flush')
+def reject_prerequisite_cycles(session, flush_context, instances):
+    pending = [obj for obj in session.new if isinstance(obj, Prerequisite)]
+    pending += [obj for obj in session.dirty if isinstance(obj, Prerequisite) and session.is_modified(obj)]
+    if not pending:
+        return
+    # Updated and deleted rows no longer hold their stored edge
+    replaced = [db.inspect(obj).identity[0] for obj in pending + list(session.deleted)
+                if isinstance(obj, Prerequisite) and db.inspect(obj).persistent]
+    graph = PrerequisiteGraph.load(session.connection(), exclude_ids=replaced)
+    for obj in pending:
+        if obj.course_id is None or obj.prerequisite_course_id is None:
+            continue  # Rejected by the NOT NULL constraints instead
+        edge = (obj.course_id, obj.prerequisite_course_id)
+        graph.check_edge(*edge)
+        graph = PrerequisiteGraph(graph.edges + [edge], graph.codes)
+
+def _mark_prerequisites_changed(target):
+    session = db.inspect(target).session
+    if session is not None:
+        session.info['prerequisites_changed'] = True
+
+@db.event.listens_for(Prerequisite, 'after_insert')
+@db.event.listens_for(Prerequisite, 'after_update')
+@db.event.listens_for(Prerequisite, 'after_delete')
+@db.event.listens_for(Course, 'after_delete')
+def collect_prerequisite_change(mapper, connection, target):
+    _mark_prerequisites_changed(target)
+
+@db.event.listens_for(Course, 'after_update')
+def collect_course_code_change(mapper, connection, target):
+    if db.inspect(target).attrs.course_code.history.has_changes():
+        _mark_prerequisites_changed(target)
+
+@db.event.listens_for(db.session, 'after_commit')
+def refresh_prerequisite_graph(session):
+    if session.info.pop('prerequisites_changed', False):
+        invalidate_prerequisite_graph()
+
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def discard_prerequisite_changes(session, previous_transaction):
+    # Savepoint rollbacks fire this too; keep the flag for the outer transaction
+    if previous_transaction.parent is None:
+        session.info.pop('prerequisites_changed', None)
@@ -0,0 +1,39 @@
+from ..models import db, Schedule, Enrolled, EnrollmentStatus, Teaching
+
+# Loader options for the professor views. Every view that walks teaching
+# assignments or a roster should go through these so it runs a fixed number
+# of queries however many sections or students are involved.
+
+def schedule_with_course():
+    """Load Schedule.course in the same query as the schedule"""
+    return db.joinedload(Schedule.course)
+
+def teaching_with_course():
+    """Load Teaching.schedule and its course in the same query as the teaching rows"""
+    return db.joinedload(Teaching.schedule).joinedload(Schedule.course)
+
+def enrollment_with_student():
+    """Load Enrolled.student in the same query as the enrollments"""
+    return db.joinedload(Enrolled.student)
+
+def get_teaching_assignments(professor_id):
+    """All of a professor's teaching rows with schedule and course populated (one query)"""
+    return Teaching.query.options(teaching_with_course()).filter(
+        Teaching.professor_id == professor_id
+    ).order_by(Teaching.schedule_id).all()
+
+def get_schedule(schedule_id):
+    """A schedule with its course populated, or None (one query)"""
+    return Schedule.query.options(schedule_with_course()).filter(
+        Schedule.schedule_id == schedule_id
+    ).first()
+
+def get_roster(schedule_id, status=None):
+    """Enrollments of a schedule with their students populated (one query)"""
+    query = Enrolled.query.options(enrollment_with_student()).filter(Enrolled.schedule_id == schedule_id)
+    if status is not None:
+        query = query.filter(Enrolled.status == status)
+    return query.order_by(Enrolled.student_id).all()
+
+def get_enrolled_roster(schedule_id):
+    return get_roster(schedule_id, EnrollmentStatus.enrolled)
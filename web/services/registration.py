@@ -0,0 +1,190 @@
+from datetime import datetime
+from ..models import db, Schedule, Enrolled, EnrollmentStatus, Course, CourseLevel, Semester
+from .prerequisites import get_prerequisite_graph, get_completed_course_ids
+
+# Maximum credits a student may carry in one semester, by academic level
+CREDIT_LIMITS = {
+    CourseLevel.undergraduate: 18,
+    CourseLevel.graduate: 12,
+    CourseLevel.phd: 9,
+}
+
+class RegistrationVerdict:
+    """Outcome of evaluating a registration request.
+
+    `reason` is None when the student may register, otherwise one of
+    'not_found', 'already_enrolled', 'missing_prerequisites',
+    'time_conflict', 'credit_limit' or 'full'.
+    """
+
+    def __init__(self, reason=None, message='', schedule=None, existing=None,
+                 missing_prerequisites=None, conflicts=None, enrolled_count=None):
+        self.reason = reason
+        self.message = message
+        self.schedule = schedule
+        self.existing = existing
+        self.missing_prerequisites = missing_prerequisites or []
+        self.conflicts = conflicts or []
+        self.enrolled_count = enrolled_count
+
+    @property
+    def ok(self):
+        return self.reason is None
+
+    def to_dict(self):
+        return {
+            'success': self.ok,
+            'reason': self.reason,
+            'message': self.message,
+            'missing_prerequisites': self.missing_prerequisites,
+            'conflicts': self.conflicts,
+        }
+
+def get_current_semester():
+    """Determine the current semester based on the date"""
+    month = datetime.utcnow().month
+    if month >= 8 and month <= 12:
+        return Semester.Fall
+    elif month >= 1 and month <= 5:
+        return Semester.Spring
+    else:
+        return Semester.Summer
+
+def get_credit_limit(student_level):
+    return CREDIT_LIMITS.get(student_level, CREDIT_LIMITS[CourseLevel.phd])
+
+def get_semester_credits(student_id, semester):
+    """Sum the credits a student is currently enrolled in for a semester (one aggregate query)"""
+    return db.session.query(db.func.coalesce(db.func.sum(Course.credits), 0)).select_from(Enrolled).join(
+        Schedule, Schedule.schedule_id == Enrolled.schedule_id
+    ).join(
+        Course, Course.course_id == Schedule.course_id
+    ).filter(
+        Enrolled.student_id == student_id,
+        Enrolled.status == EnrollmentStatus.enrolled,
+        Schedule.semester == semester
+    ).scalar()
+
+def check_credit_limits(student, course):
+    """Check if adding this course would exceed credit limits for the semester"""
+    current_credits = get_semester_credits(student.student_id, get_current_semester())
+    return current_credits + course.credits <= get_credit_limit(student.level)
+
+def get_missing_prerequisites(student_id, course_id):
+    """Return the course codes of direct prerequisites the student has not completed (one query)"""
+    graph = get_prerequisite_graph()
+    missing = graph.missing(course_id, get_completed_course_ids(student_id))
+    return sorted(graph.codes[course_id] for course_id in missing)
+
+def get_current_load(student_id):
+    """Fetch the meeting times and credits of every course the student is enrolled in (one query)"""
+    return db.session.query(
+        Schedule.schedule_id,
+        Schedule.semester,
+        Schedule.academic_year,
+        Schedule.meeting_days,
+        Schedule.start_time,
+        Schedule.end_time,
+        Course.course_code,
+        Course.credits
+    ).select_from(Enrolled).join(
+        Schedule, Schedule.schedule_id == Enrolled.schedule_id
+    ).join(
+        Course, Course.course_id == Schedule.course_id
+    ).filter(
+        Enrolled.student_id == student_id,
+        Enrolled.status == EnrollmentStatus.enrolled
+    ).all()
+
+def find_time_conflicts(schedule, current_load):
+    """Return the rows of `current_load` in the same term that meet on a shared day at an overlapping time"""
+    new_days = set(schedule.meeting_days)
+    conflicts = []
+    for row in current_load:
+        if row.schedule_id == schedule.schedule_id:
+            continue
+        if row.semester != schedule.semester or row.academic_year != schedule.academic_year:
+            continue
+        overlap_days = new_days.intersection(row.meeting_days)
+        if overlap_days and schedule.start_time < row.end_time and schedule.end_time > row.start_time:
+            conflicts.append({
+                'schedule_id': row.schedule_id,
+                'course_code': row.course_code,
+                'days': sorted(overlap_days, key='MTWRF'.index),
+                'start_time': row.start_time.strftime('%H:%M'),
+                'end_time': row.end_time.strftime('%H:%M'),
+            })
+    return conflicts
+
+def evaluate_registration(student, schedule_id):
+    """Decide whether `student` may register for `schedule_id`.
+
+    Runs a fixed number of set-based queries regardless of how many
+    enrollments or prerequisites are involved:
+    schedule+course, existing enrollment, missing prerequisites,
+    and current load (for both conflicts and credit limits).
+    """
+    schedule = Schedule.query.options(db.joinedload(Schedule.course)).filter_by(schedule_id=schedule_id).first()
+    if not schedule:
+        return RegistrationVerdict('not_found', 'Course schedule not found.')
+    course = schedule.course
+
+    existing = Enrolled.query.filter_by(student_id=student.student_id, schedule_id=schedule_id).first()
+    if existing and existing.status != EnrollmentStatus.dropped:
+        return RegistrationVerdict('already_enrolled', 'You are already enrolled in this course.',
+                                   schedule=schedule, existing=existing)
+
+    missing = get_missing_prerequisites(student.student_id, course.course_id)
+    if missing:
+        return RegistrationVerdict('missing_prerequisites',
+                                   f"Cannot register: Missing prerequisite(s): {', '.join(missing)}.",
+                                   schedule=schedule, existing=existing, missing_prerequisites=missing)
+
+    current_load = get_current_load(student.student_id)
+    conflicts = find_time_conflicts(schedule, current_load)
+    if conflicts:
+        first = conflicts[0]
+        return RegistrationVerdict('time_conflict',
+                                   f"Schedule conflict with {first['course_code']} on {', '.join(first['days'])} "
+                                   f"({first['start_time']}-{first['end_time']})",
+                                   schedule=schedule, existing=existing, conflicts=conflicts)
+
+    semester_credits = sum(
+        row.credits for row in current_load
+        if row.semester == schedule.semester and row.academic_year == schedule.academic_year
+    )
+    limit = get_credit_limit(student.level)
+    if semester_credits + course.credits > limit:
+        return RegistrationVerdict('credit_limit',
+                                   f'Cannot register: This course would exceed your limit of {limit} credits per semester.',
+                                   schedule=schedule, existing=existing)
+
+    # Fast rejection only; the seat itself is claimed atomically when the row is flushed
+    enrolled_count = schedule.enrolled_count
+    if enrolled_count >= course.max_capacity:
+        return RegistrationVerdict('full', 'Cannot register: The course has reached its maximum enrollment.',
+                                   schedule=schedule, existing=existing, enrolled_count=enrolled_count)
+
+    return RegistrationVerdict(schedule=schedule, existing=existing, enrolled_count=enrolled_count,
+                               message='Course registered successfully.')
+
+def register_student(student, schedule_id):
+    """Evaluate and, if allowed, stage the enrollment in the current session.
+
+    The caller owns the transaction and is responsible for committing
+    or rolling back.
+    """
+    verdict = evaluate_registration(student, schedule_id)
+    if not verdict.ok:
+        return verdict
+
+    if verdict.existing:
+        verdict.existing.status = EnrollmentStatus.enrolled
+        verdict.message = 'Successfully re-registered for the course.'
+    else:
+        db.session.add(Enrolled(
+            student_id=student.student_id,
+            schedule_id=schedule_id,
+            status=EnrollmentStatus.enrolled
+        ))
+    return verdict
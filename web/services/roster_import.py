@@ -0,0 +1,405 @@
+"""Bulk import of students, professors and enrollments from CSV or Excel.
+
+The upload is read row by row and handled in batches of BATCH_SIZE. Each
+row is first checked on its own, with the rules of the registration and
+admin forms and the database CHECK constraints (name lengths, the email
+pattern, the minimum age, grade values). The batch is then checked against
+the file so far and the database with one IN query per rule: duplicate
+emails or ids, unknown students or sections, existing enrollments and full
+sections. Missing ids are reserved per batch from the id sequences (see
+ids.py). The valid rows of each batch go in with one multi-row INSERT.
+
+The whole import is one transaction. Invalid rows are skipped and listed in
+the error report with their line number; `dry_run` validates without writing.
+"""
+import csv
+import io
+import re
+from datetime import date, datetime
+from ..models import (db, Student, Professor, Schedule, Course, Enrolled, StudentStatus, CourseLevel,
+                      EnrollmentStatus, refresh_academic_summaries)
+from .grades import parse_grade
+from .directory import index_people
+from .stats import invalidate_dashboard_stats
+from .exports import csv_chunks
+from .ids import reserve_ids
+
+BATCH_SIZE = 5000
+
+# Same pattern as the student/professor email CHECK constraints
+EMAIL_PATTERN = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
+ID_PATTERN = re.compile(r'^[A-Za-z0-9]{1,10}$')
+
+class RosterImportError(ValueError):
+    """The upload cannot be read, or lacks required columns"""
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_rows(stream, filename):
+    """Yield (line number, {column: value}) from a .csv or .xlsx upload; header names are lowercased"""
+    if filename.lower().endswith('.xlsx'):
+        try:
+            import openpyxl
+        except ImportError:
+            raise RosterImportError('Excel uploads need the optional openpyxl package; upload a CSV instead')
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    elif filename.lower().endswith('.csv'):
+        rows = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    else:
+        raise RosterImportError('Upload a .csv or .xlsx file')
+    header = next(rows, None)
+    if not header:
+        raise RosterImportError('The file is empty')
+    header = [str(name or '').strip().lower().replace(' ', '_') for name in header]
+    for line, values in enumerate(rows, start=2):
+        if not any(value not in (None, '') for value in values):
+            continue
+        yield line, dict(zip(header, values))
+
+def _text(raw, field):
+    value = raw.get(field)
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel stores numeric ids as floats
+    return str(value).strip()
+
+def _date(raw, field):
+    value = raw.get(field)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(_text(raw, field))
+    except ValueError:
+        return None
+
+def _enum(enum_class, value):
+    for member in enum_class:
+        if value in (member.value, member.name) or value.lower() == member.value.lower():
+            return member
+    return None
+
+class RosterImport:
+    """One import run; subclasses describe a table"""
+    kind = None
+    table = None
+    required_columns = ()
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.errors = []
+        self.rows = 0
+        self.inserted = 0
+        self.seen_emails = set()
+        self.seen_ids = set()
+        self.connection = db.session.connection()
+
+    def error(self, line, field, message):
+        self.errors.append({'line': line, 'field': field, 'message': message})
+
+    def clean(self, line, raw):
+        """The row to insert, or None after reporting why it is invalid"""
+        raise NotImplementedError
+
+    def check_batch(self, rows):
+        """Cross-row and database checks; returns the rows that pass"""
+        return rows
+
+    def after_insert(self, rows):
+        pass
+
+    def finish(self):
+        pass
+
+    def run(self, rows):
+        first = True
+        for batch in _batched(rows, BATCH_SIZE):
+            if first:
+                missing = [column for column in self.required_columns if column not in batch[0][1]]
+                if missing:
+                    raise RosterImportError(f"Missing column(s): {', '.join(missing)}")
+                first = False
+            self.rows += len(batch)
+            cleaned = []
+            for line, raw in batch:
+                row = self.clean(line, raw)
+                if row is not None:
+                    cleaned.append((line, row))
+            valid = [row for _, row in self.check_batch(cleaned)]
+            if valid and not self.dry_run:
+                self.connection.execute(self.table.insert(), valid)
+                self.after_insert(valid)
+            self.inserted += len(valid)
+        if not self.dry_run:
+            self.finish()
+        return {
+            'kind': self.kind,
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'dry_run': self.dry_run,
+        }
+
+    # Shared rules
+    def _name(self, line, raw, field, label):
+        value = _text(raw, field)
+        if not 2 <= len(value) <= 50:
+            self.error(line, field, f'{label} must be between 2 and 50 characters')
+            return None
+        return value
+
+    def _email(self, line, raw):
+        value = _text(raw, 'email')
+        if not value:
+            self.error(line, 'email', 'Email is required')
+        elif len(value) > 100 or not EMAIL_PATTERN.match(value):
+            self.error(line, 'email', 'Please enter a valid email address')
+        else:
+            return value
+        return None
+
+    def _optional_id(self, line, raw, field):
+        value = _text(raw, field)
+        if value and not ID_PATTERN.match(value):
+            self.error(line, field, 'Ids are up to 10 letters and digits')
+            return None
+        return value
+
+    def _check_people(self, rows, id_column, sequence):
+        """Reject emails and ids already used in the file or the database, then fill in missing ids"""
+        emails = [row['email'] for _, row in rows]
+        ids = [row[id_column.key] for _, row in rows if row[id_column.key]]
+        model = id_column.class_
+        taken_emails = {email.lower() for (email,) in self.connection.execute(
+            db.select(model.email).where(model.email.in_(emails)))} if emails else set()
+        taken_ids = {person_id.lower() for (person_id,) in self.connection.execute(
+            db.select(id_column).where(id_column.in_(ids)))} if ids else set()
+        passed = []
+        for line, row in rows:
+            email, person_id = row['email'].lower(), row[id_column.key].lower()
+            if email in taken_emails:
+                self.error(line, 'email', 'Email already registered.')
+            elif email in self.seen_emails:
+                self.error(line, 'email', 'Email appears earlier in the file')
+            elif person_id and person_id in taken_ids:
+                self.error(line, id_column.key, 'Id already exists')
+            elif person_id and person_id in self.seen_ids:
+                self.error(line, id_column.key, 'Id appears earlier in the file')
+            else:
+                self.seen_emails.add(email)
+                if person_id:
+                    self.seen_ids.add(person_id)
+                passed.append((line, row))
+
+        missing = [row for _, row in passed if not row[id_column.key]]
+        new_ids = []
+        while missing and not self.dry_run and len(new_ids) < len(missing):
+            new_ids.extend(new_id for new_id in reserve_ids(sequence, len(missing) - len(new_ids), self.connection)
+                           if new_id.lower() not in self.seen_ids)
+        for row, new_id in zip(missing, new_ids):
+            row[id_column.key] = new_id
+        return passed
+
+class StudentImport(RosterImport):
+    kind = 'students'
+    table = Student.__table__
+    required_columns = ('first_name', 'last_name', 'email', 'major', 'date_of_birth')
+
+    def clean(self, line, raw):
+        errors = len(self.errors)
+        student_id = self._optional_id(line, raw, 'student_id')
+        first_name = self._name(line, raw, 'first_name', 'First name')
+        last_name = self._name(line, raw, 'last_name', 'Last name')
+        email = self._email(line, raw)
+        major = _text(raw, 'major')
+        if not major or len(major) > 50:
+            self.error(line, 'major', 'Major is required (at most 50 characters)')
+        date_of_birth = _date(raw, 'date_of_birth')
+        if date_of_birth is None:
+            self.error(line, 'date_of_birth', 'Date of birth must be a date (YYYY-MM-DD)')
+        elif not Student.validate_age(date_of_birth):
+            self.error(line, 'date_of_birth', 'Student must be at least 16 years old')
+        status = _enum(StudentStatus, _text(raw, 'status') or 'active')
+        if status is None:
+            self.error(line, 'status', f"Status must be one of {', '.join(s.value for s in StudentStatus)}")
+        level = _enum(CourseLevel, _text(raw, 'level') or 'undergraduate')
+        if level is None:
+            self.error(line, 'level', f"Level must be one of {', '.join(l.value for l in CourseLevel)}")
+        if len(self.errors) > errors:
+            return None
+        return {'student_id': student_id, 'first_name': first_name, 'last_name': last_name, 'email': email,
+                'major': major, 'date_of_birth': date_of_birth, 'status': status, 'level': level}
+
+    def check_batch(self, rows):
+        return self._check_people(rows, Student.student_id, 'student')
+
+    def after_insert(self, rows):
+        index_people(self.connection, 'student', rows)
+
+class ProfessorImport(RosterImport):
+    kind = 'professors'
+    table = Professor.__table__
+    required_columns = ('first_name', 'last_name', 'email', 'department')
+
+    def clean(self, line, raw):
+        errors = len(self.errors)
+        professor_id = self._optional_id(line, raw, 'professor_id')
+        first_name = self._name(line, raw, 'first_name', 'First name')
+        last_name = self._name(line, raw, 'last_name', 'Last name')
+        email = self._email(line, raw)
+        department = _text(raw, 'department')
+        if not department or len(department) > 50:
+            self.error(line, 'department', 'Department is required (at most 50 characters)')
+        hire_date = date.today()
+        if _text(raw, 'hire_date'):
+            hire_date = _date(raw, 'hire_date')
+            if hire_date is None:
+                self.error(line, 'hire_date', 'Hire date must be a date (YYYY-MM-DD)')
+        optional = {}
+        for field, label in (('office_number', 'Office number'), ('phone', 'Phone number')):
+            optional[field] = _text(raw, field) or None
+            if optional[field] and len(optional[field]) > 20:
+                self.error(line, field, f'{label} must be less than 20 characters')
+        if len(self.errors) > errors:
+            return None
+        return {'professor_id': professor_id, 'first_name': first_name, 'last_name': last_name, 'email': email,
+                'department': department, 'hire_date': hire_date, **optional}
+
+    def check_batch(self, rows):
+        return self._check_people(rows, Professor.professor_id, 'professor')
+
+    def after_insert(self, rows):
+        index_people(self.connection, 'professor', rows)
+
+class EnrollmentImport(RosterImport):
+    kind = 'enrollments'
+    table = Enrolled.__table__
+    required_columns = ('student_id', 'schedule_id')
+
+    def __init__(self, dry_run=False):
+        super().__init__(dry_run)
+        self.seats_left = {}
+        self.seen_pairs = set()
+        self.seats_taken = {}
+        self.student_ids = set()
+
+    def clean(self, line, raw):
+        errors = len(self.errors)
+        student_id = _text(raw, 'student_id')
+        schedule_id = _text(raw, 'schedule_id')
+        if not student_id:
+            self.error(line, 'student_id', 'Student id is required')
+        if not schedule_id:
+            self.error(line, 'schedule_id', 'Schedule id is required')
+        status = _enum(EnrollmentStatus, _text(raw, 'status') or 'enrolled')
+        if status is None:
+            self.error(line, 'status', f"Status must be one of {', '.join(s.value for s in EnrollmentStatus)}")
+        grade = None
+        if _text(raw, 'grade'):
+            grade = parse_grade(_text(raw, 'grade'))
+            if grade is None:
+                self.error(line, 'grade', 'Invalid grade')
+        enrollment_date = date.today()
+        if _text(raw, 'enrollment_date'):
+            enrollment_date = _date(raw, 'enrollment_date')
+            if enrollment_date is None:
+                self.error(line, 'enrollment_date', 'Enrollment date must be a date (YYYY-MM-DD)')
+        if len(self.errors) > errors:
+            return None
+        return {'student_id': student_id, 'schedule_id': schedule_id, 'status': status,
+                'grade': grade, 'enrollment_date': enrollment_date}
+
+    def check_batch(self, rows):
+        student_ids = list({row['student_id'] for _, row in rows})
+        schedule_ids = list({row['schedule_id'] for _, row in rows})
+        if not rows:
+            return rows
+        students = {student_id for (student_id,) in self.connection.execute(
+            db.select(Student.student_id).where(Student.student_id.in_(student_ids)))}
+        new_schedules = [schedule_id for schedule_id in schedule_ids if schedule_id not in self.seats_left]
+        if new_schedules:
+            for schedule_id, enrolled_count, capacity in self.connection.execute(
+                db.select(Schedule.schedule_id, Schedule.enrolled_count, Course.max_capacity)
+                .join(Course, Course.course_id == Schedule.course_id)
+                .where(Schedule.schedule_id.in_(new_schedules))
+            ):
+                self.seats_left[schedule_id] = capacity - enrolled_count
+        existing = set(self.connection.execute(
+            db.select(Enrolled.student_id, Enrolled.schedule_id).where(
+                Enrolled.student_id.in_(student_ids), Enrolled.schedule_id.in_(schedule_ids))
+        ).tuples())
+
+        passed = []
+        for line, row in rows:
+            pair = (row['student_id'], row['schedule_id'])
+            if row['student_id'] not in students:
+                self.error(line, 'student_id', 'Student not found')
+            elif row['schedule_id'] not in self.seats_left:
+                self.error(line, 'schedule_id', 'Section not found')
+            elif pair in existing:
+                self.error(line, 'schedule_id', 'Student is already enrolled in this section')
+            elif pair in self.seen_pairs:
+                self.error(line, 'schedule_id', 'Enrollment appears earlier in the file')
+            elif row['status'] == EnrollmentStatus.enrolled and self.seats_left[row['schedule_id']] <= 0:
+                self.error(line, 'schedule_id', 'Section is full')
+            else:
+                self.seen_pairs.add(pair)
+                if row['status'] == EnrollmentStatus.enrolled:
+                    self.seats_left[row['schedule_id']] -= 1
+                    self.seats_taken[row['schedule_id']] = self.seats_taken.get(row['schedule_id'], 0) + 1
+                self.student_ids.add(row['student_id'])
+                passed.append((line, row))
+        return passed
+
+    def finish(self):
+        # On MySQL the enrolled triggers have already claimed seats and updated summaries
+        if self.connection.dialect.name != 'mysql' and self.seats_taken:
+            self.connection.execute(
+                db.update(Schedule.__table__)
+                .where(Schedule.__table__.c.schedule_id == db.bindparam('b_schedule_id'))
+                .values(enrolled_count=Schedule.__table__.c.enrolled_count + db.bindparam('b_taken')),
+                [{'b_schedule_id': schedule_id, 'b_taken': taken} for schedule_id, taken in self.seats_taken.items()]
+            )
+        if self.student_ids:
+            refresh_academic_summaries(db.session, self.student_ids)
+
+IMPORTERS = {importer.kind: importer for importer in (StudentImport, ProfessorImport, EnrollmentImport)}
+
+def import_roster(kind, stream, filename, dry_run=False):
+    """Import one upload of `kind` (students, professors or enrollments).
+
+    Returns {'kind', 'rows', 'inserted', 'errors', 'dry_run'}; with dry_run,
+    'inserted' counts the rows that would have been inserted. Raises
+    RosterImportError when the file itself is unusable.
+    """
+    if kind not in IMPORTERS:
+        raise RosterImportError(f"Unknown import type '{kind}'")
+    importer = IMPORTERS[kind](dry_run)
+    try:
+        result = importer.run(read_rows(stream, filename))
+    except Exception:
+        db.session.rollback()
+        raise
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+        invalidate_dashboard_stats()
+    return result
+
+ERROR_REPORT_FIELDS = ['line', 'field', 'message']
+
+def error_report_chunks(errors):
+    """The errors of an import as CSV bytes (line, field, message)"""
+    return csv_chunks(ERROR_REPORT_FIELDS, [[tuple(error[field] for field in ERROR_REPORT_FIELDS) for error in errors]])
@@ -0,0 +1,269 @@
+"""In-process full-text search over courses.
+
+An inverted index maps tokens from course code, name, department and
+description to course ids, with per-field weights. Query terms match
+whole tokens and token prefixes (so "calc" finds "calculus" and "cs1" finds
+"CS101"). Terms of four or more characters also match tokens within one
+edit (insertion, deletion, substitution or transposition), found through a
+deletion-neighbourhood table. Each term must match for a course to be
+returned, and results are ranked by summed field weight times match quality.
+
+The index is built with one query, cached per process, and updated in place
+from ORM course inserts, updates and deletes after each commit. It is
+rebuilt after SEARCH_INDEX_TTL seconds to pick up changes made elsewhere.
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from flask import current_app
+from ..models import db, Course
+
+FIELD_WEIGHTS = {
+    'course_code': 8.0,
+    'course_name': 4.0,
+    'department': 2.0,
+    'description': 1.0,
+}
+PREFIX_FACTOR = 0.7
+TYPO_FACTOR = 0.4
+MIN_PREFIX = 2
+MIN_TYPO_LENGTH = 4
+
+_WORD = re.compile(r'[a-z0-9]+')
+_ALPHA_NUM = re.compile(r'[a-z]+|[0-9]+')
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens; "CS-101" also yields "cs101", "cs" and "101\""""
+    if not text:
+        return []
+    text = text.lower()
+    words = _WORD.findall(text)
+    tokens = list(words)
+    compact = ''.join(words)
+    if len(words) > 1 and len(compact) <= 12:
+        tokens.append(compact)
+    for word in words:
+        parts = _ALPHA_NUM.findall(word)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+def _deletions(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+def _within_one_edit(a, b):
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    return any(b[:i] + b[i + 1:] == a for i in range(len(b)))
+
+def _course_fields(course):
+    return {field: getattr(course, field) for field in FIELD_WEIGHTS}
+
+class CourseSearchIndex:
+    def __init__(self):
+        self.postings = defaultdict(dict)   # token -> {course_id: weight}
+        self.prefixes = defaultdict(set)    # prefix -> tokens
+        self.neighbours = defaultdict(set)  # token with one char deleted -> tokens
+        self.documents = {}                 # course_id -> {token: weight}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, rows):
+        index = cls()
+        for course_id, fields in rows:
+            index.add(course_id, fields)
+        return index
+
+    @classmethod
+    def load(cls):
+        """Build from the courses table (one query)"""
+        columns = [getattr(Course, field) for field in FIELD_WEIGHTS]
+        rows = db.session.execute(db.select(Course.course_id, *columns)).all()
+        return cls.build((row[0], dict(zip(FIELD_WEIGHTS, row[1:]))) for row in rows)
+
+    def _register_token(self, token):
+        if token in self.postings and self.postings[token]:
+            return
+        for length in range(MIN_PREFIX, len(token)):
+            self.prefixes[token[:length]].add(token)
+        if len(token) >= MIN_TYPO_LENGTH - 1:
+            for variant in _deletions(token):
+                self.neighbours[variant].add(token)
+
+    def _unregister_token(self, token):
+        for length in range(MIN_PREFIX, len(token)):
+            self.prefixes[token[:length]].discard(token)
+        if len(token) >= MIN_TYPO_LENGTH - 1:
+            for variant in _deletions(token):
+                self.neighbours[variant].discard(token)
+        del self.postings[token]
+
+    def add(self, course_id, fields):
+        """Index (or re-index) one course from a {field: text} mapping"""
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in set(tokenize(fields.get(field))):
+                weights[token] = max(weights[token], weight)
+        with self._lock:
+            self.remove(course_id)
+            for token, weight in weights.items():
+                self._register_token(token)
+                self.postings[token][course_id] = weight
+            self.documents[course_id] = dict(weights)
+
+    def remove(self, course_id):
+        with self._lock:
+            for token in self.documents.pop(course_id, {}):
+                postings = self.postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(course_id, None)
+                if not postings:
+                    self._unregister_token(token)
+
+    def _term_matches(self, term):
+        """{token: quality} for one query term"""
+        matches = {}
+        if term in self.postings:
+            matches[term] = 1.0
+        if len(term) >= MIN_PREFIX:
+            for token in self.prefixes.get(term, ()):
+                matches.setdefault(token, PREFIX_FACTOR * len(term) / len(token))
+        if len(term) >= MIN_TYPO_LENGTH and not matches:
+            candidates = set(self.neighbours.get(term, ()))
+            for variant in _deletions(term):
+                candidates.update(self.neighbours.get(variant, ()))
+                if variant in self.postings:
+                    candidates.add(variant)
+            for token in candidates:
+                if _within_one_edit(term, token):
+                    matches.setdefault(token, TYPO_FACTOR)
+        return matches
+
+    def search(self, query, limit=None):
+        """Course ids matching every term of `query`, best first"""
+        terms = list(dict.fromkeys(_WORD.findall((query or '').lower())))
+        if not terms:
+            return []
+        with self._lock:
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                for token, quality in self._term_matches(term).items():
+                    for course_id, weight in self.postings[token].items():
+                        term_scores[course_id] = max(term_scores[course_id], weight * quality)
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {course_id: score + term_scores[course_id]
+                              for course_id, score in scores.items() if course_id in term_scores}
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [course_id for course_id, _ in ranked[:limit]]
+
+_cache_lock = threading.Lock()
+_cached_index = None
+_cached_at = 0.0
+
+def get_course_index():
+    """The cached index, rebuilt every SEARCH_INDEX_TTL seconds"""
+    global _cached_index, _cached_at
+    ttl = current_app.config.get('SEARCH_INDEX_TTL', 600)
+    index = _cached_index
+    if index is not None and time.monotonic() - _cached_at < ttl:
+        return index
+    with _cache_lock:
+        if _cached_index is None or time.monotonic() - _cached_at >= ttl:
+            _cached_index = CourseSearchIndex.load()
+            _cached_at = time.monotonic()
+        return _cached_index
+
+def search_course_ids(query, limit=None):
+    """The shared course search: ids of matching courses, most relevant first"""
+    return get_course_index().search(query, limit)
+
+def filter_by_search(query, search):
+    """Restrict a query that includes Course to the courses matching `search`"""
+    course_ids = search_course_ids(search)
+    if not course_ids:
+        return query.filter(db.false())
+    return query.filter(Course.course_id.in_(course_ids))
+
+def order_by_relevance(items, course_ids, key=lambda item: item.course_id):
+    rank = {course_id: position for position, course_id in enumerate(course_ids)}
+    return sorted(items, key=lambda item: rank.get(key(item), len(rank)))
+
+def invalidate_course_index():
+    global _cached_index
+    _cached_index = None
+
+# Incremental maintenance: remember what changed during the flush, apply it
+# to the cached index once the transaction commits. Each change is recorded
+# with the savepoint it was made in (None outside any), so rolling back a
+# savepoint drops its changes and leaves the course's earlier pending change.
+def _record(target, fields_by_id):
+    session = db.inspect(target).session
+    if session is None:
+        return
+    pending = session.info.setdefault('search_index_changes', {})
+    savepoint = session.get_nested_transaction()
+    for course_id, fields in fields_by_id.items():
+        pending.setdefault(course_id, []).append((savepoint, fields))
+
+@db.event.listens_for(Course, 'after_insert')
+@db.event.listens_for(Course, 'after_update')
+def collect_course_for_search(mapper, connection, target):
+    changes = {old_id: None for old_id in db.inspect(target).attrs.course_id.history.deleted}
+    changes[target.course_id] = _course_fields(target)
+    _record(target, changes)
+
+@db.event.listens_for(Course, 'after_delete')
+def collect_course_removal_for_search(mapper, connection, target):
+    _record(target, {target.course_id: None})
+
+@db.event.listens_for(db.session, 'after_commit')
+def apply_search_index_changes(session):
+    changes = session.info.pop('search_index_changes', None)
+    index = _cached_index
+    if not changes or index is None:
+        return
+    for course_id, history in changes.items():
+        fields = history[-1][1]
+        if fields is None:
+            index.remove(course_id)
+        else:
+            index.add(course_id, fields)
+
+def _inside(transaction, savepoint):
+    while transaction is not None:
+        if transaction is savepoint:
+            return True
+        transaction = transaction.parent
+    return False
+
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def discard_search_index_changes(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('search_index_changes', None)
+        return
+    changes = session.info.get('search_index_changes')
+    if not changes or not previous_transaction.nested:
+        return
+    for course_id in list(changes):
+        kept = [change for change in changes[course_id] if not _inside(change[0], previous_transaction)]
+        if kept:
+            changes[course_id] = kept
+        else:
+            del changes[course_id]
@@ -0,0 +1,90 @@
+import random
+import time
+from flask import current_app
+from sqlalchemy.exc import IntegrityError, OperationalError
+from ..models import db, Schedule, Enrolled, EnrollmentStatus, SEAT_FULL_MESSAGE
+from .registration import RegistrationVerdict, register_student
+
+def actual_enrolled_count():
+    """Correlated subquery counting the live enrollments of the outer Schedule row"""
+    return db.select(db.func.count(Enrolled.enrollment_id)).where(
+        Enrolled.schedule_id == Schedule.schedule_id,
+        Enrolled.status == EnrollmentStatus.enrolled
+    ).scalar_subquery()
+
+def find_seat_drift():
+    """Return (schedule_id, stored, actual) for every schedule whose counter is wrong"""
+    actual = actual_enrolled_count()
+    rows = db.session.execute(
+        db.select(Schedule.schedule_id, Schedule.enrolled_count, actual.label('actual'))
+        .where(Schedule.enrolled_count != actual)
+        .order_by(Schedule.schedule_id)
+    ).all()
+    return [(row.schedule_id, row.enrolled_count, row.actual) for row in rows]
+
+def reconcile_seat_counts():
+    """Rewrite drifted counters from the enrolled table in one statement.
+
+    Drift can only come from writes that bypass both the ORM events and the
+    MySQL triggers, e.g. ON DELETE CASCADE from student, which does not fire
+    triggers on the child table. Returns the number of schedules repaired.
+    """
+    actual = actual_enrolled_count()
+    result = db.session.execute(
+        db.update(Schedule)
+        .where(Schedule.enrolled_count != actual)
+        .values(enrolled_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+# MySQL error codes worth retrying: lock wait timeout and deadlock
+RETRYABLE_ERROR_CODES = {1205, 1213}
+DUPLICATE_ENTRY_ERROR_CODE = 1062
+
+def _error_code(error):
+    args = getattr(getattr(error, 'orig', None), 'args', ())
+    return args[0] if args else None
+
+def _backoff_delay(attempt, base):
+    """Exponential backoff with jitter, capped at one second"""
+    return min(1.0, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+def reserve_seat(student, schedule_id, mode=None, max_retries=None):
+    """Register `student` for `schedule_id` and commit, safe under heavy concurrency.
+
+    The seat itself is always claimed by the guarded UPDATE in the enrolled
+    triggers (or ORM events), so the section can never be overbooked. In
+    'row_lock' mode the schedule row is locked up front; this avoids the
+    deadlocks InnoDB produces when concurrent inserts each hold the shared
+    foreign-key lock on the schedule row and then try to update it.
+    Deadlocks and lock timeouts are retried with bounded backoff.
+    """
+    mode = mode or current_app.config.get('SEAT_RESERVATION_MODE', 'row_lock')
+    if max_retries is None:
+        max_retries = current_app.config.get('SEAT_RESERVATION_MAX_RETRIES', 5)
+    backoff = current_app.config.get('SEAT_RESERVATION_BACKOFF', 0.02)
+
+    for attempt in range(max_retries + 1):
+        try:
+            if mode == 'row_lock':
+                Schedule.query.filter_by(schedule_id=schedule_id).with_for_update().populate_existing().first()
+            verdict = register_student(student, schedule_id)
+            if not verdict.ok:
+                db.session.rollback()
+                return verdict
+            db.session.commit()
+            return verdict
+        except IntegrityError as e:
+            db.session.rollback()
+            if _error_code(e) == DUPLICATE_ENTRY_ERROR_CODE:
+                return RegistrationVerdict('already_enrolled', 'You are already enrolled in this course.')
+            raise
+        except (OperationalError, ValueError) as e:
+            db.session.rollback()
+            if SEAT_FULL_MESSAGE in str(e):
+                return RegistrationVerdict('full', 'Cannot register: The course has reached its maximum enrollment.')
+            if _error_code(e) not in RETRYABLE_ERROR_CODES or attempt == max_retries:
+                raise
+            time.sleep(_backoff_delay(attempt, backoff))
@@ -0,0 +1,147 @@
+"""Admin dashboard statistics.
+
+Every metric is a grouped aggregate query, so the dashboard never loads
+rows just to count them, and the lists on the page are limited to the top
+N. The result is cached per process for DASHBOARD_STATS_TTL seconds and
+dropped after any commit that touched students, professors, courses,
+schedules, enrollments or the waitlist.
+"""
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from ..models import (db, Student, Professor, Course, Schedule, Enrolled, Waitlist,
+                      Semester, StudentStatus, EnrollmentStatus, SEMESTER_ORDER)
+
+def _value(member):
+    return member.value if hasattr(member, 'value') else member
+
+def _counts_by(column):
+    return {_value(key): count for key, count in db.session.execute(
+        db.select(column, db.func.count()).group_by(column)
+    )}
+
+def _fill_rate(enrolled, capacity):
+    return round(100.0 * enrolled / capacity, 1) if capacity else 0.0
+
+def compute_dashboard_stats(top_n=10, academic_year=None):
+    """Dashboard metrics for the admin home page, as plain dicts and lists"""
+    academic_year = academic_year or datetime.now().year
+
+    students_by_status = _counts_by(Student.status)
+    enrollments_by_status = _counts_by(Enrolled.status)
+    total_professors = db.session.scalar(db.select(db.func.count()).select_from(Professor))
+    total_courses = db.session.scalar(db.select(db.func.count()).select_from(Course))
+    active_courses = db.session.scalar(
+        db.select(db.func.count(db.distinct(Schedule.course_id))).where(Schedule.academic_year >= academic_year)
+    )
+
+    # Active enrollments per term, read from the per-section seat counters
+    enrollments_by_term = [
+        {'semester': _value(semester), 'academic_year': year, 'sections': sections, 'enrolled': int(enrolled or 0)}
+        for semester, year, sections, enrolled in db.session.execute(
+            db.select(Schedule.semester, Schedule.academic_year, db.func.count(), db.func.sum(Schedule.enrolled_count))
+            .where(Schedule.academic_year >= academic_year)
+            .group_by(Schedule.semester, Schedule.academic_year)
+        )
+    ]
+    enrollments_by_term.sort(key=lambda row: (row['academic_year'], SEMESTER_ORDER.index(Semester(row['semester']))))
+
+    enrolled = db.func.sum(Schedule.enrolled_count)
+    capacity = db.func.sum(Course.max_capacity)
+    departments = [
+        {'department': department, 'sections': sections, 'enrolled': int(seats or 0),
+         'capacity': int(total or 0), 'fill_rate': _fill_rate(seats or 0, total or 0)}
+        for department, sections, seats, total in db.session.execute(
+            db.select(Course.department, db.func.count(), enrolled, capacity)
+            .join(Schedule, Schedule.course_id == Course.course_id)
+            .where(Schedule.academic_year >= academic_year)
+            .group_by(Course.department)
+        )
+    ]
+    departments.sort(key=lambda row: (-row['fill_rate'], row['department']))
+
+    fill = Schedule.enrolled_count * 1.0 / Course.max_capacity
+    fullest_sections = [
+        {'schedule_id': schedule_id, 'course_code': code, 'course_name': name,
+         'semester': _value(semester), 'academic_year': year, 'enrolled': seats,
+         'capacity': total, 'fill_rate': _fill_rate(seats, total)}
+        for schedule_id, code, name, semester, year, seats, total in db.session.execute(
+            db.select(Schedule.schedule_id, Course.course_code, Course.course_name, Schedule.semester,
+                      Schedule.academic_year, Schedule.enrolled_count, Course.max_capacity)
+            .join(Course, Course.course_id == Schedule.course_id)
+            .where(Schedule.academic_year >= academic_year)
+            .order_by(fill.desc(), Schedule.schedule_id)
+            .limit(top_n)
+        )
+    ]
+
+    waiting = db.func.count(Waitlist.waitlist_id)
+    longest_waitlists = [
+        {'schedule_id': schedule_id, 'course_code': code, 'waiting': count}
+        for schedule_id, code, count in db.session.execute(
+            db.select(Waitlist.schedule_id, Course.course_code, waiting)
+            .join(Schedule, Schedule.schedule_id == Waitlist.schedule_id)
+            .join(Course, Course.course_id == Schedule.course_id)
+            .group_by(Waitlist.schedule_id, Course.course_code)
+            .order_by(waiting.desc(), Waitlist.schedule_id)
+            .limit(top_n)
+        )
+    ]
+
+    return {
+        'total_students': sum(students_by_status.values()),
+        'total_professors': total_professors,
+        'total_courses': total_courses,
+        'active_courses': active_courses,
+        'active_enrollments': enrollments_by_status.get(EnrollmentStatus.enrolled.value, 0),
+        'students_by_status': {status.value: students_by_status.get(status.value, 0) for status in StudentStatus},
+        'enrollments_by_status': {status.value: enrollments_by_status.get(status.value, 0) for status in EnrollmentStatus},
+        'enrollments_by_term': enrollments_by_term,
+        'departments': departments[:top_n],
+        'fullest_sections': fullest_sections,
+        'longest_waitlists': longest_waitlists,
+        'academic_year': academic_year,
+        'computed_at': datetime.now(),
+    }
+
+_cache_lock = threading.Lock()
+_cached_stats = {}  # top_n -> (monotonic time, stats)
+
+def get_dashboard_stats(top_n=None):
+    """The cached dashboard statistics, recomputed after DASHBOARD_STATS_TTL seconds or a relevant commit"""
+    if top_n is None:
+        top_n = current_app.config.get('DASHBOARD_TOP_N', 10)
+    ttl = current_app.config.get('DASHBOARD_STATS_TTL', 60)
+    entry = _cached_stats.get(top_n)
+    if entry is not None and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+    with _cache_lock:
+        entry = _cached_stats.get(top_n)
+        if entry is None or time.monotonic() - entry[0] >= ttl:
+            entry = (time.monotonic(), compute_dashboard_stats(top_n))
+            _cached_stats[top_n] = entry
+        return entry[1]
+
+def invalidate_dashboard_stats():
+    _cached_stats.clear()
+
+def collect_stats_change(mapper, connection, target):
+    session = db.inspect(target).session
+    if session is not None:
+        session.info['dashboard_stats_changed'] = True
+
+for _model in (Student, Professor, Course, Schedule, Enrolled, Waitlist):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        db.event.listen(_model, _event, collect_stats_change)
+
+@db.event.listens_for(db.session, 'after_commit')
+def refresh_dashboard_stats(session):
+    if session.info.pop('dashboard_stats_changed', False):
+        invalidate_dashboard_stats()
+
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def discard_dashboard_stats_changes(session, previous_transaction):
+    # Savepoint rollbacks fire this too; keep the flag for the outer transaction
+    if previous_transaction.parent is None:
+        session.info.pop('dashboard_stats_changed', None)
@@ -0,0 +1,99 @@
+"""Weekly occupancy bitmaps for time-conflict checks.
+
+A section's meeting pattern (days plus start/end time) becomes a bitmap of
+5 days x SLOTS_PER_DAY slots, stored as a small uint64 NumPy array. A
+student's enrolled sections in a term are OR-ed into one bitmap, so checking
+a whole catalog page is a single AND over an (n_sections x WORDS) matrix.
+
+Slots are SLOT_MINUTES wide; starts round down and ends round up, so the
+bitmaps never miss a real overlap. Sections whose times are not on slot
+boundaries can produce a false positive, which `find_conflicting_schedule_ids`
+removes with the exact check from registration.
+"""
+from functools import lru_cache
+import numpy as np
+from .registration import find_time_conflicts
+
+DAYS = 'MTWRF'
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WORDS = -(-len(DAYS) * SLOTS_PER_DAY // 64)
+
+EMPTY = np.zeros(WORDS, dtype=np.uint64)
+EMPTY.setflags(write=False)
+
+def _slot(value, round_up=False):
+    minutes = value.hour * 60 + value.minute + (value.second > 0)
+    if round_up:
+        return -(-minutes // SLOT_MINUTES)
+    return minutes // SLOT_MINUTES
+
+@lru_cache(maxsize=4096)
+def pattern_mask(meeting_days, start_time, end_time):
+    """A meeting pattern as a Python int, bit `day * SLOTS_PER_DAY + slot` set when occupied"""
+    first, last = _slot(start_time), _slot(end_time, round_up=True)
+    mask = 0
+    if last > first:
+        span = (1 << (last - first)) - 1
+        for day in set(meeting_days):
+            if day in DAYS:
+                mask |= span << (DAYS.index(day) * SLOTS_PER_DAY + first)
+    return mask
+
+@lru_cache(maxsize=4096)
+def weekly_bitmap(meeting_days, start_time, end_time):
+    """`pattern_mask` as a read-only uint64 array; cached, since many sections share a pattern"""
+    mask = pattern_mask(meeting_days, start_time, end_time)
+    bitmap = np.frombuffer(mask.to_bytes(WORDS * 8, 'little'), dtype='<u8').astype(np.uint64)
+    bitmap.setflags(write=False)
+    return bitmap
+
+def schedule_bitmap(schedule):
+    return weekly_bitmap(schedule.meeting_days, schedule.start_time, schedule.end_time)
+
+def term_of(schedule):
+    return schedule.semester, schedule.academic_year
+
+def load_bitmaps(current_load):
+    """OR the rows of `get_current_load` into one bitmap per (semester, academic_year)"""
+    bitmaps = {}
+    for row in current_load:
+        term = term_of(row)
+        bitmaps[term] = np.bitwise_or(bitmaps.get(term, EMPTY), schedule_bitmap(row))
+    return bitmaps
+
+def bitmap_matrix(schedules):
+    """Stack the bitmaps of `schedules` into an (n, WORDS) array"""
+    if not schedules:
+        return np.zeros((0, WORDS), dtype=np.uint64)
+    return np.stack([schedule_bitmap(schedule) for schedule in schedules])
+
+def conflict_flags(schedules, current_load):
+    """Boolean array: True where a schedule may overlap the student's load in its term"""
+    loads = load_bitmaps(current_load)
+    flags = np.zeros(len(schedules), dtype=bool)
+    if not loads or not schedules:
+        return flags
+    matrix = bitmap_matrix(schedules)
+    terms = [term_of(schedule) for schedule in schedules]
+    for term, load in loads.items():
+        rows = np.fromiter((t == term for t in terms), dtype=bool, count=len(terms))
+        if rows.any():
+            flags[rows] = np.bitwise_and(matrix[rows], load).any(axis=1)
+    return flags
+
+def find_conflicting_schedule_ids(schedules, current_load):
+    """Ids of the sections in `schedules` that clash with the student's enrolled sections.
+
+    Sections already in the load are never reported as clashing with themselves.
+    """
+    enrolled_ids = {row.schedule_id for row in current_load}
+    flags = conflict_flags(schedules, current_load)
+    conflicting = set()
+    for index in np.flatnonzero(flags):
+        schedule = schedules[index]
+        if schedule.schedule_id in enrolled_ids:
+            continue
+        if find_time_conflicts(schedule, current_load):
+            conflicting.add(schedule.schedule_id)
+    return conflicting
@@ -0,0 +1,206 @@
+"""Timetable builder: proposes conflict-free section combinations.
+
+Given the courses a student wants, every open section of each course in a
+term is a candidate. A depth-first search picks one section per course,
+most constrained course first, keeping the occupied slots as a Python int
+bitmap (see timeslots.py). A partial timetable is dropped as soon as any
+remaining course has no section left that fits (forward checking). Complete
+timetables are ranked and the best `top_k` are kept. The search stops when
+the time budget runs out, and the response says if it was cut short.
+"""
+import heapq
+import time
+from collections import defaultdict
+from ..models import db, Schedule, Course, Enrolled, EnrollmentStatus, SEMESTER_ORDER
+from .registration import get_current_load, get_credit_limit
+from .prerequisites import get_prerequisite_graph, get_completed_course_ids
+from .timeslots import pattern_mask, term_of
+
+def _overlaps(a, b):
+    return bool(set(a.meeting_days) & set(b.meeting_days)) and a.start_time < b.end_time and a.end_time > b.start_time
+
+def _mask(schedule):
+    return pattern_mask(schedule.meeting_days, schedule.start_time, schedule.end_time)
+
+def _fits(schedule, mask, chosen):
+    # The bitmap rounds to whole slots, so confirm a hit with exact times
+    return not (_mask(schedule) & mask) or not any(_overlaps(schedule, other) for other in chosen)
+
+def _rank(sections):
+    """Sort key: fewer days on campus, then less idle time between classes, then more free seats"""
+    by_day = defaultdict(list)
+    for section in sections:
+        for day in set(section.meeting_days):
+            by_day[day].append((section.start_time, section.end_time))
+    idle = 0
+    for meetings in by_day.values():
+        meetings.sort()
+        for (_, end), (start, _) in zip(meetings, meetings[1:]):
+            idle += max(0, (start.hour * 60 + start.minute) - (end.hour * 60 + end.minute))
+    free_seats = min(section.course.max_capacity - section.enrolled_count for section in sections)
+    return len(by_day), idle, -free_seats
+
+def _section_dict(section):
+    return {
+        'schedule_id': section.schedule_id,
+        'course_id': section.course_id,
+        'course_code': section.course.course_code,
+        'course_name': section.course.course_name,
+        'credits': section.course.credits,
+        'meeting_days': section.meeting_days,
+        'start_time': section.start_time.strftime('%H:%M'),
+        'end_time': section.end_time.strftime('%H:%M'),
+        'room_number': section.room_number,
+        'seats_left': section.course.max_capacity - section.enrolled_count,
+    }
+
+class TimetableSearch:
+    """Backtracking search over one term"""
+
+    def __init__(self, candidates, base_mask, base_sections, top_k, deadline):
+        # Most constrained course first
+        self.courses = sorted(candidates, key=lambda course_id: len(candidates[course_id]))
+        self.candidates = candidates
+        self.base_mask = base_mask
+        self.base_sections = base_sections
+        self.top_k = top_k
+        self.deadline = deadline
+        self.results = []  # max-heap on rank via negated keys: (neg rank, counter, sections)
+        self.counter = 0
+        self.timed_out = False
+        self.explored = 0
+
+    def run(self):
+        self._search(0, self.base_mask, [])
+        ranked = sorted(((tuple(-k for k in neg), sections) for neg, _, sections in self.results),
+                        key=lambda item: item[0])
+        return ranked
+
+    def _search(self, depth, mask, chosen):
+        if self.timed_out:
+            return
+        self.explored += 1
+        if self.explored % 256 == 0 and time.perf_counter() > self.deadline:
+            self.timed_out = True
+            return
+        if depth == len(self.courses):
+            self._keep(list(chosen))
+            return
+        occupied = self.base_sections + chosen
+        options = [s for s in self.candidates[self.courses[depth]] if _fits(s, mask, occupied)]
+        for section in options:
+            new_mask = mask | _mask(section)
+            chosen.append(section)
+            if self._remaining_feasible(depth + 1, new_mask, occupied + [section]):
+                self._search(depth + 1, new_mask, chosen)
+            chosen.pop()
+            if self.timed_out:
+                return
+
+    def _remaining_feasible(self, depth, mask, occupied):
+        for course_id in self.courses[depth:]:
+            if not any(_fits(s, mask, occupied) for s in self.candidates[course_id]):
+                return False
+        return True
+
+    def _keep(self, sections):
+        rank = _rank(sections)
+        entry = (tuple(-k for k in rank), self.counter, sections)
+        self.counter += 1
+        if len(self.results) < self.top_k:
+            heapq.heappush(self.results, entry)
+        elif entry > self.results[0]:
+            heapq.heapreplace(self.results, entry)
+
+def build_timetables(student, course_ids, semester=None, academic_year=None, top_k=5, time_budget=0.2):
+    """Propose up to `top_k` conflict-free section combinations for `course_ids`.
+
+    Sections must have free seats. They must not clash with the student's
+    current enrollments in the same term, and the term's total credits must
+    stay within the student's credit limit. Courses the student cannot take
+    are reported under 'skipped'. Terms are tried in calendar order, and
+    options from several terms are merged by rank.
+    """
+    deadline = time.perf_counter() + time_budget
+    course_ids = list(dict.fromkeys(course_ids))
+    skipped = {}
+
+    courses = {c.course_id: c for c in Course.query.filter(Course.course_id.in_(course_ids))} if course_ids else {}
+    for course_id in course_ids:
+        if course_id not in courses:
+            skipped[course_id] = 'Course not found.'
+
+    # Prerequisites and courses already taken
+    graph = get_prerequisite_graph()
+    completed = get_completed_course_ids(student.student_id)
+    enrolled_course_ids = {row.course_id for row in db.session.query(Schedule.course_id).join(
+        Enrolled, Enrolled.schedule_id == Schedule.schedule_id
+    ).filter(
+        Enrolled.student_id == student.student_id,
+        Enrolled.status == EnrollmentStatus.enrolled
+    )}
+    for course_id in list(courses):
+        if course_id in completed or course_id in enrolled_course_ids:
+            skipped[course_id] = 'Already completed or enrolled.'
+        else:
+            missing = graph.missing(course_id, completed)
+            if missing:
+                skipped[course_id] = 'Missing prerequisite(s): ' + ', '.join(graph.codes[m] for m in missing)
+        if course_id in skipped:
+            courses.pop(course_id)
+
+    query = Schedule.query.join(Course).options(db.contains_eager(Schedule.course)).filter(
+        Schedule.course_id.in_(list(courses)),
+        Schedule.enrolled_count < Course.max_capacity
+    )
+    if semester:
+        query = query.filter(Schedule.semester == semester)
+    if academic_year:
+        query = query.filter(Schedule.academic_year == academic_year)
+    sections_by_term = defaultdict(lambda: defaultdict(list))
+    for section in query.order_by(Schedule.schedule_id) if courses else ():
+        sections_by_term[term_of(section)][section.course_id].append(section)
+
+    load_by_term = defaultdict(list)
+    for row in get_current_load(student.student_id):
+        load_by_term[term_of(row)].append(row)
+
+    limit = get_credit_limit(student.level)
+    requested_credits = sum(course.credits for course in courses.values())
+    ranked = []
+    timed_out = False
+    terms = sorted(sections_by_term, key=lambda term: (term[1], SEMESTER_ORDER.index(term[0])))
+    for term in terms:
+        candidates = sections_by_term[term]
+        if len(candidates) < len(courses):
+            continue  # some course has no open section this term
+        load = load_by_term.get(term, [])
+        if sum(row.credits for row in load) + requested_credits > limit:
+            continue
+        base_mask = 0
+        for row in load:
+            base_mask |= _mask(row)
+        search = TimetableSearch(candidates, base_mask, load, top_k, deadline)
+        ranked.extend(search.run())
+        if search.timed_out:
+            timed_out = True
+            break
+
+    ranked.sort(key=lambda item: item[0])
+    options = []
+    for (days, idle, neg_seats), sections in ranked[:top_k]:
+        sections = sorted(sections, key=lambda s: s.course.course_code)
+        options.append({
+            'semester': sections[0].semester.value,
+            'academic_year': sections[0].academic_year,
+            'credits': sum(s.course.credits for s in sections),
+            'days_on_campus': days,
+            'idle_minutes': idle,
+            'sections': [_section_dict(s) for s in sections],
+        })
+    return {
+        'options': options,
+        'skipped': skipped,
+        'complete': not timed_out,
+        'credit_limit': limit,
+    }
@@ -0,0 +1,98 @@
+from sqlalchemy.exc import IntegrityError
+from ..models import db, Student, Schedule, Waitlist
+from .registration import RegistrationVerdict, evaluate_registration, register_student
+from .seats import reserve_seat
+
+# How many queued students to evaluate per promotion before giving up;
+# students who are currently ineligible (conflict, credits) keep their place
+PROMOTION_SCAN_LIMIT = 10
+
+def join_waitlist(student_id, schedule_id):
+    """Append the student to the section's queue with a single INSERT.
+
+    Returns False if the student was already waiting. The caller commits.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.add(Waitlist(student_id=student_id, schedule_id=schedule_id))
+    except IntegrityError:
+        return False
+    return True
+
+def leave_waitlist(student_id, schedule_id):
+    result = db.session.execute(
+        db.delete(Waitlist).where(Waitlist.student_id == student_id, Waitlist.schedule_id == schedule_id)
+    )
+    return result.rowcount > 0
+
+def get_waitlist_position(student_id, schedule_id):
+    """1-based position in the queue, or None if the student is not waiting"""
+    entry = Waitlist.query.filter_by(student_id=student_id, schedule_id=schedule_id).first()
+    if not entry:
+        return None
+    ahead = db.session.query(db.func.count(Waitlist.waitlist_id)).filter(
+        Waitlist.schedule_id == schedule_id,
+        db.or_(
+            Waitlist.requested_at < entry.requested_at,
+            db.and_(Waitlist.requested_at == entry.requested_at, Waitlist.waitlist_id < entry.waitlist_id)
+        )
+    ).scalar()
+    return ahead + 1
+
+def register_or_waitlist(student, schedule_id):
+    """Register the student, or queue them if the only obstacle is a full section.
+
+    Commits the transaction. A 'waitlisted' verdict is returned instead of
+    'full' so the caller can tell the student they are in the queue.
+    """
+    verdict = reserve_seat(student, schedule_id)
+    if verdict.ok:
+        if leave_waitlist(student.student_id, schedule_id):
+            db.session.commit()
+        return verdict
+    if verdict.reason != 'full':
+        return verdict
+
+    if join_waitlist(student.student_id, schedule_id):
+        db.session.commit()
+        message = 'This course is full. You have been added to the waitlist and will be enrolled automatically when a seat opens.'
+    else:
+        message = 'This course is full. You are already on the waitlist.'
+    return RegistrationVerdict('waitlisted', message, schedule=verdict.schedule)
+
+def promote_from_waitlist(schedule_id):
+    """Fill open seats in `schedule_id` from the head of its waitlist.
+
+    Called after a drop or withdrawal, before the caller commits, so the
+    promotion is part of the same transaction. Each candidate goes through
+    the full registration checks again; promoted students leave the queue.
+    Returns the list of promoted student ids.
+    """
+    db.session.flush()
+    schedule = Schedule.query.filter_by(schedule_id=schedule_id).with_for_update().populate_existing().first()
+    if not schedule:
+        return []
+
+    candidates = Waitlist.query.filter_by(schedule_id=schedule_id).order_by(
+        Waitlist.requested_at, Waitlist.waitlist_id
+    ).limit(PROMOTION_SCAN_LIMIT).all()
+
+    promoted = []
+    for entry in candidates:
+        if schedule.enrolled_count >= schedule.course.max_capacity:
+            break
+        student = db.session.get(Student, entry.student_id)
+        verdict = evaluate_registration(student, schedule_id)
+        if verdict.reason == 'already_enrolled':
+            db.session.delete(entry)
+            continue
+        if not verdict.ok:
+            continue
+        try:
+            with db.session.begin_nested():
+                register_student(student, schedule_id)
+                db.session.delete(entry)
+        except (IntegrityError, ValueError):
+            continue
+        promoted.append(entry.student_id)
+    return promoted
@@ -0,0 +1,602 @@
+"""Server-side sessions.
+
+The session cookie only carries a random session id; the data lives in a
+pluggable store chosen by SESSION_TYPE:
+
+- 'filesystem': one file per session under SESSION_FILE_DIR, sharded into
+  SESSION_FILE_SHARD_DEPTH levels of two-character directories
+- 'sqlite': a single SQLite database (SESSION_SQLITE_PATH) in WAL mode
+- 'redis': any server speaking the Redis protocol (SESSION_REDIS_URL)
+- 'cookie': Flask's default signed-cookie session (no server-side state)
+
+Session data is packed with a small MessagePack encoder rather than JSON or
+pickle. The store is only read when a view actually touches `session` and
+only written when the session was modified, or when less than half of
+PERMANENT_SESSION_LIFETIME is left. Expired sessions are removed by a
+background sweeper thread every SESSION_SWEEP_INTERVAL seconds (Redis
+expires keys itself) and by `flask sweep-sessions`.
+"""
+import os
+import re
+import secrets
+import socket
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from urllib.parse import urlparse, unquote
+from flask import session
+from flask.sessions import SessionInterface, SessionMixin
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+# ---------------------------------------------------------------------------
+# Serialization: the MessagePack subset needed for session values
+# (None, bool, int, float, str, bytes, list/tuple, dict, date/datetime)
+# ---------------------------------------------------------------------------
+
+EXT_DATETIME = 1
+EXT_DATE = 2
+
+def _pack(value, out):
+    if value is None:
+        out.append(0xc0)
+    elif value is True:
+        out.append(0xc3)
+    elif value is False:
+        out.append(0xc2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -0x20 <= value < 0:
+            out.append(value & 0xff)
+        elif 0 <= value <= 0xffffffffffffffff:
+            out += struct.pack('>BQ', 0xcf, value)
+        elif -0x8000000000000000 <= value < 0:
+            out += struct.pack('>Bq', 0xd3, value)
+        else:
+            raise TypeError(f'integer {value} is out of range for session data')
+    elif isinstance(value, float):
+        out += struct.pack('>Bd', 0xcb, value)
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        _pack_header(out, len(data), 0xa0, 32, 0xd9, 0xda, 0xdb)
+        out += data
+    elif isinstance(value, (bytes, bytearray)):
+        _pack_header(out, len(value), None, 0, 0xc4, 0xc5, 0xc6)
+        out += value
+    elif isinstance(value, (list, tuple)):
+        _pack_header(out, len(value), 0x90, 16, None, 0xdc, 0xdd)
+        for item in value:
+            _pack(item, out)
+    elif isinstance(value, dict):
+        _pack_header(out, len(value), 0x80, 16, None, 0xde, 0xdf)
+        for key, item in value.items():
+            _pack(key, out)
+            _pack(item, out)
+    elif isinstance(value, (datetime, date)):
+        code = EXT_DATETIME if isinstance(value, datetime) else EXT_DATE
+        data = value.isoformat().encode('ascii')
+        out += struct.pack('>BBb', 0xc7, len(data), code)
+        out += data
+    else:
+        raise TypeError(f'{type(value).__name__} values cannot be stored in the session')
+
+def _pack_header(out, length, fix_base, fix_limit, code8, code16, code32):
+    if fix_base is not None and length < fix_limit:
+        out.append(fix_base | length)
+    elif code8 is not None and length <= 0xff:
+        out += struct.pack('>BB', code8, length)
+    elif length <= 0xffff:
+        out += struct.pack('>BH', code16, length)
+    else:
+        out += struct.pack('>BI', code32, length)
+
+def packb(value):
+    out = bytearray()
+    _pack(value, out)
+    return bytes(out)
+
+_FIXED = {
+    0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+    0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q',
+    0xca: '>f', 0xcb: '>d',
+}
+_LENGTHS = {
+    0xd9: ('>B', 'str'), 0xda: ('>H', 'str'), 0xdb: ('>I', 'str'),
+    0xc4: ('>B', 'bin'), 0xc5: ('>H', 'bin'), 0xc6: ('>I', 'bin'),
+    0xdc: ('>H', 'array'), 0xdd: ('>I', 'array'),
+    0xde: ('>H', 'map'), 0xdf: ('>I', 'map'),
+}
+
+def _unpack(data, offset):
+    code = data[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if code == 0xc0:
+        return None, offset
+    if code in (0xc2, 0xc3):
+        return code == 0xc3, offset
+    if code in _FIXED:
+        fmt = _FIXED[code]
+        return struct.unpack_from(fmt, data, offset)[0], offset + struct.calcsize(fmt)
+    if 0xa0 <= code <= 0xbf:
+        kind, length = 'str', code & 0x1f
+    elif 0x90 <= code <= 0x9f:
+        kind, length = 'array', code & 0x0f
+    elif 0x80 <= code <= 0x8f:
+        kind, length = 'map', code & 0x0f
+    elif code in _LENGTHS:
+        fmt, kind = _LENGTHS[code]
+        length = struct.unpack_from(fmt, data, offset)[0]
+        offset += struct.calcsize(fmt)
+    elif code == 0xc7:
+        length, ext = struct.unpack_from('>Bb', data, offset)
+        offset += 2
+        text = bytes(data[offset:offset + length]).decode('ascii')
+        offset += length
+        if ext == EXT_DATETIME:
+            return datetime.fromisoformat(text), offset
+        if ext == EXT_DATE:
+            return date.fromisoformat(text), offset
+        raise ValueError(f'unknown extension type {ext} in session data')
+    else:
+        raise ValueError(f'unsupported type code 0x{code:02x} in session data')
+
+    if kind == 'str':
+        return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+    if kind == 'bin':
+        return bytes(data[offset:offset + length]), offset + length
+    if kind == 'array':
+        items = []
+        for _ in range(length):
+            item, offset = _unpack(data, offset)
+            items.append(item)
+        return items, offset
+    mapping = {}
+    for _ in range(length):
+        key, offset = _unpack(data, offset)
+        mapping[key], offset = _unpack(data, offset)
+    return mapping, offset
+
+def unpackb(data):
+    value, offset = _unpack(memoryview(data), 0)
+    if offset != len(data):
+        raise ValueError('trailing bytes in session data')
+    return value
+
+# ---------------------------------------------------------------------------
+# Stores. Each keeps (expires, payload) per session id, where expires is a
+# unix timestamp and payload the packed session dict.
+# ---------------------------------------------------------------------------
+
+class FileSystemStore:
+    """One file per session, sharded as <dir>/ab/cd/<sid> for depth 2"""
+
+    needs_sweep = True
+    HEADER = struct.Struct('>d')
+
+    def __init__(self, directory, shard_depth=2):
+        self.directory = directory
+        self.shard_depth = shard_depth
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid):
+        shards = [sid[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.directory, *shards, sid)
+
+    def get(self, sid):
+        path = self._path(sid)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        if len(raw) < self.HEADER.size:
+            return None
+        expires = self.HEADER.unpack_from(raw)[0]
+        if expires < time.time():
+            self.delete(sid)
+            return None
+        return expires, raw[self.HEADER.size:]
+
+    def set(self, sid, payload, expires):
+        path = self._path(sid)
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        # Write to a temporary file and rename so readers never see half a session
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.HEADER.pack(expires))
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, sid):
+        try:
+            os.unlink(self._path(sid))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self, now=None):
+        now = now or time.time()
+        removed = 0
+        for folder, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(folder, name)
+                try:
+                    if name.startswith('.tmp-'):
+                        # Leftovers of a crashed write; recent ones may still be in progress
+                        if os.path.getmtime(path) < now - 3600:
+                            os.unlink(path)
+                            removed += 1
+                        continue
+                    with open(path, 'rb') as f:
+                        header = f.read(self.HEADER.size)
+                    if len(header) < self.HEADER.size or self.HEADER.unpack(header)[0] < now:
+                        os.unlink(path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+class SQLiteStore:
+    """All sessions in one SQLite file, in WAL mode so readers don't block the writer"""
+
+    needs_sweep = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                ' sid TEXT PRIMARY KEY, expires REAL NOT NULL, data BLOB NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._connection().execute(
+            'SELECT expires, data FROM sessions WHERE sid = ? AND expires >= ?', (sid, time.time())
+        ).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def set(self, sid, payload, expires):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO sessions (sid, expires, data) VALUES (?, ?, ?)', (sid, expires, payload)
+        )
+
+    def delete(self, sid):
+        self._connection().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def sweep(self, now=None):
+        cursor = self._connection().execute('DELETE FROM sessions WHERE expires < ?', (now or time.time(),))
+        return cursor.rowcount
+
+class RedisError(Exception):
+    """An error reply from the Redis server"""
+
+class RedisConnection:
+    """A single connection speaking RESP2 to a Redis-compatible server"""
+
+    def __init__(self, host, port, password=None, username=None, db=0, timeout=5):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.file = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', *([username] if username else []), password)
+        if db:
+            self.execute('SELECT', db)
+
+    def execute(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif not isinstance(arg, bytes):
+                arg = str(arg).encode('ascii')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.file.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('connection closed by Redis server')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode('utf-8')
+        if kind == b'-':
+            raise RedisError(body.decode('utf-8'))
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self.file.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(body)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f'unexpected reply from Redis server: {line!r}')
+
+    def close(self):
+        try:
+            self.file.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+class RedisStore:
+    """Sessions as Redis keys with a native expiry (PX), so no sweeping is needed.
+
+    The value is the 8-byte expiry timestamp followed by the payload, like the
+    filesystem store, which lets the interface decide when to slide the expiry
+    without an extra PTTL round trip.
+    """
+
+    needs_sweep = False
+    HEADER = FileSystemStore.HEADER
+
+    def __init__(self, url='redis://localhost:6379/0', key_prefix='session:', timeout=5):
+        parsed = urlparse(url)
+        if parsed.scheme != 'redis':
+            raise ValueError(f'unsupported Redis URL scheme: {parsed.scheme!r}')
+        self.options = {
+            'host': parsed.hostname or 'localhost',
+            'port': parsed.port or 6379,
+            'username': unquote(parsed.username) if parsed.username else None,
+            'password': unquote(parsed.password) if parsed.password else None,
+            'db': int(parsed.path.lstrip('/') or 0),
+            'timeout': timeout,
+        }
+        self.key_prefix = key_prefix
+        self._local = threading.local()
+
+    def _execute(self, *args):
+        # One connection per thread; reconnect once if the server dropped it
+        for attempt in (1, 2):
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = RedisConnection(**self.options)
+            try:
+                return conn.execute(*args)
+            except (ConnectionError, OSError):
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+
+    def get(self, sid):
+        raw = self._execute('GET', self.key_prefix + sid)
+        if raw is None or len(raw) < self.HEADER.size:
+            return None
+        return self.HEADER.unpack_from(raw)[0], raw[self.HEADER.size:]
+
+    def set(self, sid, payload, expires):
+        ttl_ms = max(1, int((expires - time.time()) * 1000))
+        self._execute('SET', self.key_prefix + sid, self.HEADER.pack(expires) + payload, 'PX', ttl_ms)
+
+    def delete(self, sid):
+        self._execute('DEL', self.key_prefix + sid)
+
+    def sweep(self, now=None):
+        return 0
+
+def create_store(config):
+    session_type = config['SESSION_TYPE']
+    if session_type == 'filesystem':
+        return FileSystemStore(config['SESSION_FILE_DIR'], config['SESSION_FILE_SHARD_DEPTH'])
+    if session_type == 'sqlite':
+        return SQLiteStore(config['SESSION_SQLITE_PATH'])
+    if session_type == 'redis':
+        return RedisStore(config['SESSION_REDIS_URL'], config['SESSION_KEY_PREFIX'])
+    raise ValueError(f'unknown SESSION_TYPE {session_type!r}')
+
+# ---------------------------------------------------------------------------
+# Flask integration
+# ---------------------------------------------------------------------------
+
+class ServerSideSession(SessionMixin):
+    """A session whose data is fetched from the store on first access"""
+
+    def __init__(self, store, sid=None):
+        self.store = store
+        self.sid = sid
+        self.new = sid is None
+        self.expires = None
+        self.modified = False
+        self.accessed = False
+        self._data = None
+
+    def _load(self):
+        self.accessed = True
+        if self._data is None:
+            self._data = {}
+            record = self.store.get(self.sid) if self.sid else None
+            if record is not None:
+                try:
+                    self._data = unpackb(record[1])
+                    self.expires = record[0]
+                except (ValueError, struct.error, UnicodeDecodeError):
+                    self._data = {}
+        return self._data
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __contains__(self, key):
+        return key in self._load()
+
+    def clear(self):
+        if self._load():
+            self._data.clear()
+            self.modified = True
+
+    def regenerate(self):
+        """Move the data to a fresh session id (call after login to prevent fixation)"""
+        self._load()
+        if self.sid:
+            self.store.delete(self.sid)
+        self.sid = None
+        self.modified = True
+
+    def __repr__(self):
+        state = repr(self._data) if self.loaded else '<not loaded>'
+        return f'<{type(self).__name__} {self.sid!r} {state}>'
+
+def regenerate_session():
+    """Move the current session to a fresh id; cookie sessions have no id and are left alone"""
+    regenerate = getattr(session, 'regenerate', None)
+    if regenerate is not None:
+        regenerate()
+
+class ServerSideSessionInterface(SessionInterface):
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or not SESSION_ID_PATTERN.match(sid):
+            sid = None
+        return ServerSideSession(self.store, sid)
+
+    def save_session(self, app, session, response):
+        if not session.loaded:
+            return
+        response.vary.add('Cookie')
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.sid and (session.modified or session.expires is not None):
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        # Rewrite when changed, or once half the lifetime has passed (sliding expiry)
+        stale = session.expires is None or session.expires - now < lifetime / 2
+        if not (session.modified or stale):
+            return
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        session.expires = now + lifetime
+        self.store.set(session.sid, packb(dict(session)), session.expires)
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+class SessionSweeper:
+    """Daemon thread removing expired sessions from stores without native expiry"""
+
+    def __init__(self, store, interval, logger=None):
+        self.store = store
+        self.interval = interval
+        self.logger = logger
+        self._started = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        # Started on the first request rather than at import, so it runs in each worker after fork
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='session-sweeper', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                removed = self.store.sweep()
+                if removed and self.logger:
+                    self.logger.info('Removed %d expired session(s)', removed)
+            except Exception:
+                if self.logger:
+                    self.logger.exception('Session sweep failed')
+
+class ServerSession:
+    """Install the server-side session interface selected by SESSION_TYPE"""
+
+    def __init__(self, app=None):
+        self.store = None
+        self.sweeper = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        app.config.setdefault('SESSION_TYPE', 'filesystem')
+        app.config.setdefault('SESSION_FILE_DIR', os.path.join(root, 'flask_session'))
+        app.config.setdefault('SESSION_FILE_SHARD_DEPTH', 2)
+        app.config.setdefault('SESSION_SQLITE_PATH', os.path.join(root, 'flask_session', 'sessions.sqlite'))
+        app.config.setdefault('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('SESSION_KEY_PREFIX', 'session:')
+        app.config.setdefault('SESSION_SWEEP_INTERVAL', 300)
+        app.extensions['server_session'] = self
+
+        if app.config['SESSION_TYPE'] in (None, 'cookie', 'null'):
+            return
+        self.store = create_store(app.config)
+        app.session_interface = ServerSideSessionInterface(self.store)
+
+        interval = app.config['SESSION_SWEEP_INTERVAL']
+        if self.store.needs_sweep and interval and not app.testing:
+            self.sweeper = SessionSweeper(self.store, interval, app.logger)
+            app.before_request(self.sweeper.start)